@@ -0,0 +1,65 @@
+import gzip
+import hashlib
+import os
+import threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class ArchivoHTML:
+    """Archivo de HTML direccionado por contenido: cada HTML distinto se guarda una vez, comprimido"""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.extension = '.zst' if zstandard else '.gz'
+        os.makedirs(directorio, exist_ok=True)
+
+    def ruta(self, hash_html, extension):
+        """Ruta de un blob (subcarpeta con los dos primeros caracteres del hash)"""
+        return os.path.join(self.directorio, hash_html[:2], f"{hash_html}{extension}")
+
+    def comprimir(self, contenido):
+        if zstandard:
+            return zstandard.ZstdCompressor(level=10).compress(contenido)
+        return gzip.compress(contenido, compresslevel=9)
+
+    def guardar(self, html):
+        """Guarda el HTML si no existe y devuelve su hash SHA-256"""
+        contenido = html.encode('utf-8')
+        hash_html = hashlib.sha256(contenido).hexdigest()
+
+        if self.existe(hash_html):
+            return hash_html
+
+        ruta = self.ruta(hash_html, self.extension)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+        # Escritura atómica: varios procesos o hilos pueden guardar el mismo blob a la vez
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as f:
+            f.write(self.comprimir(contenido))
+        os.replace(temporal, ruta)
+
+        return hash_html
+
+    def existe(self, hash_html):
+        return any(os.path.exists(self.ruta(hash_html, extension)) for extension in ('.zst', '.gz'))
+
+    def leer(self, hash_html):
+        """Devuelve el HTML de un hash (None si no está archivado)"""
+        ruta_zst = self.ruta(hash_html, '.zst')
+        if os.path.exists(ruta_zst):
+            if not zstandard:
+                raise RuntimeError("Se necesita el paquete 'zstandard' para leer blobs .zst")
+            with open(ruta_zst, 'rb') as f:
+                return zstandard.ZstdDecompressor().decompress(f.read()).decode('utf-8')
+
+        ruta_gz = self.ruta(hash_html, '.gz')
+        if os.path.exists(ruta_gz):
+            with open(ruta_gz, 'rb') as f:
+                return gzip.decompress(f.read()).decode('utf-8')
+
+        return None
@@ -0,0 +1,122 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+
+from LEQ_Plan import clave_registro
+
+
+# Valores que se comparan entre ejecuciones
+CAMPOS_VALOR = ['Pacientes_en_Lista', 'Demora_Media']
+
+
+class RegistroCambios:
+    """Último valor conocido de cada consulta y generación del feed de cambios"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.crear_tablas()
+
+    @contextmanager
+    def conectar(self):
+        """Abre una conexión nueva"""
+        conexion = sqlite3.connect(self.ruta, timeout=30)
+        conexion.row_factory = sqlite3.Row
+        try:
+            yield conexion
+        finally:
+            conexion.close()
+
+    def crear_tablas(self):
+        """Crea la tabla de últimos valores si no existe"""
+        with self.conectar() as conexion:
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS ultimos_valores (
+                    clave TEXT PRIMARY KEY,
+                    valores TEXT NOT NULL,
+                    fecha_extraccion TEXT
+                )
+            """)
+            conexion.commit()
+
+    def leer_ultimos(self, claves):
+        """Lee los últimos valores guardados de las claves indicadas"""
+        ultimos = {}
+        claves = list(claves)
+        with self.conectar() as conexion:
+            # Consultar por bloques para no superar el límite de parámetros de SQLite
+            for inicio in range(0, len(claves), 500):
+                bloque = claves[inicio:inicio + 500]
+                marcas = ','.join('?' * len(bloque))
+                filas = conexion.execute(
+                    f"SELECT * FROM ultimos_valores WHERE clave IN ({marcas})", bloque
+                ).fetchall()
+                for fila in filas:
+                    ultimos[fila['clave']] = {
+                        'valores': json.loads(fila['valores']),
+                        'fecha_extraccion': fila['fecha_extraccion']
+                    }
+        return ultimos
+
+    def comparar(self, registros):
+        """Compara los registros con los últimos valores; devuelve (cambios, resumen)"""
+        actuales = {}
+        for registro in registros:
+            actuales[clave_registro(registro)] = registro
+
+        ultimos = self.leer_ultimos(actuales.keys())
+
+        cambios = []
+        resumen = {'insertados': 0, 'actualizados': 0, 'sin_cambios': 0}
+
+        for clave, registro in actuales.items():
+            nuevo = {campo: registro.get(campo) for campo in CAMPOS_VALOR}
+            anterior = ultimos.get(clave)
+
+            if anterior is None:
+                tipo = 'insertado'
+                resumen['insertados'] += 1
+            elif anterior['valores'] != nuevo:
+                tipo = 'actualizado'
+                resumen['actualizados'] += 1
+            else:
+                resumen['sin_cambios'] += 1
+                continue
+
+            cambios.append({
+                'tipo': tipo,
+                'clave': clave,
+                'url': registro.get('URL'),
+                'hospital': registro.get('Filtro_Hospital'),
+                'especialidad': registro.get('Filtro_Especialidad'),
+                'mes': registro.get('Filtro_Mes'),
+                'anterior': anterior['valores'] if anterior else None,
+                'fecha_anterior': anterior['fecha_extraccion'] if anterior else None,
+                'nuevo': nuevo,
+                'fecha_extraccion': registro.get('Fecha_Extraccion')
+            })
+
+        return cambios, resumen
+
+    def actualizar(self, registros):
+        """Guarda los registros como últimos valores conocidos"""
+        with self.conectar() as conexion:
+            conexion.executemany(
+                "INSERT OR REPLACE INTO ultimos_valores (clave, valores, fecha_extraccion) VALUES (?, ?, ?)",
+                [
+                    (
+                        clave_registro(registro),
+                        json.dumps({campo: registro.get(campo) for campo in CAMPOS_VALOR}, ensure_ascii=False),
+                        registro.get('Fecha_Extraccion')
+                    )
+                    for registro in registros
+                ]
+            )
+            conexion.commit()
+
+
+def escribir_feed_cambios(ruta, cambios, resumen):
+    """Escribe el feed de cambios en JSON Lines (primera línea: resumen)"""
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'tipo': 'resumen', **resumen}, ensure_ascii=False) + "\n")
+        for cambio in cambios:
+            f.write(json.dumps(cambio, ensure_ascii=False) + "\n")
@@ -0,0 +1,287 @@
+import json
+import threading
+import time
+
+from LEQ_Memoria import MedidorMemoria, pid_navegador
+from LEQ_Plan import planificar_consultas, repartir_consultas
+from LEQ_Simulador import SimuladorLEQ, crear_servidor_simulador, url_simulador
+
+
+# Perfiles de probar_fallos: probabilidad de cada fallo por consulta (ver LEQ_Simulador.FALLOS)
+PERFILES_FALLOS = {
+    'sin_fallos': {},
+    'lentas': {'lenta': 0.05},
+    'vacias': {'vacia': 0.1},
+    'error500': {'error500': 0.05},
+    'cortes': {'corte': 0.05},
+    'viewstate': {'viewstate': 0.02},
+    'dom_obsoleto': {'dom_obsoleto': 0.1},
+    'mixto': {'lenta': 0.02, 'vacia': 0.03, 'error500': 0.02, 'corte': 0.02, 'viewstate': 0.01, 'dom_obsoleto': 0.03}
+}
+
+
+def arrancar_simulador(simulador):
+    """Servidor del simulador en un puerto libre, atendiendo en segundo plano"""
+    servidor = crear_servidor_simulador(simulador, puerto=0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, url_simulador(servidor)
+
+
+def parar_simulador(servidor):
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def consultas_simulador(simulador, url, hospitales=None, meses=None):
+    """Plan de consultas sobre los catálogos del simulador (índices como en el desplegable)"""
+    consultas = []
+    for indice, (valor, nombre) in enumerate(simulador.hospitales[:hospitales], start=1):
+        especialidades = [
+            {'indice': i, 'nombre': texto, 'valor': valor_esp}
+            for i, (valor_esp, texto) in enumerate(simulador.especialidades_hospital(valor), start=1)
+        ]
+        consultas.extend(planificar_consultas(
+            url,
+            {'indice': indice, 'nombre': nombre, 'valor': valor},
+            [{'texto': texto, 'valor': valor_mes} for valor_mes, texto in simulador.meses[:meses]],
+            especialidades
+        ))
+    return consultas
+
+
+def preparar_scraper(crear_scraper, url, pestanas=1):
+    """Scraper para medir: sin mapa de vacíos, sin archivo HTML y sin salida por consola"""
+    scraper = crear_scraper()
+    scraper.mapa_dispersion = None
+    scraper.directorio_archivo_html = None
+    scraper.precalentar = False
+    scraper.modo_verbose = False
+    scraper.pestanas = pestanas
+    scraper.url_actual = url
+    scraper.iniciar_navegador(url)
+    if pestanas > 1:
+        scraper.abrir_pestanas(pestanas)
+    return scraper
+
+
+def medir_pestanas(crear_scraper, url, consultas, pestanas):
+    """Una sesión de Chrome con varias pestañas"""
+    scraper = preparar_scraper(crear_scraper, url, pestanas)
+    medidor = MedidorMemoria(lambda: [pid_navegador(scraper)])
+    medidor.start()
+    try:
+        inicio = time.perf_counter()
+        datos, con_datos = scraper.procesar_consultas(consultas, len(consultas))
+        segundos = time.perf_counter() - inicio
+    finally:
+        rss = medidor.detener()
+        scraper.cerrar_navegador()
+    return {'modo': f"{pestanas} pestañas", 'segundos': segundos, 'con_datos': con_datos, 'rss': rss}
+
+
+def medir_sesiones(crear_scraper, url, consultas, sesiones):
+    """Varias sesiones de Chrome independientes, una por hilo"""
+    scrapers = [None] * sesiones
+    resultados = [0] * sesiones
+    partes = repartir_consultas(consultas, sesiones)
+    listos = threading.Barrier(sesiones + 1)
+    fin = threading.Barrier(sesiones + 1)
+
+    def trabajar(n):
+        try:
+            scrapers[n] = preparar_scraper(crear_scraper, url)
+        finally:
+            listos.wait()
+        try:
+            _, resultados[n] = scrapers[n].procesar_consultas(partes[n], len(partes[n]))
+        finally:
+            fin.wait()
+
+    hilos = [threading.Thread(target=trabajar, args=(n,), daemon=True) for n in range(sesiones)]
+    for hilo in hilos:
+        hilo.start()
+
+    # Solo se mide desde que todos los navegadores están arrancados
+    listos.wait()
+    medidor = MedidorMemoria(lambda: [pid_navegador(s) for s in scrapers if s])
+    medidor.start()
+    inicio = time.perf_counter()
+    fin.wait()
+    segundos = time.perf_counter() - inicio
+    rss = medidor.detener()
+
+    for scraper in scrapers:
+        if scraper:
+            scraper.cerrar_navegador()
+    return {'modo': f"{sesiones} sesiones", 'segundos': segundos, 'con_datos': sum(resultados), 'rss': rss}
+
+
+def comparar_pestanas(crear_scraper, pestanas=4, retardo=0.5, hospitales=4, meses=6):
+    """Compara contra el simulador local: 1 sesión, 1 sesión con N pestañas y N sesiones"""
+    simulador = SimuladorLEQ(hospitales=max(hospitales, pestanas), retardo=retardo)
+    servidor, url = arrancar_simulador(simulador)
+
+    consultas = consultas_simulador(simulador, url, hospitales, meses)
+    print(f"\n\tSimulador en {url}: {len(consultas)} consultas, {retardo}s de respuesta por consulta\n")
+
+    try:
+        resultados = [
+            medir_pestanas(crear_scraper, url, consultas, 1),
+            medir_pestanas(crear_scraper, url, consultas, pestanas),
+            medir_sesiones(crear_scraper, url, consultas, pestanas)
+        ]
+    finally:
+        parar_simulador(servidor)
+
+    print(f"\t{'Modo':15} {'Segundos':>9} {'Consultas/s':>12} {'Con datos':>10} {'RSS navegador':>14}")
+    for resultado in resultados:
+        resultado['consultas'] = len(consultas)
+        resultado['consultas_por_segundo'] = len(consultas) / resultado['segundos'] if resultado['segundos'] else 0
+        rss = f"{resultado['rss'] / 2**20:.0f} MB" if resultado['rss'] else 'n/d'
+        print(f"\t{resultado['modo']:15} {resultado['segundos']:9.1f} {resultado['consultas_por_segundo']:12.2f} "
+              f"{resultado['con_datos']:10} {rss:>14}")
+
+    return resultados
+
+
+def comprobar_registros(simulador, consultas, datos):
+    """Consultas que deberían tener datos y registros correctos e incorrectos según el simulador"""
+    esperados = {}
+    for consulta in consultas:
+        especialidad = consulta['especialidad']
+        clave = (consulta['hospital']['nombre'], especialidad['nombre'] if especialidad else 'Todas', consulta['mes']['texto'])
+        esperados[clave] = simulador.pacientes(
+            consulta['hospital']['valor'], especialidad['valor'] if especialidad else '', consulta['mes']['valor']
+        )
+
+    correctos = incorrectos = 0
+    for registro in datos:
+        valor = esperados.get((registro['Filtro_Hospital'], registro['Filtro_Especialidad'], registro['Filtro_Mes']))
+        if valor is not None and registro['Pacientes_en_Lista'] == str(valor):
+            correctos += 1
+        else:
+            incorrectos += 1    # p. ej. los indicadores de la consulta anterior
+
+    return sum(valor is not None for valor in esperados.values()), correctos, incorrectos
+
+
+def medir_fallos(crear_scraper, perfil, fallos, pestanas=1, retardo=0.3, timeout=10, retardo_lento=None,
+                 hospitales=3, meses=6):
+    """Ejecuta el plan del simulador con un perfil de fallos y mide rendimiento y aciertos"""
+    simulador = SimuladorLEQ(
+        hospitales=hospitales, retardo=retardo, fallos=fallos,
+        retardo_lento=retardo_lento if retardo_lento is not None else 1.5 * timeout
+    )
+    servidor, url = arrancar_simulador(simulador)
+    consultas = consultas_simulador(simulador, url, hospitales, meses)
+
+    try:
+        scraper = preparar_scraper(crear_scraper, url, pestanas)
+        scraper.TIEMPO_TIMEOUT = timeout
+        try:
+            inicio = time.perf_counter()
+            datos, _ = scraper.procesar_consultas(consultas, len(consultas))
+            segundos = time.perf_counter() - inicio
+        finally:
+            scraper.cerrar_navegador()
+    finally:
+        parar_simulador(servidor)
+
+    esperadas, correctas, incorrectas = comprobar_registros(simulador, consultas, datos)
+    metricas = scraper.metricas.resumen()
+    return {
+        'perfil': perfil,
+        'fallos': fallos,
+        'inyectados': dict(simulador.inyectados),
+        'consultas': len(consultas),
+        'segundos': segundos,
+        'consultas_por_segundo': len(consultas) / segundos if segundos else 0,
+        'esperadas': esperadas,
+        'correctas': correctas,
+        'incorrectas': incorrectas,
+        'exito': correctas / esperadas if esperadas else None,
+        'resultados': metricas['resultados'],
+        'reintentos': metricas['reintentos'],
+        'latencia': metricas['latencia']
+    }
+
+
+def probar_recuperacion(crear_scraper, pestanas=1, retardo=0.3, timeout=10, hospitales=2, meses=6, caducar_en=(3,)):
+    """Caduca el ViewState en consultas concretas y comprueba que las siguientes vuelven a tener datos"""
+    simulador = SimuladorLEQ(hospitales=hospitales, retardo=retardo, caducar_en=caducar_en)
+    servidor, url = arrancar_simulador(simulador)
+    consultas = consultas_simulador(simulador, url, hospitales, meses)
+
+    try:
+        scraper = preparar_scraper(crear_scraper, url, pestanas)
+        scraper.TIEMPO_TIMEOUT = timeout
+        try:
+            datos, _ = scraper.procesar_consultas(consultas, len(consultas))
+        finally:
+            scraper.cerrar_navegador()
+    finally:
+        parar_simulador(servidor)
+
+    esperadas, correctas, incorrectas = comprobar_registros(simulador, consultas, datos)
+    recargas = scraper.metricas.resumen()['reintentos'].get('recarga', 0)
+    return {
+        'caducar_en': sorted(caducar_en),
+        'consultas': len(consultas),
+        'esperadas': esperadas,
+        'correctas': correctas,
+        'incorrectas': incorrectas,
+        'recargas': recargas,
+        # Sin recargar la página fallarían todas las consultas posteriores a la primera caducidad
+        'recuperada': recargas > 0 and not incorrectas and correctas >= esperadas - len(caducar_en)
+    }
+
+
+def probar_fallos(crear_scraper, perfiles=None, pestanas=1, retardo=0.3, timeout=10, retardo_lento=None,
+                  hospitales=3, meses=6, ruta_resultados=None):
+    """Prueba de carga contra el simulador con cada perfil de fallos: consultas/s, éxito y latencia de cola"""
+    perfiles = perfiles or list(PERFILES_FALLOS)
+    print(f"\n\t{len(perfiles)} perfiles de fallos, {pestanas} pestañas, timeout {timeout}s, "
+          f"{retardo}s de respuesta por consulta\n")
+
+    resultados = []
+    for perfil in perfiles:
+        print(f"\tPerfil {perfil}: {PERFILES_FALLOS[perfil] or 'sin fallos'}")
+        resultados.append(medir_fallos(
+            crear_scraper, perfil, PERFILES_FALLOS[perfil], pestanas=pestanas, retardo=retardo,
+            timeout=timeout, retardo_lento=retardo_lento, hospitales=hospitales, meses=meses
+        ))
+
+    def segundos(valor):
+        return f"{valor:.2f}" if valor is not None else 'n/d'
+
+    print(f"\n\t{'Perfil':13} {'Consultas/s':>12} {'Éxito':>7} {'Erróneas':>9} {'p50':>7} {'p90':>7} "
+          f"{'p99':>7} {'Máx':>7} {'Reintentos':>11}  Fallos inyectados")
+    for resultado in resultados:
+        latencia = resultado['latencia']
+        exito = f"{100 * resultado['exito']:.1f}%" if resultado['exito'] is not None else 'n/d'
+        inyectados = ', '.join(f"{fallo}={n}" for fallo, n in sorted(resultado['inyectados'].items())) or '-'
+        print(f"\t{resultado['perfil']:13} {resultado['consultas_por_segundo']:12.2f} {exito:>7} "
+              f"{resultado['incorrectas']:9} {segundos(latencia['p50']):>7} {segundos(latencia['p90']):>7} "
+              f"{segundos(latencia['p99']):>7} {segundos(latencia['maxima']):>7} "
+              f"{sum(resultado['reintentos'].values()):11}  {inyectados}")
+
+    # Con ViewState caducado: las consultas posteriores deben volver a funcionar tras recargar
+    recuperacion = None
+    if 'viewstate' in perfiles:
+        recuperacion = probar_recuperacion(
+            crear_scraper, pestanas=pestanas, retardo=retardo, timeout=timeout, hospitales=hospitales, meses=meses
+        )
+        marca = '✓' if recuperacion['recuperada'] else '✗'
+        print(f"\n\t{marca} ViewState caducado en la consulta {recuperacion['caducar_en']}: "
+              f"{recuperacion['correctas']}/{recuperacion['esperadas']} consultas con datos correctas, "
+              f"{recuperacion['recargas']} recargas del formulario")
+
+    if ruta_resultados:
+        with open(ruta_resultados, 'w', encoding='utf-8') as f:
+            json.dump({
+                'pestanas': pestanas, 'retardo': retardo, 'timeout': timeout, 'perfiles': resultados,
+                'recuperacion_viewstate': recuperacion
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n\tResultados en {ruta_resultados}")
+
+    return {'perfiles': resultados, 'recuperacion_viewstate': recuperacion}
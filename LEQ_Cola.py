@@ -0,0 +1,262 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ColaTrabajo:
+    """Cola de consultas compartida (SQLite) con leases y latidos"""
+
+    def __init__(self, ruta, max_intentos=3):
+        self.ruta = ruta
+        self.max_intentos = max_intentos
+        self.crear_tablas()
+
+    @contextmanager
+    def conectar(self):
+        """Abre una conexión nueva (una por operación, segura entre hilos)"""
+        conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+        conexion.row_factory = sqlite3.Row
+        try:
+            yield conexion
+        finally:
+            conexion.close()
+
+    def crear_tablas(self):
+        """Crea las tablas de la cola si no existen"""
+        with self.conectar() as conexion:
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS trabajos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    clave TEXT UNIQUE NOT NULL,
+                    url TEXT NOT NULL,
+                    hospital TEXT NOT NULL,
+                    mes TEXT NOT NULL,
+                    especialidad TEXT,
+                    estado TEXT NOT NULL DEFAULT 'pendiente',
+                    trabajador TEXT,
+                    lease_hasta REAL,
+                    intentos INTEGER NOT NULL DEFAULT 0,
+                    resultado TEXT,
+                    error TEXT,
+                    actualizado REAL
+                )
+            """)
+            conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_trabajos_estado ON trabajos (estado, lease_hasta)"
+            )
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS parametros (
+                    nombre TEXT PRIMARY KEY,
+                    valor TEXT
+                )
+            """)
+
+    def guardar_parametros(self, parametros):
+        """Guarda los parámetros de la ejecución (URL, años, filtro...)"""
+        with self.conectar() as conexion:
+            conexion.executemany(
+                "INSERT OR REPLACE INTO parametros (nombre, valor) VALUES (?, ?)",
+                [(nombre, json.dumps(valor, ensure_ascii=False)) for nombre, valor in parametros.items()]
+            )
+
+    def leer_parametros(self):
+        """Lee los parámetros de la ejecución"""
+        with self.conectar() as conexion:
+            filas = conexion.execute("SELECT nombre, valor FROM parametros").fetchall()
+        return {fila['nombre']: json.loads(fila['valor']) for fila in filas}
+
+    def encolar(self, consultas):
+        """Añade consultas a la cola (las claves repetidas se ignoran)"""
+        ahora = time.time()
+        with self.conectar() as conexion:
+            antes = conexion.total_changes
+            conexion.execute("BEGIN IMMEDIATE")
+            conexion.executemany(
+                """INSERT OR IGNORE INTO trabajos (clave, url, hospital, mes, especialidad, actualizado)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                [
+                    (
+                        consulta['clave'],
+                        consulta['url'],
+                        json.dumps(consulta['hospital'], ensure_ascii=False),
+                        json.dumps(consulta['mes'], ensure_ascii=False),
+                        json.dumps(consulta['especialidad'], ensure_ascii=False),
+                        ahora
+                    )
+                    for consulta in consultas
+                ]
+            )
+            conexion.execute("COMMIT")
+            return conexion.total_changes - antes
+
+    def reemitir_expirados(self):
+        """Devuelve a pendiente los trabajos cuyo lease ha expirado"""
+        ahora = time.time()
+        with self.conectar() as conexion:
+            conexion.execute("BEGIN IMMEDIATE")
+            conexion.execute(
+                """UPDATE trabajos SET estado = 'fallido', trabajador = NULL, lease_hasta = NULL,
+                          error = 'Lease expirado', actualizado = ?
+                   WHERE estado = 'asignado' AND lease_hasta < ? AND intentos >= ?""",
+                (ahora, ahora, self.max_intentos)
+            )
+            cursor = conexion.execute(
+                """UPDATE trabajos SET estado = 'pendiente', trabajador = NULL, lease_hasta = NULL, actualizado = ?
+                   WHERE estado = 'asignado' AND lease_hasta < ?""",
+                (ahora, ahora)
+            )
+            conexion.execute("COMMIT")
+            return cursor.rowcount
+
+    def reclamar(self, trabajador, lote=1, duracion_lease=120):
+        """Reclama hasta `lote` trabajos pendientes con un lease de `duracion_lease` segundos"""
+        ahora = time.time()
+        with self.conectar() as conexion:
+            conexion.execute("BEGIN IMMEDIATE")
+            # Agrupar por URL y hospital para evitar recargas y cambios de hospital
+            filas = conexion.execute(
+                """SELECT * FROM trabajos WHERE estado = 'pendiente'
+                   ORDER BY url, hospital, id LIMIT ?""",
+                (lote,)
+            ).fetchall()
+            conexion.executemany(
+                """UPDATE trabajos SET estado = 'asignado', trabajador = ?, lease_hasta = ?,
+                          intentos = intentos + 1, actualizado = ?
+                   WHERE id = ?""",
+                [(trabajador, ahora + duracion_lease, ahora, fila['id']) for fila in filas]
+            )
+            conexion.execute("COMMIT")
+
+        return [self.fila_a_trabajo(fila) for fila in filas]
+
+    def latido(self, trabajador, ids, duracion_lease=120):
+        """Extiende el lease de los trabajos que sigue procesando el trabajador"""
+        if not ids:
+            return 0
+        ahora = time.time()
+        marcas = ','.join('?' * len(ids))
+        with self.conectar() as conexion:
+            cursor = conexion.execute(
+                f"""UPDATE trabajos SET lease_hasta = ?, actualizado = ?
+                    WHERE trabajador = ? AND estado = 'asignado' AND id IN ({marcas})""",
+                (ahora + duracion_lease, ahora, trabajador, *ids)
+            )
+            return cursor.rowcount
+
+    def completar(self, id_trabajo, trabajador, datos):
+        """Publica el resultado de un trabajo"""
+        with self.conectar() as conexion:
+            cursor = conexion.execute(
+                """UPDATE trabajos SET estado = 'completado', lease_hasta = NULL, resultado = ?,
+                          error = NULL, actualizado = ?
+                   WHERE id = ? AND trabajador = ? AND estado = 'asignado'""",
+                (json.dumps(datos, ensure_ascii=False), time.time(), id_trabajo, trabajador)
+            )
+            return cursor.rowcount == 1
+
+    def fallar(self, id_trabajo, trabajador, error):
+        """Marca un trabajo como fallido o lo devuelve a la cola si le quedan intentos"""
+        with self.conectar() as conexion:
+            cursor = conexion.execute(
+                """UPDATE trabajos
+                   SET estado = CASE WHEN intentos >= ? THEN 'fallido' ELSE 'pendiente' END,
+                       trabajador = NULL, lease_hasta = NULL, error = ?, actualizado = ?
+                   WHERE id = ? AND trabajador = ? AND estado = 'asignado'""",
+                (self.max_intentos, str(error)[:500], time.time(), id_trabajo, trabajador)
+            )
+            return cursor.rowcount == 1
+
+    def resumen(self):
+        """Número de trabajos por estado"""
+        with self.conectar() as conexion:
+            filas = conexion.execute(
+                "SELECT estado, COUNT(*) AS total FROM trabajos GROUP BY estado"
+            ).fetchall()
+        return {fila['estado']: fila['total'] for fila in filas}
+
+    def quedan_trabajos(self):
+        """Indica si quedan trabajos pendientes o asignados"""
+        resumen = self.resumen()
+        return resumen.get('pendiente', 0) + resumen.get('asignado', 0) > 0
+
+    def resultados(self):
+        """Todos los registros extraídos por los trabajadores"""
+        with self.conectar() as conexion:
+            filas = conexion.execute(
+                "SELECT resultado FROM trabajos WHERE estado = 'completado' ORDER BY id"
+            ).fetchall()
+
+        todos_datos = []
+        for fila in filas:
+            todos_datos.extend(json.loads(fila['resultado']) or [])
+        return todos_datos
+
+    def estadisticas_por_hospital(self):
+        """Estadísticas por hospital con el mismo formato que `ejecutar`"""
+        estadisticas = {}
+        with self.conectar() as conexion:
+            filas = conexion.execute(
+                "SELECT hospital, estado, resultado FROM trabajos ORDER BY id"
+            ).fetchall()
+
+        for fila in filas:
+            nombre = json.loads(fila['hospital'])['nombre']
+            estad = estadisticas.setdefault(nombre, {
+                'Hospital': nombre,
+                'Consultas_Planificadas': 0,
+                'Consultas_Exitosas': 0,
+                'Registros': 0,
+                'Estado': 'Completado'
+            })
+            estad['Consultas_Planificadas'] += 1
+
+            datos = json.loads(fila['resultado']) if fila['resultado'] else []
+            if datos:
+                estad['Consultas_Exitosas'] += 1
+                estad['Registros'] += len(datos)
+            if fila['estado'] in ('pendiente', 'asignado'):
+                estad['Estado'] = 'En curso'
+
+        for estad in estadisticas.values():
+            if estad['Estado'] == 'Completado' and not estad['Registros']:
+                estad['Estado'] = 'Sin datos extraídos'
+
+        return list(estadisticas.values())
+
+    def fila_a_trabajo(self, fila):
+        """Convierte una fila de la tabla en un diccionario de trabajo"""
+        return {
+            'id': fila['id'],
+            'clave': fila['clave'],
+            'url': fila['url'],
+            'hospital': json.loads(fila['hospital']),
+            'mes': json.loads(fila['mes']),
+            'especialidad': json.loads(fila['especialidad']) if fila['especialidad'] else None
+        }
+
+
+class LatidoLease(threading.Thread):
+    """Hilo que renueva periódicamente los leases de un lote en curso"""
+
+    def __init__(self, cola, trabajador, ids, duracion_lease=120):
+        super().__init__(daemon=True)
+        self.cola = cola
+        self.trabajador = trabajador
+        self.ids = list(ids)
+        self.duracion_lease = duracion_lease
+        self.parar = threading.Event()
+
+    def run(self):
+        # Renovar con margen: tres latidos por lease
+        while not self.parar.wait(self.duracion_lease / 3):
+            try:
+                self.cola.latido(self.trabajador, self.ids, self.duracion_lease)
+            except sqlite3.Error:
+                continue
+
+    def detener(self):
+        """Detiene el hilo de latidos"""
+        self.parar.set()
+        self.join()
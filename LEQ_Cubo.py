@@ -0,0 +1,158 @@
+import os
+
+import pandas as pd
+
+
+# Clave de un hecho: una consulta (informe, hospital, especialidad, mes)
+CLAVES = ['Informe', 'Hospital', 'Especialidad', 'Fecha_Mes']
+
+# Niveles de agregación del cubo
+NIVELES = {
+    'hospital_especialidad': ['Informe', 'Hospital', 'Especialidad'],
+    'hospital': ['Informe', 'Hospital'],
+    'especialidad': ['Informe', 'Especialidad'],
+    'region': ['Informe']
+}
+
+# Métricas con delta mensual y medias móviles
+METRICAS_SERIE = ['Pacientes_Total', 'Demora_Ponderada']
+
+# Ventanas móviles en meses -> días que cubren exactamente esos meses naturales
+VENTANAS = {3: '63D', 12: '342D'}
+
+
+def hay_parquet():
+    """Indica si está disponible un motor de parquet (pyarrow)"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def guardar_tabla(df, ruta_base):
+    """Guarda una tabla en parquet si es posible; si no, en CSV"""
+    if hay_parquet():
+        ruta = f"{ruta_base}.parquet"
+        df.to_parquet(ruta, index=False)
+    else:
+        ruta = f"{ruta_base}.csv"
+        df.to_csv(ruta, index=False, encoding='utf-8-sig', sep=';')
+
+    # Eliminar la versión en el otro formato para no leer datos antiguos
+    for extension in ('.parquet', '.csv'):
+        otra = f"{ruta_base}{extension}"
+        if otra != ruta and os.path.exists(otra):
+            os.remove(otra)
+    return ruta
+
+
+def leer_tabla(ruta_base):
+    """Lee una tabla guardada con `guardar_tabla` (None si no existe)"""
+    if os.path.exists(f"{ruta_base}.parquet"):
+        return pd.read_parquet(f"{ruta_base}.parquet")
+    if os.path.exists(f"{ruta_base}.csv"):
+        return pd.read_csv(f"{ruta_base}.csv", sep=';', encoding='utf-8-sig', parse_dates=['Fecha_Mes'])
+    return None
+
+
+def preparar_hechos(df):
+    """Obtiene los hechos del cubo a partir del dataset normalizado"""
+    hechos = pd.DataFrame({
+        'Informe': df['URL'],
+        'Hospital': df['Filtro_Hospital'],
+        'Especialidad': df['Filtro_Especialidad'],
+        'Fecha_Mes': df['Fecha_Mes'],
+        'Pacientes_en_Lista': df['Pacientes_en_Lista'].astype('float64'),
+        'Demora_Media': df['Demora_Media'].astype('float64'),
+        'Fecha_Extraccion': df['Fecha_Extraccion']
+    })
+    hechos = hechos.dropna(subset=['Fecha_Mes'])
+
+    # La última extracción de cada consulta prevalece
+    return hechos.sort_values('Fecha_Extraccion').drop_duplicates(CLAVES, keep='last')
+
+
+def agregar_nivel(hechos, grupos):
+    """Agrega los hechos por grupo y mes y calcula deltas y medias móviles"""
+    hechos = hechos.assign(Demora_x_Pacientes=hechos['Demora_Media'] * hechos['Pacientes_en_Lista'])
+
+    agregado = hechos.groupby(grupos + ['Fecha_Mes'], dropna=False).agg(
+        Registros=('Pacientes_en_Lista', 'size'),
+        Pacientes_Total=('Pacientes_en_Lista', 'sum'),
+        Pacientes_Media=('Pacientes_en_Lista', 'mean'),
+        Demora_Media=('Demora_Media', 'mean'),
+        Demora_x_Pacientes=('Demora_x_Pacientes', 'sum')
+    ).reset_index()
+
+    # Demora media ponderada por número de pacientes
+    agregado['Demora_Ponderada'] = (
+        agregado['Demora_x_Pacientes'] / agregado['Pacientes_Total'].where(agregado['Pacientes_Total'] > 0)
+    )
+    agregado = agregado.drop(columns='Demora_x_Pacientes')
+    agregado = agregado.sort_values(grupos + ['Fecha_Mes']).reset_index(drop=True)
+
+    # El delta solo se calcula frente al mes natural anterior
+    numero_mes = agregado['Fecha_Mes'].dt.year * 12 + agregado['Fecha_Mes'].dt.month
+    meses_consecutivos = numero_mes.groupby([agregado[g] for g in grupos], dropna=False).diff() == 1
+
+    por_grupo = agregado.groupby(grupos, dropna=False, sort=False)
+    for metrica in METRICAS_SERIE:
+        agregado[f'{metrica}_Delta'] = por_grupo[metrica].diff().where(meses_consecutivos)
+
+        for meses, ventana in VENTANAS.items():
+            # Filas ordenadas por grupo y mes: el resultado sale en el mismo orden
+            movil = por_grupo.rolling(ventana, on='Fecha_Mes', min_periods=1)[metrica].mean()
+            agregado[f'{metrica}_MM{meses}'] = movil.to_numpy()
+
+    return agregado
+
+
+def filas_de_grupos(df, grupos, seleccion):
+    """Máscara de las filas de `df` cuyos grupos están en `seleccion`"""
+    marcadas = df[grupos].merge(seleccion.assign(Seleccionado=True), on=grupos, how='left')
+    return marcadas['Seleccionado'].fillna(False).astype(bool).to_numpy()
+
+
+def actualizar_cubo(directorio, df_nuevo):
+    """Incorpora nuevos datos al cubo recalculando solo los grupos afectados"""
+    os.makedirs(directorio, exist_ok=True)
+    ruta_hechos = os.path.join(directorio, 'hechos')
+    ruta_cubo = os.path.join(directorio, 'cubo')
+
+    hechos_nuevos = preparar_hechos(df_nuevo)
+    hechos_previos = leer_tabla(ruta_hechos)
+
+    if hechos_previos is not None:
+        hechos = pd.concat([hechos_previos, hechos_nuevos], ignore_index=True)
+        hechos = hechos.drop_duplicates(CLAVES, keep='last')
+    else:
+        hechos = hechos_nuevos
+
+    cubo_previo = leer_tabla(ruta_cubo)
+
+    partes = []
+    grupos_recalculados = 0
+    for nivel, grupos in NIVELES.items():
+        afectados = hechos_nuevos[grupos].drop_duplicates()
+        grupos_recalculados += len(afectados)
+
+        recalculado = agregar_nivel(hechos[filas_de_grupos(hechos, grupos, afectados)], grupos)
+        recalculado.insert(0, 'Nivel', nivel)
+
+        if cubo_previo is not None:
+            previo = cubo_previo[cubo_previo['Nivel'] == nivel]
+            partes.append(previo[~filas_de_grupos(previo, grupos, afectados)])
+        partes.append(recalculado)
+
+    cubo = pd.concat(partes, ignore_index=True)
+
+    guardar_tabla(hechos, ruta_hechos)
+    ruta = guardar_tabla(cubo, ruta_cubo)
+
+    return cubo, {
+        'ruta': ruta,
+        'hechos': len(hechos),
+        'filas_cubo': len(cubo),
+        'grupos_recalculados': grupos_recalculados
+    }
@@ -0,0 +1,133 @@
+import json
+import os
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+from LEQ_Plan import orden_mes
+
+
+NOMBRE_MANIFIESTO = '_manifiesto.json'
+
+# Una fila por consulta dentro de una partición (informe, año y mes ya están en la ruta)
+CLAVES_PARTICION = ['Filtro_Hospital', 'Filtro_Especialidad', 'Filtro_Mes']
+
+
+def ruta_particion(informe, ano, mes):
+    return f"report={informe}/year={ano:04d}/month={mes:02d}"
+
+
+def leer_manifiesto(directorio):
+    ruta = os.path.join(directorio, NOMBRE_MANIFIESTO)
+    if not os.path.exists(ruta):
+        return {'particiones': {}}
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def guardar_manifiesto(directorio, manifiesto):
+    """Sustituye el manifiesto de forma atómica (los lectores ven el anterior o el nuevo)"""
+    ruta = os.path.join(directorio, NOMBRE_MANIFIESTO)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+
+
+def particionar(df, informes):
+    """Añade informe, año y mes a cada fila (se descartan las que no se pueden ubicar)"""
+    ano_mes = df['Filtro_Mes'].astype(str).map(orden_mes)
+    # Los datos importados ya traen el informe; los de una ejecución se reconocen por la URL
+    informe = df['Informe'] if 'Informe' in df.columns else df['URL'].map(informes)
+    df = df.assign(
+        report=informe,
+        year=ano_mes.map(lambda am: am[0]),
+        month=ano_mes.map(lambda am: am[1])
+    )
+    validas = df['report'].notna() & (df['year'] > 0) & (df['month'] > 0)
+    return df[validas], int((~validas).sum())
+
+
+def escribir_particion(directorio, relativa, df_nuevo, actual=None):
+    """Fusiona los datos nuevos con los de la partición y publica un único archivo nuevo"""
+    carpeta = os.path.join(directorio, relativa)
+    os.makedirs(carpeta, exist_ok=True)
+
+    # Las consultas repetidas se sustituyen; las que no se volvieron a consultar se conservan
+    if actual and os.path.exists(os.path.join(carpeta, actual['archivo'])):
+        df_previo = pd.read_parquet(os.path.join(carpeta, actual['archivo']))
+        df_nuevo = pd.concat([df_previo, df_nuevo], ignore_index=True)
+    if 'Fecha_Extraccion' in df_nuevo.columns:
+        df_nuevo = df_nuevo.sort_values('Fecha_Extraccion', kind='stable')
+    df_nuevo = df_nuevo.drop_duplicates(
+        [c for c in CLAVES_PARTICION if c in df_nuevo.columns], keep='last'
+    )
+
+    # Nombre oculto ('_'/'.' los ignoran pyarrow y Spark) hasta que el archivo está completo
+    archivo = f"part-{uuid.uuid4().hex[:12]}.parquet"
+    temporal = os.path.join(carpeta, f"_{archivo}.tmp")
+    df_nuevo.to_parquet(temporal, index=False)
+    os.replace(temporal, os.path.join(carpeta, archivo))
+
+    return {
+        'archivo': archivo,
+        'filas': len(df_nuevo),
+        'bytes': os.path.getsize(os.path.join(carpeta, archivo)),
+        'actualizado': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def escribir_dataset(df, directorio, informes):
+    """Escribe el dataset particionado report=<n>/year=<yyyy>/month=<mm>/part-*.parquet"""
+    os.makedirs(directorio, exist_ok=True)
+    manifiesto = leer_manifiesto(directorio)
+    df, descartadas = particionar(df, informes)
+
+    publicadas = {}
+    for (informe, ano, mes), df_particion in df.groupby(['report', 'year', 'month']):
+        relativa = ruta_particion(int(informe), int(ano), int(mes))
+        publicadas[relativa] = escribir_particion(
+            directorio, relativa, df_particion.drop(columns=['report', 'year', 'month']),
+            manifiesto['particiones'].get(relativa)
+        )
+
+    # El manifiesto marca qué archivo es el vigente de cada partición: se cambia de una vez
+    anteriores = {relativa: manifiesto['particiones'].get(relativa) for relativa in publicadas}
+    manifiesto['particiones'].update(publicadas)
+    manifiesto['actualizado'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    guardar_manifiesto(directorio, manifiesto)
+
+    # Ya nadie debe leer los archivos sustituidos
+    for relativa, anterior in anteriores.items():
+        if anterior:
+            ruta = os.path.join(directorio, relativa, anterior['archivo'])
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+    return {
+        'particiones': len(publicadas),
+        'filas': sum(p['filas'] for p in publicadas.values()),
+        'descartadas': descartadas,
+        # Solo los archivos publicados ahora: el directorio acumula las particiones de otras ejecuciones
+        'archivos': [os.path.join(relativa, p['archivo']) for relativa, p in sorted(publicadas.items())],
+        'bytes': sum(p['bytes'] for p in publicadas.values())
+    }
+
+
+def leer_dataset(directorio, informe=None, anos=None, meses=None):
+    """Lee solo las particiones que cumplen el filtro (según el manifiesto)"""
+    partes = []
+    for relativa, particion in sorted(leer_manifiesto(directorio)['particiones'].items()):
+        valores = dict(parte.split('=') for parte in relativa.split('/'))
+        if informe is not None and int(valores['report']) != informe:
+            continue
+        if anos and int(valores['year']) not in anos:
+            continue
+        if meses and int(valores['month']) not in meses:
+            continue
+
+        df = pd.read_parquet(os.path.join(directorio, relativa, particion['archivo']))
+        partes.append(df.assign(report=int(valores['report']), year=int(valores['year']), month=int(valores['month'])))
+
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
@@ -0,0 +1,213 @@
+import itertools
+import json
+import queue
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+class DemonioScraper:
+    """Cola de trabajos de scraping atendida por un pool de sesiones con el navegador caliente"""
+
+    def __init__(self, crear_scraper, sesiones=1, urls_precarga=()):
+        self.crear_scraper = crear_scraper
+        self.urls_precarga = list(urls_precarga)
+        self.cola = queue.Queue()
+        self.trabajos = {}      # id -> trabajo
+        self.activos = {}       # clave -> id de los trabajos en cola o en curso
+        self.bloqueo = threading.Lock()
+        self.contador = itertools.count(1)
+        self.bloqueo_salidas = threading.Lock()
+        self.hilos = [
+            threading.Thread(target=self.atender, args=(n,), name=f"sesion-{n}", daemon=True)
+            for n in range(1, sesiones + 1)
+        ]
+
+    def iniciar(self):
+        for hilo in self.hilos:
+            hilo.start()
+
+    def normalizar(self, parametros):
+        """Valida los parámetros de un trabajo (ValueError si no son válidos)"""
+        try:
+            informe = int(parametros['informe'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Falta 'informe' (1-4)")
+        if informe not in (1, 2, 3, 4):
+            raise ValueError(f"Informe no válido: {informe}")
+
+        anos = parametros.get('anos')
+        if isinstance(anos, int):
+            anos = [anos]
+        if not anos or not all(isinstance(ano, int) for ano in anos):
+            raise ValueError("Falta 'anos' (lista de años)")
+
+        return {
+            'informe': informe,
+            'anos': sorted(set(anos)),
+            'hospitales': str(parametros.get('hospitales', '')).strip(),
+            'especialidades': str(parametros.get('especialidades', '')).strip()
+        }
+
+    def encolar(self, parametros):
+        """Encola un trabajo; si ya hay uno igual pendiente o en curso devuelve ese (trabajo, nuevo)"""
+        parametros = self.normalizar(parametros)
+        clave = json.dumps(parametros, sort_keys=True)
+
+        with self.bloqueo:
+            if clave in self.activos:
+                return dict(self.trabajos[self.activos[clave]]), False
+
+            trabajo = {
+                'id': next(self.contador),
+                'estado': 'en_cola',
+                'parametros': parametros,
+                'creado': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'inicio': None,
+                'fin': None,
+                'sesion': None,
+                'resultado': None
+            }
+            self.trabajos[trabajo['id']] = trabajo
+            self.activos[clave] = trabajo['id']
+            copia = dict(trabajo)
+
+        self.cola.put((clave, trabajo['id']))
+        return copia, True
+
+    def nueva_sesion(self, numero):
+        """Scraper de una sesión con el navegador arrancado y los catálogos precargados"""
+        scraper = self.crear_scraper()
+        scraper.conservar_navegador = True
+        scraper.logging_asincrono = True
+        scraper.nombre_logger = f"LEQ.sesion{numero}"
+        scraper.bloqueo_salidas = self.bloqueo_salidas
+        scraper.precalentar_navegador(self.urls_precarga)
+        return scraper
+
+    def atender(self, numero):
+        scraper = self.nueva_sesion(numero)
+
+        while True:
+            elemento = self.cola.get()
+            if elemento is None:
+                break
+
+            clave, id_trabajo = elemento
+            with self.bloqueo:
+                trabajo = self.trabajos[id_trabajo]
+                trabajo.update({
+                    'estado': 'en_curso',
+                    'sesion': numero,
+                    'inicio': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                })
+                parametros = trabajo['parametros']
+
+            try:
+                if scraper is None:
+                    scraper = self.nueva_sesion(numero)
+
+                scraper.parametros_cli = parametros
+                scraper.ejecutar()
+                resultado = scraper.ultima_ejecucion or {'estado': 'error', 'error': 'Sin resultado'}
+            except Exception as e:
+                resultado = {'estado': 'error', 'error': str(e)}
+
+            # Tras un error el navegador puede haber quedado inservible: la sesión se recrea
+            if resultado['estado'] == 'error' and scraper is not None:
+                scraper.cerrar_navegador()
+                scraper = None
+
+            with self.bloqueo:
+                trabajo.update({
+                    'estado': resultado['estado'],
+                    'resultado': resultado,
+                    'fin': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                })
+                self.activos.pop(clave, None)
+
+        if scraper is not None:
+            scraper.cerrar_navegador()
+
+    def listar(self):
+        with self.bloqueo:
+            return [dict(trabajo) for trabajo in self.trabajos.values()]
+
+    def consultar(self, id_trabajo):
+        """Copia del estado de un trabajo (None si no existe)"""
+        with self.bloqueo:
+            trabajo = self.trabajos.get(id_trabajo)
+            return dict(trabajo) if trabajo else None
+
+    def estado(self):
+        with self.bloqueo:
+            por_estado = {}
+            for trabajo in self.trabajos.values():
+                por_estado[trabajo['estado']] = por_estado.get(trabajo['estado'], 0) + 1
+            return {
+                'sesiones': len(self.hilos),
+                'en_cola': self.cola.qsize(),
+                'trabajos': por_estado
+            }
+
+    def detener(self):
+        """Termina los trabajos en curso, detiene las sesiones y cierra los navegadores"""
+        for _ in self.hilos:
+            self.cola.put(None)
+        for hilo in self.hilos:
+            hilo.join()
+
+
+class ManejadorDemonio(BaseHTTPRequestHandler):
+    """POST /trabajos, GET /trabajos, GET /trabajos/<id>, GET /estado"""
+
+    demonio = None
+
+    def responder(self, codigo, contenido):
+        contenido = json.dumps(contenido, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def do_GET(self):
+        ruta = urlparse(self.path).path.rstrip('/')
+
+        if ruta == '/estado':
+            self.responder(200, self.demonio.estado())
+        elif ruta == '/trabajos':
+            self.responder(200, self.demonio.listar())
+        elif ruta.startswith('/trabajos/') and ruta.rsplit('/', 1)[1].isdigit():
+            trabajo = self.demonio.consultar(int(ruta.rsplit('/', 1)[1]))
+            if trabajo:
+                self.responder(200, trabajo)
+            else:
+                self.responder(404, {'error': f"Trabajo no encontrado: {ruta}"})
+        else:
+            self.responder(404, {'error': f"Ruta no encontrada: {ruta}"})
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') != '/trabajos':
+            self.responder(404, {'error': f"Ruta no encontrada: {self.path}"})
+            return
+
+        try:
+            longitud = int(self.headers.get('Content-Length', 0))
+            trabajo, nuevo = self.demonio.encolar(json.loads(self.rfile.read(longitud) or b'{}'))
+        except (ValueError, AttributeError) as e:
+            self.responder(400, {'error': str(e)})
+            return
+
+        self.responder(202 if nuevo else 200, {'trabajo': trabajo, 'nuevo': nuevo})
+
+    def log_message(self, formato, *args):
+        # Sin log por petición en la consola
+        pass
+
+
+def crear_servidor_demonio(demonio, host='127.0.0.1', puerto=8766):
+    """Crea el servidor HTTP que recibe los trabajos del demonio"""
+    manejador = type('ManejadorLEQDemonio', (ManejadorDemonio,), {'demonio': demonio})
+    return ThreadingHTTPServer((host, puerto), manejador)
@@ -0,0 +1,26 @@
+import importlib
+
+
+class ObjetoDiferido:
+    """Importa un módulo (o un atributo suyo) la primera vez que se usa"""
+
+    def __init__(self, modulo, atributo=None):
+        self.modulo = modulo
+        self.atributo = atributo
+        self.objeto = None
+
+    def cargar(self):
+        """Realiza la importación real"""
+        if self.objeto is None:
+            objeto = importlib.import_module(self.modulo)
+            if self.atributo:
+                objeto = getattr(objeto, self.atributo)
+            self.objeto = objeto
+        return self.objeto
+
+    def __getattr__(self, nombre):
+        # Solo se llama para atributos que no son propios del proxy
+        return getattr(self.cargar(), nombre)
+
+    def __call__(self, *args, **kwargs):
+        return self.cargar()(*args, **kwargs)
@@ -0,0 +1,108 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+
+
+class MapaDispersion:
+    """Combinaciones (informe, hospital, especialidad, mes) que devolvieron vacío en ejecuciones anteriores"""
+
+    def __init__(self, ruta, min_vacios=2, dias_reprueba=30, dias_reprueba_max=180, modo='omitir'):
+        self.ruta = ruta
+        self.min_vacios = min_vacios                # vacíos seguidos antes de empezar a omitir
+        self.dias_reprueba = dias_reprueba          # tras este tiempo se vuelve a probar
+        self.dias_reprueba_max = dias_reprueba_max  # el intervalo se duplica en cada vacío, hasta este máximo
+        self.modo = modo                            # 'omitir' o 'posponer' (al final del hospital)
+        self.vacios = {}
+        self.pendientes = {}
+        self.crear_tablas()
+        self.cargar()
+
+    @contextmanager
+    def conectar(self):
+        """Abre una conexión nueva"""
+        conexion = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            yield conexion
+        finally:
+            conexion.close()
+
+    def crear_tablas(self):
+        with self.conectar() as conexion:
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS vacios (
+                    clave TEXT PRIMARY KEY,
+                    veces INTEGER NOT NULL,
+                    primer_vacio REAL NOT NULL,
+                    ultimo_vacio REAL NOT NULL
+                )
+            """)
+            conexion.commit()
+
+    def cargar(self):
+        """Carga el mapa en memoria (una lectura por ejecución)"""
+        with self.conectar() as conexion:
+            filas = conexion.execute("SELECT clave, veces, primer_vacio, ultimo_vacio FROM vacios").fetchall()
+        self.vacios = {
+            clave: {'veces': veces, 'primer_vacio': primer, 'ultimo_vacio': ultimo}
+            for clave, veces, primer, ultimo in filas
+        }
+
+    def es_vacia(self, clave, ahora=None):
+        """Indica si la combinación se considera vacía y aún no toca volver a probarla"""
+        entrada = self.vacios.get(clave)
+        if not entrada or entrada['veces'] < self.min_vacios:
+            return False
+
+        ahora = ahora or time.time()
+        dias = min(self.dias_reprueba * 2 ** (entrada['veces'] - self.min_vacios), self.dias_reprueba_max)
+        return ahora - entrada['ultimo_vacio'] < dias * 86400
+
+    def filtrar(self, consultas):
+        """Devuelve (consultas a ejecutar, número de omitidas) según el modo"""
+        ahora = time.time()
+        normales = []
+        vacias = []
+        for consulta in consultas:
+            (vacias if self.es_vacia(consulta['clave'], ahora) else normales).append(consulta)
+
+        if self.modo == 'posponer':
+            return normales + vacias, 0
+        return normales, len(vacias)
+
+    def registrar(self, clave, con_datos):
+        """Anota el resultado de una consulta (se guarda con `guardar`)"""
+        ahora = time.time()
+        if con_datos:
+            if clave in self.vacios:
+                del self.vacios[clave]
+                self.pendientes[clave] = None
+            return
+
+        entrada = self.vacios.get(clave)
+        if entrada:
+            entrada['veces'] += 1
+            entrada['ultimo_vacio'] = ahora
+        else:
+            entrada = {'veces': 1, 'primer_vacio': ahora, 'ultimo_vacio': ahora}
+            self.vacios[clave] = entrada
+        self.pendientes[clave] = entrada
+
+    def guardar(self):
+        """Escribe en disco los cambios pendientes"""
+        if not self.pendientes:
+            return
+
+        with self.conectar() as conexion:
+            conexion.executemany(
+                "DELETE FROM vacios WHERE clave = ?",
+                [(clave,) for clave, entrada in self.pendientes.items() if entrada is None]
+            )
+            conexion.executemany(
+                "INSERT OR REPLACE INTO vacios (clave, veces, primer_vacio, ultimo_vacio) VALUES (?, ?, ?, ?)",
+                [
+                    (clave, entrada['veces'], entrada['primer_vacio'], entrada['ultimo_vacio'])
+                    for clave, entrada in self.pendientes.items() if entrada is not None
+                ]
+            )
+            conexion.commit()
+        self.pendientes = {}
@@ -0,0 +1,96 @@
+import csv
+import io
+import math
+import statistics
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por interpolación lineal (None sin valores)"""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * p / 100
+    inferior = math.floor(posicion)
+    superior = math.ceil(posicion)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+def contar_postbacks(consultas, con_postback=('Hospital',)):
+    """Postbacks que generará el plan en el orden de ejecución (Buscar + cada cambio de un desplegable con postback)"""
+    postbacks = 0
+    hospital = mes = especialidad = None
+
+    for consulta in consultas:
+        if consulta['hospital']['nombre'] != hospital:
+            hospital = consulta['hospital']['nombre']
+            mes = especialidad = None    # el formulario se repuebla al cambiar de hospital
+            postbacks += 'Hospital' in con_postback
+
+        if consulta['especialidad'] and consulta['especialidad']['valor'] != especialidad:
+            especialidad = consulta['especialidad']['valor']
+            postbacks += 'Especialidad' in con_postback
+
+        if consulta['mes']['valor'] != mes:
+            mes = consulta['mes']['valor']
+            postbacks += 'Fecha' in con_postback
+
+        postbacks += 1    # btnEnviar
+
+    return postbacks
+
+
+def bytes_por_registro(registros):
+    """Tamaño medio de una fila en el CSV exportado (separador ';')"""
+    if not registros:
+        return 0
+    salida = io.StringIO()
+    escritor = csv.writer(salida, delimiter=';')
+    for registro in registros:
+        escritor.writerow(registro.values())
+    return len(salida.getvalue().encode('utf-8')) / len(registros)
+
+
+def proyectar_tiempos(segundos_secuencial, trabajadores):
+    """Tiempo de pared con 1..N trabajadores (reparto ideal, sin saturar el servidor)"""
+    return {n: segundos_secuencial / n for n in range(1, trabajadores + 1)}
+
+
+def formatear_duracion(segundos):
+    horas, resto = divmod(int(round(segundos)), 3600)
+    minutos, segundos = divmod(resto, 60)
+    return f"{horas}h {minutos:02d}m {segundos:02d}s" if horas else f"{minutos}m {segundos:02d}s"
+
+
+def estimar_ejecucion(consultas, latencias_consulta, latencias_hospital, registros, medidas,
+                      con_postback=('Hospital',), trabajadores=8):
+    """Proyección de una ejecución completa a partir de una muestra de consultas reales"""
+    cambios_hospital = len({consulta['hospital']['nombre'] for consulta in consultas})
+    consulta_media = statistics.mean(latencias_consulta) if latencias_consulta else 0
+    consulta_p90 = percentil(latencias_consulta, 90) or 0
+    hospital_medio = statistics.mean(latencias_hospital) if latencias_hospital else 0
+
+    secuencial = len(consultas) * consulta_media + cambios_hospital * hospital_medio
+    secuencial_p90 = len(consultas) * consulta_p90 + cambios_hospital * hospital_medio
+
+    tasa_datos = len(registros) / medidas if medidas else 0
+    registros_esperados = round(len(consultas) * tasa_datos)
+    tamano_fila = bytes_por_registro(registros)
+
+    return {
+        'consultas': len(consultas),
+        'hospitales': cambios_hospital,
+        'postbacks': contar_postbacks(consultas, con_postback),
+        'muestra': medidas,
+        'latencia_consulta': {
+            'media': consulta_media,
+            'p50': percentil(latencias_consulta, 50),
+            'p90': consulta_p90,
+            'max': max(latencias_consulta) if latencias_consulta else None
+        },
+        'latencia_cambio_hospital': hospital_medio,
+        'tasa_con_datos': tasa_datos,
+        'registros_esperados': registros_esperados,
+        'bytes_csv_esperados': round(registros_esperados * tamano_fila),
+        'segundos_por_trabajadores': proyectar_tiempos(secuencial, trabajadores),
+        'segundos_por_trabajadores_p90': proyectar_tiempos(secuencial_p90, trabajadores)
+    }
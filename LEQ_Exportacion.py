@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+
+CARACTERES_INVALIDOS = ['<', '>', ':', '"', '/', '\\', '|', '?', '*', '[', ']']
+
+
+def limpiar_nombre_hoja(nombre, longitud=31):
+    """Limpia el nombre para usarlo como hoja de Excel (o como nombre de archivo con longitud=None)"""
+    nombre_limpio = str(nombre)
+
+    for char in CARACTERES_INVALIDOS:
+        nombre_limpio = nombre_limpio.replace(char, '_')
+
+    # Limitar longitud para Excel (31 caracteres máximo)
+    return nombre_limpio[:longitud]
+
+
+def escribir_libro(df, ruta, estadisticas=None, resumen=None, hoja_principal='Datos_Completos',
+                   por_hospital=True, por_especialidad=True):
+    """Escribe un libro Excel con la hoja principal y una hoja por hospital y por especialidad"""
+    with pd.ExcelWriter(ruta, engine='openpyxl') as writer:
+        # Hoja principal
+        df.to_excel(writer, sheet_name=hoja_principal, index=False)
+
+        # Hoja por hospital
+        if por_hospital and 'Filtro_Hospital' in df.columns:
+            for hospital, df_hospital in df.groupby('Filtro_Hospital', sort=False):
+                df_hospital.to_excel(writer, sheet_name=limpiar_nombre_hoja(hospital), index=False)
+
+        # Hoja por especialidad (si existe)
+        if por_especialidad and 'Filtro_Especialidad' in df.columns:
+            for especialidad, df_especialidad in df.groupby('Filtro_Especialidad', sort=False):
+                df_especialidad.to_excel(
+                    writer, sheet_name=f"Esp_{limpiar_nombre_hoja(especialidad)}", index=False
+                )
+
+        # Hoja de estadísticas
+        if estadisticas:
+            pd.DataFrame(estadisticas).to_excel(writer, sheet_name='Estadisticas', index=False)
+
+        # Hoja de resumen
+        if resumen:
+            pd.DataFrame({clave: [valor] for clave, valor in resumen.items()}).to_excel(
+                writer, sheet_name='Resumen', index=False
+            )
+
+    return ruta
+
+
+def escribir_libro_hospital(df_hospital, ruta):
+    """Libro de un solo hospital: todos sus datos y una hoja por especialidad"""
+    return escribir_libro(df_hospital, ruta, hoja_principal='Datos', por_hospital=False)
+
+
+def escribir_csv(df, ruta):
+    df.to_csv(ruta, index=False, encoding='utf-8-sig', sep=';')
+    return ruta
+
+
+def escribir_parquet(df, ruta):
+    df.to_parquet(ruta, index=False)
+    return ruta
+
+
+def escribir_json(df, ruta):
+    df.to_json(ruta, orient='records', force_ascii=False, indent=2, date_format='iso')
+    return ruta
+
+
+def cronometrar(funcion, *args):
+    """Ejecuta la función y devuelve (resultado, segundos)"""
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def exportar_en_paralelo(tareas, procesos=None, mientras=None):
+    """Ejecuta a la vez las tareas {nombre: (funcion, args, en_proceso)} y devuelve {nombre: {'ruta', 'segundos', 'error'}}"""
+    # Excel (openpyxl, Python puro) va a procesos; CSV/parquet/JSON liberan el GIL y van a hilos
+    en_proceso = {nombre: tarea for nombre, tarea in tareas.items() if tarea[2]}
+    en_hilo = {nombre: tarea for nombre, tarea in tareas.items() if not tarea[2]}
+
+    futuros = {}
+    # 'spawn': el proceso principal tiene hilos (navegador, logging) y no es seguro hacer fork
+    with ProcessPoolExecutor(
+        max_workers=procesos or min(len(en_proceso), os.cpu_count() or 1) or 1,
+        mp_context=multiprocessing.get_context('spawn')
+    ) as pool_procesos, ThreadPoolExecutor(max_workers=len(en_hilo) or 1) as pool_hilos:
+        for nombre, (funcion, args, _) in en_proceso.items():
+            futuros[nombre] = pool_procesos.submit(cronometrar, funcion, *args)
+        for nombre, (funcion, args, _) in en_hilo.items():
+            futuros[nombre] = pool_hilos.submit(cronometrar, funcion, *args)
+
+        # Trabajo del hilo principal mientras se escriben los archivos
+        if mientras:
+            mientras()
+
+        resultados = {}
+        for nombre, futuro in futuros.items():
+            try:
+                ruta, segundos = futuro.result()
+                resultados[nombre] = {'ruta': ruta, 'segundos': segundos, 'error': None}
+            except Exception as e:
+                resultados[nombre] = {'ruta': None, 'segundos': None, 'error': str(e)}
+
+    return resultados
@@ -0,0 +1,162 @@
+PREFIJO_ID = 'ContenedorContenidoSeccion_'
+
+# Dimensiones ya conocidas: conservan las columnas que usan la normalización y el cubo
+COLUMNAS_CONOCIDAS = {
+    'Hospital': 'Filtro_Hospital',
+    'Especialidad': 'Filtro_Especialidad',
+    'Fecha': 'Filtro_Mes'
+}
+
+# Todos los <select> del formulario con sus opciones en una sola llamada al navegador
+SCRIPT_SELECTS = """
+return Array.from(document.querySelectorAll('select[id]')).map(function (s) {
+    return {
+        id: s.id,
+        postback: /__doPostBack|AutoPostBack/i.test(s.getAttribute('onchange') || ''),
+        valor: s.value,
+        opciones: Array.from(s.options).map(function (o, i) { return [i, o.text.trim(), o.value]; })
+    };
+});
+"""
+
+SCRIPT_OPCIONES = """
+var s = document.getElementById(arguments[0]);
+return s ? Array.from(s.options).map(function (o, i) { return [i, o.text.trim(), o.value]; }) : [];
+"""
+
+
+def nombre_dimension(element_id):
+    """'ContenedorContenidoSeccion_ddlHospital' -> 'Hospital'"""
+    nombre = element_id.replace(PREFIJO_ID, '')
+    return nombre[3:] if nombre.lower().startswith('ddl') else nombre
+
+
+def columna_dimension(nombre):
+    return COLUMNAS_CONOCIDAS.get(nombre, f"Filtro_{nombre}")
+
+
+def convertir_opciones(crudas):
+    """Opciones con valor y texto (se descartan las de 'Seleccione...' sin valor)"""
+    return [
+        {'indice': indice, 'nombre': texto, 'valor': valor}
+        for indice, texto, valor in crudas if valor and texto
+    ]
+
+
+class Formulario:
+    """Dimensiones (<select>) de un formulario de informe y las dependencias entre ellas"""
+
+    def __init__(self, driver, timeout=10):
+        self.driver = driver
+        self.timeout = timeout
+        self.selecciones = 0    # selecciones realmente enviadas al navegador
+
+    def describir(self):
+        """Descubre todas las dimensiones del formulario"""
+        dimensiones = []
+        for select in self.driver.execute_script(SCRIPT_SELECTS):
+            nombre = nombre_dimension(select['id'])
+            dimensiones.append({
+                'id': select['id'],
+                'nombre': nombre,
+                'columna': columna_dimension(nombre),
+                'postback': select['postback'],
+                'opciones': convertir_opciones(select['opciones']),
+                'depende_de': []
+            })
+        return dimensiones
+
+    def opciones(self, dimension):
+        """Opciones actuales de una dimensión (cambian si depende de otra)"""
+        return convertir_opciones(self.driver.execute_script(SCRIPT_OPCIONES, dimension['id']))
+
+    def valor_actual(self, dimension):
+        return self.driver.execute_script(
+            "var s = document.getElementById(arguments[0]); return s ? s.value : null;", dimension['id']
+        )
+
+    def seleccionar(self, dimension, valor):
+        """Selecciona un valor solo si no es el actual; espera al postback si lo hay"""
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import Select, WebDriverWait
+
+        if self.valor_actual(dimension) == valor:
+            return False
+
+        elemento = self.driver.find_element(By.ID, dimension['id'])
+        Select(elemento).select_by_value(valor)
+        self.selecciones += 1
+
+        if dimension['postback']:
+            try:
+                WebDriverWait(self.driver, self.timeout).until(EC.staleness_of(elemento))
+            except TimeoutException:
+                pass  # postback parcial que no reemplaza el elemento
+        return True
+
+    def descubrir_dependencias(self, dimensiones):
+        """Detecta qué dimensiones se repueblan al cambiar otra y las ordena (padres primero)"""
+        for padre in dimensiones:
+            if not padre['postback'] or len(padre['opciones']) < 2:
+                continue
+
+            original = self.valor_actual(padre)
+            antes = {d['id']: self.opciones(d) for d in dimensiones if d is not padre}
+
+            # Probar con una opción distinta de la actual
+            prueba = next(o['valor'] for o in padre['opciones'] if o['valor'] != original)
+            self.seleccionar(padre, prueba)
+
+            for dimension in dimensiones:
+                if dimension is not padre and self.opciones(dimension) != antes[dimension['id']]:
+                    dimension['depende_de'].append(padre['id'])
+
+            if original:
+                self.seleccionar(padre, original)
+
+        return ordenar_dimensiones(dimensiones)
+
+
+def ordenar_dimensiones(dimensiones):
+    """Orden del recorrido: padres antes que hijos, dimensiones con postback fuera y el resto dentro"""
+    pendientes = list(dimensiones)
+    ordenadas = []
+
+    while pendientes:
+        colocadas = {d['id'] for d in ordenadas}
+        listas = [d for d in pendientes if all(padre in colocadas for padre in d['depende_de'])]
+        if not listas:
+            listas = pendientes[:1]  # dependencia circular: se rompe en el orden de la página
+        # Entre las disponibles, primero las que provocan postback (cambiarlas es lo más caro)
+        siguiente = sorted(listas, key=lambda d: not d['postback'])[0]
+        ordenadas.append(siguiente)
+        pendientes.remove(siguiente)
+
+    return ordenadas
+
+
+def estimar_consultas(dimensiones, opciones_elegidas):
+    """Consultas del plan cartesiano (con las opciones actuales de las dimensiones dependientes)"""
+    total = 1
+    for dimension in dimensiones:
+        total *= len(opciones_elegidas(dimension, dimension['opciones']))
+    return total
+
+
+# Pulsa Buscar fuera de la llamada (el navegador no espera a la respuesta) y marca el span actual:
+# la respuesta ha llegado cuando hay un span de indicadores sin la marca
+SCRIPT_ENVIAR_SIN_ESPERA = """
+var span = document.getElementById('ContenedorContenidoSeccion_lblIndicadores');
+if (span) { span.setAttribute('data-leq-enviado', '1'); }
+setTimeout(function () { document.getElementById('ContenedorContenidoSeccion_btnEnviar').click(); }, 0);
+"""
+
+# null = aún sin respuesta; false = página de error sin formulario (hay que recargarla)
+SCRIPT_RESPUESTA = """
+var span = document.getElementById('ContenedorContenidoSeccion_lblIndicadores');
+if (document.readyState === 'complete' && !document.getElementById('ContenedorContenidoSeccion_ddlHospital')) { return false; }
+if (document.readyState !== 'complete' || !span || span.hasAttribute('data-leq-enviado')) { return null; }
+return span.textContent.trim() !== '' ? span.innerHTML : null;
+"""
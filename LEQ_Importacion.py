@@ -0,0 +1,135 @@
+import glob
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from LEQ_Normalizacion import leer_csv_datos, normalizar_dataset
+
+
+# Carpetas de ejecución: LEQ_<informe>_<AAAAMMDD>_<HHMMSS>[_N]
+PATRON_CARPETA = re.compile(r'^LEQ_(?P<informe>.+)_(?P<fecha>\d{8}_\d{6})(?:_\d+)?$')
+
+# Columnas comunes a v1 y vIA (el resto, como Texto_Completo, no se importa)
+COLUMNAS = [
+    'Fecha_Extraccion', 'URL', 'Filtro_Mes', 'Filtro_Hospital', 'Filtro_Especialidad',
+    'Año', 'Mes', 'Pacientes_en_Lista', 'Demora_Media'
+]
+
+# Hoja principal del Excel: vIA y v1
+HOJAS_DATOS = ['Datos_Completos', 'Todos_Datos']
+
+# Nombres exactos de los consolidados; los derivados (_normalizado, _reparseado...) repiten sus datos
+PATRON_DATOS = re.compile(r'^Datos_(?:Completos|Filtrados(?:_\d{4})+)$')
+
+CLAVES_HISTORICO = ['Informe', 'Filtro_Hospital', 'Filtro_Especialidad', 'Año', 'Mes_Numero']
+
+
+def nombre_carpeta_informe(texto):
+    """Parte del nombre de carpeta que generan v1 (nombre) y vIA (nombre_file)"""
+    return texto.replace(' ', '_').replace('.', '')
+
+
+def descubrir_carpetas(raiz):
+    """Carpetas de ejecuciones LEQ_* bajo `raiz` (un nivel), de la más antigua a la más reciente"""
+    carpetas = []
+    for nombre in os.listdir(raiz):
+        coincidencia = PATRON_CARPETA.match(nombre)
+        if coincidencia and os.path.isdir(os.path.join(raiz, nombre)):
+            carpetas.append((coincidencia.group('fecha'), os.path.join(raiz, nombre)))
+    return [carpeta for _, carpeta in sorted(carpetas)]
+
+
+def archivos_datos(carpeta, extension):
+    """Archivos consolidados de una ejecución (Datos_Completos / Datos_Filtrados_*), sin los derivados"""
+    return sorted(
+        ruta for ruta in glob.glob(os.path.join(carpeta, f"Datos_*{extension}"))
+        if PATRON_DATOS.match(os.path.basename(ruta)[:-len(extension)])
+    )
+
+
+def leer_excel_datos(ruta):
+    """Hoja principal de un libro de v1 o vIA (None si no tiene ninguna conocida)"""
+    hojas = pd.ExcelFile(ruta).sheet_names
+    hoja = next((h for h in HOJAS_DATOS if h in hojas), None)
+    if hoja is None:
+        return None
+    return pd.read_excel(ruta, sheet_name=hoja, dtype=str, usecols=lambda columna: columna in COLUMNAS)
+
+
+def leer_carpeta(carpeta, informes):
+    """Lee una carpeta de ejecución (CSV y, solo si hace falta, Excel) con el esquema común"""
+    partes = []
+    origen = None
+
+    for ruta in archivos_datos(carpeta, '.csv'):
+        try:
+            df = leer_csv_datos(ruta, COLUMNAS)
+        except Exception:
+            continue
+        if {'Filtro_Hospital', 'Filtro_Mes'} <= set(df.columns):
+            partes.append(df)
+            origen = 'csv'
+
+    if not partes:
+        for ruta in archivos_datos(carpeta, '.xlsx'):
+            try:
+                df = leer_excel_datos(ruta)
+            except Exception:
+                continue
+            if df is not None:
+                partes.append(df)
+                origen = 'xlsx'
+
+    if not partes:
+        return None, None
+
+    df = pd.concat(partes, ignore_index=True).reindex(columns=COLUMNAS)
+
+    # Informe: por la URL de cada registro o, si no se reconoce, por el nombre de la carpeta
+    por_carpeta = informes['carpetas'].get(PATRON_CARPETA.match(os.path.basename(carpeta)).group('informe'))
+    df['Informe'] = df['URL'].map(informes['urls']).fillna(por_carpeta).astype('Int64')
+    df['Carpeta_Origen'] = os.path.basename(carpeta)
+
+    return df, origen
+
+
+def importar_carpetas(carpetas, informes, procesos=None, al_leer=None):
+    """Lee todas las carpetas en paralelo y devuelve el histórico normalizado y sin duplicados"""
+    leidas = {}
+    errores = {}
+
+    # 'spawn' como en la exportación: no se hereda el estado de hilos del proceso principal
+    with ProcessPoolExecutor(
+        max_workers=procesos or os.cpu_count() or 1,
+        mp_context=multiprocessing.get_context('spawn')
+    ) as pool:
+        futuros = {pool.submit(leer_carpeta, carpeta, informes): carpeta for carpeta in carpetas}
+        for futuro in as_completed(futuros):
+            carpeta = futuros[futuro]
+            try:
+                df, origen = futuro.result()
+            except Exception as e:
+                errores[carpeta] = str(e)
+                df, origen = None, None
+            if df is not None:
+                leidas[carpeta] = df
+            if al_leer:
+                al_leer(carpeta, origen, 0 if df is None else len(df))
+
+    # En el orden de las carpetas: a igual fecha de extracción gana la ejecución más reciente
+    partes = [leidas[carpeta] for carpeta in carpetas if carpeta in leidas]
+    if not partes:
+        return pd.DataFrame(columns=COLUMNAS), errores
+
+    historico = normalizar_dataset(pd.concat(partes, ignore_index=True))
+
+    # La última extracción de cada consulta prevalece
+    historico['Fecha_Extraccion'] = pd.to_datetime(historico['Fecha_Extraccion'], errors='coerce')
+    historico = historico.sort_values('Fecha_Extraccion', kind='stable', na_position='first')
+    historico = historico.drop_duplicates(CLAVES_HISTORICO, keep='last').reset_index(drop=True)
+    historico['Fecha_Extraccion'] = historico['Fecha_Extraccion'].dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    return historico, errores
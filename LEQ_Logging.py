@@ -0,0 +1,72 @@
+import json
+import logging
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+
+class FormateadorJSON(logging.Formatter):
+    """Formatea cada registro como una línea JSON con sus campos estructurados"""
+
+    def format(self, record):
+        datos = {
+            'fecha': self.formatTime(record, '%Y-%m-%d %H:%M:%S'),
+            'nivel': record.levelname,
+            'mensaje': record.getMessage().strip()
+        }
+        datos.update(getattr(record, 'campos', None) or {})
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class ConsolaLimitada(logging.StreamHandler):
+    """Consola con límite de mensajes por segundo (avisos y errores siempre se muestran)"""
+
+    def __init__(self, max_por_segundo=5, stream=None):
+        super().__init__(stream or sys.stdout)
+        self.max_por_segundo = max_por_segundo
+        self.inicio_ventana = time.monotonic()
+        self.mostrados = 0
+        self.omitidos = 0
+
+    def emit(self, record):
+        ahora = time.monotonic()
+        if ahora - self.inicio_ventana >= 1:
+            if self.omitidos:
+                self.stream.write(f"\t... {self.omitidos} mensajes omitidos (ver log)\n")
+            self.inicio_ventana = ahora
+            self.mostrados = 0
+            self.omitidos = 0
+
+        if record.levelno < logging.WARNING and self.mostrados >= self.max_por_segundo:
+            self.omitidos += 1
+            return
+
+        self.mostrados += 1
+        super().emit(record)
+
+
+def configurar_logging_asincrono(log_file, log_json, max_por_segundo=5, nombre='LEQ'):
+    """Configura un logger no bloqueante: QueueHandler + listener en segundo plano"""
+    cola = queue.Queue(-1)
+
+    handler_texto = logging.FileHandler(log_file, encoding='utf-8')
+    handler_texto.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    handler_json = logging.FileHandler(log_json, encoding='utf-8')
+    handler_json.setFormatter(FormateadorJSON())
+
+    handler_consola = ConsolaLimitada(max_por_segundo)
+    handler_consola.setFormatter(logging.Formatter('%(message)s'))
+
+    listener = QueueListener(cola, handler_texto, handler_json, handler_consola, respect_handler_level=True)
+
+    logger = logging.getLogger(nombre)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(cola))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    listener.start()
+    return logger, listener
@@ -0,0 +1,131 @@
+import json
+import os
+
+
+NOMBRE_MANIFIESTO = 'manifiesto_ejecucion.json'
+VERSION_MANIFIESTO = 1
+
+# Indicadores comparables entre ejecuciones:
+# (ruta en el manifiesto, descripción, 1 = más es mejor / -1 = menos es mejor / 0 = neutro, escala al mostrar)
+INDICADORES = [
+    ('rendimiento.consultas_por_segundo', 'Consultas/s', 1, 1),
+    ('latencia.p50', 'Latencia p50 (s)', -1, 1),
+    ('latencia.p90', 'Latencia p90 (s)', -1, 1),
+    ('latencia.p99', 'Latencia p99 (s)', -1, 1),
+    ('latencia.maxima', 'Latencia máxima (s)', -1, 1),
+    ('rendimiento.reintentos_por_consulta', 'Reintentos/consulta', -1, 1),
+    ('rendimiento.exito', 'Consultas con respuesta', 1, 1),
+    ('etapas.planificacion', 'Planificación (s)', -1, 1),
+    ('etapas.consultas', 'Consultas (s)', -1, 1),
+    ('etapas.exportacion', 'Exportación (s)', -1, 1),
+    ('memoria.rss_pico', 'RSS máximo (MB)', -1, 2**20),
+    ('salidas.total_bytes', 'Salidas (MB)', 0, 2**20)
+]
+
+# Solo el rendimiento y la latencia cuentan como regresión; el resto es informativo
+REGRESIONES = {
+    'rendimiento.consultas_por_segundo', 'latencia.p50', 'latencia.p90', 'latencia.p99'
+}
+
+
+def tamano_ruta(ruta):
+    """Bytes de un archivo o de todos los archivos de un directorio (None si no existe)"""
+    if not ruta or not os.path.exists(ruta):
+        return None
+    if os.path.isfile(ruta):
+        return os.path.getsize(ruta)
+    return sum(
+        os.path.getsize(os.path.join(carpeta, archivo))
+        for carpeta, _, archivos in os.walk(ruta) for archivo in archivos
+    )
+
+
+def guardar_manifiesto(carpeta, manifiesto):
+    """Escribe el manifiesto de la ejecución de forma atómica y devuelve su ruta"""
+    ruta = os.path.join(carpeta, NOMBRE_MANIFIESTO)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def leer_manifiesto(ruta):
+    """Manifiesto de un archivo o de la carpeta de una ejecución"""
+    if os.path.isdir(ruta):
+        ruta = os.path.join(ruta, NOMBRE_MANIFIESTO)
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def valor_indicador(manifiesto, ruta):
+    valor = manifiesto
+    for clave in ruta.split('.'):
+        if not isinstance(valor, dict):
+            return None
+        valor = valor.get(clave)
+    return valor
+
+
+def comparar_manifiestos(base, actual, umbral=0.10):
+    """Cambio relativo de cada indicador; regresión si empeora más que el umbral (0.10 = 10 %)"""
+    filas = []
+    for ruta, descripcion, sentido, escala in INDICADORES:
+        antes = valor_indicador(base, ruta)
+        despues = valor_indicador(actual, ruta)
+        if antes is None or despues is None:
+            continue
+
+        cambio = (despues - antes) / antes if antes else None
+        empeora = cambio is not None and sentido * cambio < -umbral
+        filas.append({
+            'indicador': ruta,
+            'descripcion': descripcion,
+            'base': antes / escala,
+            'actual': despues / escala,
+            'cambio': cambio,
+            'regresion': empeora and ruta in REGRESIONES,
+            'aviso': empeora and ruta not in REGRESIONES
+        })
+    return filas
+
+
+def diferencias_plan(base, actual):
+    """Diferencias de selección o tamaño del plan que hacen la comparación menos fiable"""
+    avisos = []
+    for clave in ['informe', 'pestanas', 'orden', 'captura_red', 'timeout']:
+        antes = base.get('selecciones', {}).get(clave)
+        despues = actual.get('selecciones', {}).get(clave)
+        if antes != despues:
+            avisos.append(f"{clave}: {antes} → {despues}")
+
+    antes = base.get('plan', {}).get('consultas')
+    despues = actual.get('plan', {}).get('consultas')
+    if antes and despues and abs(despues - antes) / antes > 0.25:
+        avisos.append(f"consultas planificadas: {antes} → {despues}")
+    return avisos
+
+
+def comparar_ejecuciones(ruta_base, ruta_actual, umbral=0.10):
+    """Muestra la comparación de dos ejecuciones y devuelve los indicadores con regresión"""
+    base = leer_manifiesto(ruta_base)
+    actual = leer_manifiesto(ruta_actual)
+
+    print(f"\n\tBase:   {base.get('carpeta')} ({base.get('inicio')}, {base.get('plan', {}).get('consultas')} consultas)")
+    print(f"\tActual: {actual.get('carpeta')} ({actual.get('inicio')}, {actual.get('plan', {}).get('consultas')} consultas)")
+    for aviso in diferencias_plan(base, actual):
+        print(f"\t⚠ Ejecuciones no equivalentes: {aviso}")
+
+    filas = comparar_manifiestos(base, actual, umbral)
+    print(f"\n\t{'Indicador':25} {'Base':>10} {'Actual':>10} {'Cambio':>9}")
+    for fila in filas:
+        cambio = f"{100 * fila['cambio']:+.1f}%" if fila['cambio'] is not None else 'n/d'
+        marca = '  ✗ REGRESIÓN' if fila['regresion'] else '  ⚠' if fila['aviso'] else ''
+        print(f"\t{fila['descripcion']:25} {fila['base']:10.3f} {fila['actual']:10.3f} {cambio:>9}{marca}")
+
+    regresiones = [fila for fila in filas if fila['regresion']]
+    if regresiones:
+        print(f"\n\t✗ {len(regresiones)} regresiones de más del {100 * umbral:.0f} %")
+    else:
+        print(f"\n\t✓ Sin regresiones de rendimiento ni latencia de más del {100 * umbral:.0f} %")
+    return regresiones
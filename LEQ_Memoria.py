@@ -0,0 +1,75 @@
+import os
+import threading
+
+
+def rss_proceso(pid):
+    """RSS en bytes de un solo proceso (Linux; None si no se puede leer)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linea in f:
+                if linea.startswith('VmRSS:'):
+                    return int(linea.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def memoria_arbol(pid):
+    """RSS en bytes de un proceso y todos sus descendientes (Linux; None si no se puede leer)"""
+    total = 0
+    pendientes = [pid]
+    vistos = set()
+
+    while pendientes:
+        actual = pendientes.pop()
+        if actual in vistos:
+            continue
+        vistos.add(actual)
+        rss = rss_proceso(actual)
+        if rss is None:
+            if actual == pid:
+                return None    # sin /proc o el proceso ya no existe
+            continue
+        total += rss
+        try:
+            for tarea in os.listdir(f"/proc/{actual}/task"):
+                with open(f"/proc/{actual}/task/{tarea}/children") as f:
+                    pendientes.extend(int(hijo) for hijo in f.read().split())
+        except (OSError, ValueError):
+            pass
+
+    return total
+
+
+def pid_navegador(scraper):
+    """PID de chromedriver (Chrome y sus procesos cuelgan de él)"""
+    try:
+        return scraper.driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+class MedidorMemoria(threading.Thread):
+    """Muestrea en segundo plano el RSS de varios árboles de procesos y guarda el máximo"""
+
+    def __init__(self, obtener_pids, intervalo=0.5, nombre=None):
+        super().__init__(name=nombre, daemon=True)
+        self.obtener_pids = obtener_pids
+        self.intervalo = intervalo
+        self.maximo = 0
+        self.parar = threading.Event()
+
+    def medir(self):
+        total = sum(memoria_arbol(pid) or 0 for pid in self.obtener_pids() if pid)
+        self.maximo = max(self.maximo, total)
+
+    def run(self):
+        while not self.parar.is_set():
+            self.medir()
+            self.parar.wait(self.intervalo)
+
+    def detener(self):
+        self.parar.set()
+        self.join()
+        self.medir()
+        return self.maximo
@@ -0,0 +1,53 @@
+import statistics
+import threading
+import time
+from collections import Counter
+
+from LEQ_Estimacion import percentil
+
+
+class MetricasEjecucion:
+    """Latencia y resultado de cada consulta, reintentos y duración de las etapas (seguro entre hilos)"""
+
+    def __init__(self):
+        self.bloqueo = threading.Lock()
+        self.latencias = []
+        self.resultados = Counter()
+        self.reintentos = Counter()
+        self.etapas = {}
+        self.ultima_marca = time.perf_counter()
+
+    def fin_etapa(self, etapa):
+        """Cierra una etapa: dura desde el final de la anterior (o desde la creación)"""
+        ahora = time.perf_counter()
+        with self.bloqueo:
+            self.etapas[etapa] = self.etapas.get(etapa, 0) + ahora - self.ultima_marca
+            self.ultima_marca = ahora
+
+    def registrar_consulta(self, resultado, duracion=None):
+        """resultado: datos, sin_datos, sin_respuesta, fallida o error"""
+        with self.bloqueo:
+            self.resultados[resultado] += 1
+            if duracion is not None:
+                self.latencias.append(duracion)
+
+    def reintento(self, origen):
+        with self.bloqueo:
+            self.reintentos[origen] += 1
+
+    def resumen(self):
+        with self.bloqueo:
+            latencias = list(self.latencias)
+            return {
+                'consultas': sum(self.resultados.values()),
+                'resultados': dict(self.resultados),
+                'reintentos': dict(self.reintentos),
+                'etapas': {etapa: round(segundos, 3) for etapa, segundos in self.etapas.items()},
+                'latencia': {
+                    'media': statistics.fmean(latencias) if latencias else None,
+                    'p50': percentil(latencias, 50),
+                    'p90': percentil(latencias, 90),
+                    'p99': percentil(latencias, 99),
+                    'maxima': max(latencias, default=None)
+                }
+            }
@@ -0,0 +1,122 @@
+import pandas as pd
+
+from LEQ_Plan import MESES
+
+
+def sobre_valores_unicos(serie, funcion):
+    """Aplica `funcion` solo a los valores distintos y expande el resultado a toda la columna"""
+    codigos, unicos = pd.factorize(serie)
+    resultado = funcion(pd.Series(unicos))
+    # Los nulos (código -1) quedan como NA
+    return pd.Series(resultado.array.take(codigos, allow_fill=True), index=serie.index, name=serie.name)
+
+
+def normalizar_numeros(serie, decimales=True):
+    """Convierte una columna con números en formato español a dtype numérico"""
+    return sobre_valores_unicos(serie, lambda unicos: convertir_numeros(unicos, decimales))
+
+
+def convertir_numeros(serie, decimales=True):
+    """Conversión vectorizada de texto en formato español a número"""
+    texto = serie.astype('string').str.strip()
+
+    if decimales:
+        # Con coma decimal: '1.234,5' -> '1234.5'; sin coma se respeta el punto decimal
+        con_coma = texto.str.contains(',', regex=False).fillna(False)
+        texto = texto.where(
+            ~con_coma,
+            texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+        )
+    else:
+        # Conteos: puntos y comas solo pueden ser separadores de miles
+        texto = texto.str.replace(r'[.,]', '', regex=True)
+
+    return pd.to_numeric(texto, errors='coerce')
+
+
+def extraer_mes_ano(serie):
+    """Separa textos como 'enero 2025' en número de mes y año"""
+    partes = serie.astype('string').str.strip().str.lower().str.extract(
+        r'^(?P<mes>[a-záéíóúñ]+)\.?\s+(?:de\s+)?(?P<ano>\d{4})'
+    )
+    return pd.DataFrame({
+        'mes': partes['mes'].map(MESES).astype('Int64'),
+        'ano': pd.to_numeric(partes['ano'], errors='coerce').astype('Int64')
+    })
+
+
+def normalizar_meses(df):
+    """Obtiene año, número de mes y fecha (primer día del mes) de todo el dataset"""
+    vacia = pd.Series(pd.NA, index=df.index, dtype='Int64')
+    ano, mes_numero = vacia, vacia
+
+    if 'Filtro_Mes' in df.columns:
+        ano = sobre_valores_unicos(df['Filtro_Mes'], lambda unicos: extraer_mes_ano(unicos)['ano'])
+        mes_numero = sobre_valores_unicos(df['Filtro_Mes'], lambda unicos: extraer_mes_ano(unicos)['mes'])
+
+    # Completar con las columnas Año/Mes cuando el texto del filtro no sirve
+    if 'Mes' in df.columns:
+        mes_numero = mes_numero.fillna(sobre_valores_unicos(
+            df['Mes'], lambda unicos: unicos.astype('string').str.strip().str.lower().map(MESES).astype('Int64')
+        ))
+    if 'Año' in df.columns:
+        ano = ano.fillna(sobre_valores_unicos(
+            df['Año'], lambda unicos: pd.to_numeric(unicos, errors='coerce').astype('Int64')
+        ))
+
+    fecha = pd.to_datetime(
+        pd.DataFrame({
+            'year': ano.to_numpy(dtype='float64', na_value=float('nan')),
+            'month': mes_numero.to_numpy(dtype='float64', na_value=float('nan')),
+            'day': 1
+        }, index=df.index),
+        errors='coerce'
+    )
+
+    return ano, mes_numero, fecha
+
+
+def normalizar_dataset(df):
+    """Normaliza el dataset consolidado por columnas (sin bucles por fila)"""
+    df = df.copy()
+    invalidos = {}
+
+    if 'Pacientes_en_Lista' in df.columns:
+        original = df['Pacientes_en_Lista']
+        df['Pacientes_en_Lista'] = normalizar_numeros(original, decimales=False).astype('Int64')
+        invalidos['Pacientes_en_Lista'] = df['Pacientes_en_Lista'].isna() & original.notna()
+
+    if 'Demora_Media' in df.columns:
+        original = df['Demora_Media']
+        df['Demora_Media'] = normalizar_numeros(original, decimales=True)
+        invalidos['Demora_Media'] = df['Demora_Media'].isna() & original.notna()
+
+    ano, mes_numero, fecha = normalizar_meses(df)
+    df['Año'] = ano
+    df['Mes_Numero'] = mes_numero
+    df['Fecha_Mes'] = fecha
+    invalidos['Fecha_Mes'] = fecha.isna()
+
+    # Columnas que no se pudieron interpretar en cada fila ('' = correcta)
+    columnas = list(invalidos)
+    codigo = pd.Series(0, index=df.index)
+    for bit, columna in enumerate(columnas):
+        codigo = codigo + invalidos[columna].fillna(False).astype(int) * (1 << bit)
+    etiquetas = {
+        valor: ';'.join(columna for bit, columna in enumerate(columnas) if valor >> bit & 1)
+        for valor in codigo.unique()
+    }
+    df['Valores_No_Parseables'] = codigo.map(etiquetas)
+
+    return df
+
+
+def leer_csv_datos(ruta, columnas=None):
+    """Lee un CSV de datos detectando el separador (';' en vIA, ',' en v1); opcionalmente solo `columnas`"""
+    with open(ruta, encoding='utf-8-sig') as f:
+        cabecera = f.readline()
+    separador = ';' if cabecera.count(';') > cabecera.count(',') else ','
+    return pd.read_csv(
+        ruta, sep=separador, encoding='utf-8-sig', dtype=str,
+        usecols=(lambda columna: columna in columnas) if columnas else None
+    )
@@ -0,0 +1,184 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from LEQ_Memoria import MedidorMemoria, memoria_arbol, rss_proceso
+
+
+def nombre_marco(codigo):
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+
+class MuestreadorPilas(threading.Thread):
+    """Muestrea las pilas de todos los hilos: tiempo de reloj, esperas del navegador incluidas"""
+
+    def __init__(self, intervalo=0.01):
+        super().__init__(name='perfil-muestreo', daemon=True)
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self.muestras = 0
+        self.segundos = 0
+        self.parar = threading.Event()
+
+    def run(self):
+        inicio = time.perf_counter()
+        while not self.parar.wait(self.intervalo):
+            nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+            for ident, marco in sys._current_frames().items():
+                # Los hilos del propio perfil no se muestrean
+                if nombres.get(ident, '').startswith('perfil-'):
+                    continue
+                pila = []
+                while marco is not None:
+                    pila.append(nombre_marco(marco.f_code))
+                    marco = marco.f_back
+                pila.append(nombres.get(ident, str(ident)))
+                self.pilas[';'.join(reversed(pila))] += 1
+            self.muestras += 1
+            self.segundos = time.perf_counter() - inicio
+
+    def detener(self):
+        self.parar.set()
+        self.join()
+
+    def guardar(self, ruta):
+        """Formato de pilas plegadas (flamegraph.pl, speedscope): 'hilo;f1;f2 muestras'"""
+        with open(ruta, 'w', encoding='utf-8') as f:
+            for pila, muestras in self.pilas.most_common():
+                f.write(f"{pila} {muestras}\n")
+
+    def resumen(self, top):
+        """Funciones con más muestras propias en cada hilo"""
+        por_hilo = {}
+        for pila, muestras in self.pilas.items():
+            marcos = pila.split(';')
+            hilo = por_hilo.setdefault(marcos[0], Counter())
+            hilo[marcos[-1] if len(marcos) > 1 else '(sin pila)'] += muestras
+
+        # El intervalo real entre muestras es algo mayor que el pedido
+        por_muestra = self.segundos / self.muestras if self.muestras else 0
+        lineas = []
+        for hilo, funciones in sorted(por_hilo.items()):
+            total = sum(funciones.values())
+            lineas.append(f"  {hilo} ({total * por_muestra:.1f} s)")
+            for funcion, muestras in funciones.most_common(top):
+                lineas.append(f"    {100 * muestras / total:5.1f}%  {funcion}")
+        return lineas
+
+
+class PerfilEjecucion:
+    """Perfil de una ejecución: cProfile, muestreo de hilos, tracemalloc y RSS en cada hito"""
+
+    def __init__(self, carpeta, obtener_pid_navegador=None, top=20, marcos=1):
+        self.carpeta = carpeta
+        self.obtener_pid_navegador = obtener_pid_navegador or (lambda: None)
+        self.top = top
+        self.marcos = marcos
+        self.perfil_cpu = cProfile.Profile()
+        self.muestreador = MuestreadorPilas()
+        self.medidor = MedidorMemoria(lambda: [os.getpid()], nombre='perfil-memoria')
+        self.hitos = []
+        self.primera_instantanea = None
+        self.ultima_instantanea = None
+        self.inicio = None
+        self.activo = False
+
+    def iniciar(self):
+        tracemalloc.start(self.marcos)
+        self.inicio = time.perf_counter()
+        self.muestreador.start()
+        self.medidor.start()
+        self.marcar('inicio')
+        # cProfile solo ve el hilo de la ejecución; los demás los cubre el muestreo
+        self.activo = True
+        self.perfil_cpu.enable()
+
+    def marcar(self, hito):
+        """Instantánea de tracemalloc y RSS de Python y del navegador"""
+        self.perfil_cpu.disable()
+        try:
+            instantanea = tracemalloc.take_snapshot()
+            archivo = f"memoria_{len(self.hitos):02d}.snapshot"
+            instantanea.dump(os.path.join(self.carpeta, archivo))
+            if self.primera_instantanea is None:
+                self.primera_instantanea = instantanea
+            self.ultima_instantanea = instantanea
+
+            actual, pico = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            pid = self.obtener_pid_navegador()
+            self.hitos.append({
+                'hito': hito,
+                'segundos': round(time.perf_counter() - self.inicio, 3),
+                'rss_python': rss_proceso(os.getpid()),
+                'rss_navegador': memoria_arbol(pid) if pid else None,
+                'python_asignado': actual,
+                'python_pico_tramo': pico,
+                'instantanea': archivo
+            })
+        finally:
+            if self.activo:
+                self.perfil_cpu.enable()
+
+    def detener(self):
+        """Escribe los perfiles en la carpeta y devuelve la ruta del resumen"""
+        self.activo = False
+        self.marcar('fin')
+        self.muestreador.detener()
+        rss_pico = self.medidor.detener()
+        tracemalloc.stop()
+
+        self.perfil_cpu.dump_stats(os.path.join(self.carpeta, 'perfil_cpu.prof'))
+        self.muestreador.guardar(os.path.join(self.carpeta, 'perfil_reloj.folded'))
+        with open(os.path.join(self.carpeta, 'perfil_memoria.json'), 'w', encoding='utf-8') as f:
+            json.dump({'rss_pico_total': rss_pico, 'hitos': self.hitos}, f, ensure_ascii=False, indent=2)
+
+        ruta = os.path.join(self.carpeta, 'perfil_resumen.txt')
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.resumen(rss_pico)) + '\n')
+        return ruta
+
+    def resumen(self, rss_pico):
+        def mb(valor):
+            return f"{valor / 2**20:.0f} MB" if valor else 'n/d'
+
+        lineas = [f"Duración: {self.hitos[-1]['segundos']:.1f} s; RSS máximo (Python + navegador + exportación): {mb(rss_pico)}", '']
+
+        for orden, titulo in [('cumulative', 'tiempo acumulado'), ('tottime', 'tiempo propio')]:
+            salida = io.StringIO()
+            pstats.Stats(self.perfil_cpu, stream=salida).sort_stats(orden).print_stats(self.top)
+            lineas.append(f"== CPU del hilo de la ejecución por {titulo} (perfil_cpu.prof) ==")
+            lineas.extend(linea for linea in salida.getvalue().splitlines() if linea.strip())
+            lineas.append('')
+
+        lineas.append(f"== Tiempo de reloj por hilo, {self.muestreador.muestras} muestras (perfil_reloj.folded) ==")
+        lineas.extend(self.muestreador.resumen(min(self.top, 8)))
+        lineas.append('')
+
+        lineas.append("== Memoria por hito (perfil_memoria.json, memoria_NN.snapshot) ==")
+        lineas.append(f"  {'Segundos':>9} {'RSS Python':>11} {'RSS navegador':>14} {'Asignado':>9} {'Pico tramo':>11}  Hito")
+        for hito in self.hitos:
+            lineas.append(
+                f"  {hito['segundos']:9.1f} {mb(hito['rss_python']):>11} {mb(hito['rss_navegador']):>14} "
+                f"{mb(hito['python_asignado']):>9} {mb(hito['python_pico_tramo']):>11}  {hito['hito']}"
+            )
+        lineas.append('')
+
+        # Se filtra solo aquí: filtrar cada instantánea costaría más que tomarla
+        filtros = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')
+        ]
+        ultima = self.ultima_instantanea.filter_traces(filtros)
+        lineas.append("== Mayor crecimiento de memoria de Python entre el primer y el último hito ==")
+        for diferencia in ultima.compare_to(self.primera_instantanea.filter_traces(filtros), 'lineno')[:self.top]:
+            lineas.append(f"  {diferencia}")
+        return lineas
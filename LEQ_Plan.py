@@ -0,0 +1,145 @@
+import heapq
+import math
+import re
+
+
+# Tabla de meses en español (también abreviados)
+MESES = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6,
+    'julio': 7, 'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10,
+    'noviembre': 11, 'diciembre': 12,
+    'ene': 1, 'feb': 2, 'mar': 3, 'abr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'ago': 8, 'sep': 9, 'sept': 9, 'oct': 10, 'nov': 11, 'dic': 12
+}
+
+POLITICAS = ('hospital', 'recientes', 'rotacion', 'pesos')
+
+
+def clave_consulta(url, nombre_hospital, texto_mes, nombre_especialidad=None):
+    """Clave única de una consulta (informe, hospital, especialidad, mes)"""
+    return '|'.join([url, nombre_hospital, nombre_especialidad or 'Todas', texto_mes])
+
+
+def clave_registro(registro):
+    """Clave de consulta de un registro extraído"""
+    return clave_consulta(
+        registro['URL'],
+        registro['Filtro_Hospital'],
+        registro['Filtro_Mes'],
+        registro['Filtro_Especialidad']
+    )
+
+
+def planificar_consultas(url, hospital, meses, especialidades=None):
+    """Genera las consultas de un hospital (producto cartesiano mes × especialidad)"""
+    consultas = []
+
+    # Sin especialidades se consulta sin filtro de especialidad
+    for mes in meses:
+        for especialidad in (especialidades or [None]):
+            consultas.append({
+                'clave': clave_consulta(
+                    url,
+                    hospital['nombre'],
+                    mes['texto'],
+                    especialidad['nombre'] if especialidad else None
+                ),
+                'url': url,
+                'hospital': hospital,
+                'mes': mes,
+                'especialidad': especialidad
+            })
+
+    return consultas
+
+
+def orden_mes(texto_mes):
+    """(año, mes) de un texto como 'Enero 2025' ((0, 0) si no se reconoce)"""
+    ano = re.search(r'(?:19|20)\d{2}', texto_mes)
+    palabra = re.search(r'[a-záéíóú]+', texto_mes.lower())
+    return (
+        int(ano.group()) if ano else 0,
+        MESES.get(palabra.group(), 0) if palabra else 0
+    )
+
+
+def leer_pesos(texto):
+    """'Gregorio=3;Cardiología=2' -> {'gregorio': 3.0, 'cardiología': 2.0}"""
+    pesos = {}
+    for parte in texto.split(';'):
+        termino, _, peso = parte.partition('=')
+        if termino.strip() and peso.strip():
+            pesos[termino.strip().lower()] = float(peso)
+    return pesos
+
+
+def peso_nombre(nombre, pesos):
+    """Mayor peso de los términos contenidos en el nombre (1 si no coincide ninguno)"""
+    coincidencias = [peso for termino, peso in pesos.items() if nombre and termino in nombre.lower()]
+    return max(coincidencias) if coincidencias else 1.0
+
+
+def intercalar(grupos, pesos_grupos):
+    """Reparte los turnos entre grupos en proporción a su peso (stride scheduling)"""
+    ordenadas = []
+    turnos = [(0.0, posicion) for posicion in range(len(grupos))]
+    siguientes = [0] * len(grupos)
+
+    while turnos:
+        pase, posicion = heapq.heappop(turnos)
+        ordenadas.append(grupos[posicion][siguientes[posicion]])
+        siguientes[posicion] += 1
+        if siguientes[posicion] < len(grupos[posicion]):
+            heapq.heappush(turnos, (pase + 1 / pesos_grupos[posicion], posicion))
+
+    return ordenadas
+
+
+def ordenar_consultas(consultas, politica='hospital', pesos=None):
+    """Ordena las consultas planificadas según la política de ejecución"""
+    if politica == 'hospital':
+        return list(consultas)
+
+    if politica == 'recientes':
+        # Último mes completo para todos los hospitales antes que el anterior
+        return sorted(consultas, key=lambda c: orden_mes(c['mes']['texto']), reverse=True)
+
+    # rotacion / pesos: una cola por hospital, atendidas por turnos
+    por_hospital = {}
+    for consulta in consultas:
+        por_hospital.setdefault(consulta['hospital']['nombre'], []).append(consulta)
+
+    grupos = list(por_hospital.values())
+    if politica == 'rotacion':
+        return intercalar(grupos, [1.0] * len(grupos))
+
+    if politica == 'pesos':
+        pesos = pesos or {}
+        # Dentro de cada hospital, primero las especialidades con más peso
+        grupos = [
+            sorted(grupo, key=lambda c: -peso_nombre(c['especialidad']['nombre'] if c['especialidad'] else None, pesos))
+            for grupo in grupos
+        ]
+        return intercalar(grupos, [peso_nombre(grupo[0]['hospital']['nombre'], pesos) for grupo in grupos])
+
+    raise ValueError(f"Política de orden desconocida: {politica}")
+
+
+def repartir_consultas(consultas, partes, clave=lambda c: c['hospital']['nombre']):
+    """Reparte las consultas en `partes` colas equilibradas sin mezclar hospitales en un mismo tramo"""
+    grupos = {}
+    for consulta in consultas:
+        grupos.setdefault(clave(consulta), []).append(consulta)
+
+    # Con menos hospitales que colas, cada hospital se trocea para que ninguna quede vacía
+    tramos = []
+    trozos_por_grupo = math.ceil(partes / len(grupos)) if grupos else 1
+    for grupo in grupos.values():
+        tamano = math.ceil(len(grupo) / trozos_por_grupo)
+        tramos.extend(grupo[i:i + tamano] for i in range(0, len(grupo), tamano))
+
+    # Primero los tramos más largos, cada uno a la cola con menos consultas
+    colas = [[] for _ in range(partes)]
+    for tramo in sorted(tramos, key=len, reverse=True):
+        min(colas, key=len).extend(tramo)
+    return colas
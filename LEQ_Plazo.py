@@ -0,0 +1,56 @@
+import re
+import time
+from datetime import datetime, timedelta
+
+
+def leer_duracion(texto, ahora=None):
+    """Segundos de un presupuesto: '90m', '2h', '45s', '1h30m' o una hora límite 'HH:MM' (la unidad es obligatoria)"""
+    texto = str(texto).strip().lower()
+
+    hora = re.fullmatch(r'(\d{1,2}):(\d{2})', texto)
+    if hora:
+        ahora = ahora or datetime.now()
+        limite = ahora.replace(hour=int(hora.group(1)), minute=int(hora.group(2)), second=0, microsecond=0)
+        if limite <= ahora:
+            limite += timedelta(days=1)  # la hora ya ha pasado hoy: es la de mañana
+        return (limite - ahora).total_seconds()
+
+    # Sin unidad es ambiguo (los demás timeouts van en segundos): se rechaza
+    if re.fullmatch(r'\d+(\.\d+)?', texto):
+        raise ValueError(f"Duración sin unidad: {texto} (usa {texto}s, {texto}m o {texto}h)")
+
+    partes = re.findall(r'(\d+(?:\.\d+)?)\s*([hms])', texto)
+    if not partes or ''.join(numero + unidad for numero, unidad in partes) != texto.replace(' ', ''):
+        raise ValueError(f"Duración no válida: {texto}")
+    return sum(float(numero) * {'h': 3600, 'm': 60, 's': 1}[unidad] for numero, unidad in partes)
+
+
+class Plazo:
+    """Presupuesto de tiempo de una ejecución y coste observado de cada consulta"""
+
+    def __init__(self, segundos, reserva=None, suavizado=0.2):
+        self.inicio = time.monotonic()
+        self.fin = self.inicio + segundos
+        # Tiempo reservado al final para exportar lo extraído
+        self.reserva = reserva if reserva is not None else min(max(30.0, segundos * 0.05), 300.0)
+        self.suavizado = suavizado
+        self.coste_consulta = None
+
+    def restante(self):
+        """Segundos disponibles para consultas (descontada la reserva)"""
+        return self.fin - self.reserva - time.monotonic()
+
+    def registrar(self, duracion):
+        """Actualiza el coste estimado por consulta (media móvil exponencial)"""
+        if self.coste_consulta is None:
+            self.coste_consulta = duracion
+        else:
+            self.coste_consulta += self.suavizado * (duracion - self.coste_consulta)
+
+    def puede_despachar(self):
+        """Indica si aún da tiempo a una consulta más"""
+        return self.restante() > (self.coste_consulta or 0)
+
+    def timeout(self, maximo):
+        """Timeout de espera de una consulta sin pasarse del plazo"""
+        return max(min(maximo, self.restante()), 1)
@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class NavegadorPrecalentado:
+    """Arranca el navegador y precarga catálogos en segundo plano mientras se responden los menús"""
+
+    def __init__(self, crear_driver, leer_catalogo, urls=()):
+        self.crear_driver = crear_driver
+        self.leer_catalogo = leer_catalogo
+        self.driver = None
+
+        # Un único hilo: todas las operaciones sobre el navegador van en orden
+        self.ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='navegador')
+        self.arranque = self.ejecutor.submit(self.arrancar)
+        self.catalogos = {}
+        self.pagina = None
+        self.precargar(urls)
+
+    def arrancar(self):
+        if self.driver is None:
+            self.driver = self.crear_driver()
+        return self.driver
+
+    def precargar(self, urls):
+        """Encarga la lectura de los catálogos de varios informes"""
+        for url in urls:
+            if url not in self.catalogos:
+                self.catalogos[url] = self.ejecutor.submit(lambda url=url: self.leer_catalogo(self.driver, url))
+
+    def renovar_catalogos(self):
+        """Vuelve a precargar los catálogos (un proceso de larga duración, tras cada ejecución)"""
+        urls = list(self.catalogos)
+        for futuro in self.catalogos.values():
+            futuro.cancel()
+        self.catalogos = {}
+        self.pagina = None
+        self.precargar(urls)
+
+    def preparar(self, url):
+        """Deja cargado el informe elegido (los catálogos de otros informes aún no leídos se descartan)"""
+        for otra_url, futuro in self.catalogos.items():
+            if otra_url != url:
+                futuro.cancel()
+        self.pagina = self.ejecutor.submit(self.cargar, url)
+
+    def cargar(self, url):
+        # Siempre se recarga: leer el catálogo deja un hospital seleccionado en el formulario
+        self.driver.get(url)
+        return self.driver
+
+    def catalogo(self, url, timeout=None):
+        """Catálogo precargado de un informe (None si no se pudo leer)"""
+        futuro = self.catalogos.get(url)
+        if futuro is None:
+            return None
+        try:
+            return futuro.result(timeout)
+        except Exception:
+            # Cancelado o fallido: se leerá en vivo
+            return None
+
+    def obtener_driver(self, timeout=None):
+        """Espera a que el navegador (y la página preparada) estén listos y lo devuelve"""
+        driver = self.arranque.result(timeout)
+        if self.pagina is not None:
+            self.pagina.result(timeout)
+        return driver
+
+    def cerrar(self, cerrar_navegador=True):
+        """Detiene el hilo de precarga y, si se indica, cierra el navegador"""
+        self.ejecutor.shutdown(wait=True, cancel_futures=True)
+        if cerrar_navegador and self.driver:
+            self.driver.quit()
+            self.driver = None
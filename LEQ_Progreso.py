@@ -0,0 +1,122 @@
+import json
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+
+class ReporteProgreso:
+    """Progreso global de la ejecución: ritmo, ETA, tasa de éxito y hospital actual"""
+
+    def __init__(self, total_planificado, ruta_estado=None, intervalo=1.0, ventana=60,
+                 mostrar_barra=None, es_tty=None):
+        self.total = total_planificado
+        self.ruta_estado = ruta_estado
+        self.intervalo = intervalo      # segundos mínimos entre refrescos
+        self.ventana = ventana          # segundos de la media móvil del ritmo
+        self.mostrar_barra = mostrar_barra
+        self.es_tty = sys.stdout.isatty() if es_tty is None else es_tty
+
+        self.inicio = time.monotonic()
+        self.completadas = 0
+        self.exitosas = 0
+        self.hospital_actual = None
+        self.marcas = deque()
+        self.ultimo_refresco = 0.0
+        self.colas = None               # función que devuelve la profundidad de las colas
+
+    def iniciar_hospital(self, nombre):
+        """Cambia el hospital en curso"""
+        self.hospital_actual = nombre
+        self.refrescar(forzar=True)
+
+    def descontar(self, consultas):
+        """Quita del total consultas que finalmente no se ejecutarán"""
+        self.total = max(self.total - consultas, self.completadas)
+
+    def registrar(self, exito):
+        """Registra una consulta terminada"""
+        ahora = time.monotonic()
+        self.completadas += 1
+        if exito:
+            self.exitosas += 1
+
+        self.marcas.append(ahora)
+        while self.marcas and ahora - self.marcas[0] > self.ventana:
+            self.marcas.popleft()
+
+        self.refrescar()
+
+    def ritmo(self):
+        """Consultas por segundo en la ventana móvil"""
+        ahora = time.monotonic()
+        inicio_ventana = max(self.inicio, ahora - self.ventana)
+        transcurrido = ahora - inicio_ventana
+        if transcurrido <= 0:
+            return 0.0
+        return len(self.marcas) / transcurrido
+
+    def estado(self):
+        """Estado actual en formato legible por máquina"""
+        ritmo = self.ritmo()
+        restantes = max(self.total - self.completadas, 0)
+        eta_segundos = restantes / ritmo if ritmo > 0 else None
+
+        return {
+            'total_planificado': self.total,
+            'completadas': self.completadas,
+            'exitosas': self.exitosas,
+            'tasa_exito': round(self.exitosas / self.completadas, 4) if self.completadas else None,
+            'consultas_por_segundo': round(ritmo, 3),
+            'eta_segundos': round(eta_segundos) if eta_segundos is not None else None,
+            'fin_estimado': (
+                (datetime.now() + timedelta(seconds=eta_segundos)).strftime('%Y-%m-%d %H:%M:%S')
+                if eta_segundos is not None else None
+            ),
+            'hospital_actual': self.hospital_actual,
+            'colas': self.colas() if self.colas else None,
+            'transcurrido_segundos': round(time.monotonic() - self.inicio),
+            'actualizado': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def refrescar(self, forzar=False):
+        """Muestra o guarda el estado como máximo una vez por intervalo"""
+        ahora = time.monotonic()
+        if not forzar and ahora - self.ultimo_refresco < self.intervalo:
+            return
+        self.ultimo_refresco = ahora
+
+        estado = self.estado()
+
+        if self.es_tty and self.mostrar_barra and self.total:
+            eta = estado['eta_segundos']
+            eta_texto = str(timedelta(seconds=eta)) if eta is not None else '--:--:--'
+            tasa = f"{estado['tasa_exito']*100:.0f}%" if estado['tasa_exito'] is not None else '--'
+            hospital = (self.hospital_actual or '')[:25]
+            self.mostrar_barra(
+                self.completadas - 1,
+                self.total,
+                sufijo=f" {self.completadas}/{self.total} | {estado['consultas_por_segundo']:.2f} c/s | "
+                       f"ETA {eta_texto} | Éxito {tasa} | {hospital}"
+            )
+        elif self.ruta_estado:
+            self.guardar_estado(estado)
+
+    def guardar_estado(self, estado):
+        """Escribe el estado en JSON de forma atómica"""
+        temporal = f"{self.ruta_estado}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(estado, f, ensure_ascii=False, indent=2)
+        os.replace(temporal, self.ruta_estado)
+
+    def finalizar(self):
+        """Último refresco al terminar la ejecución"""
+        self.refrescar(forzar=True)
+        if self.es_tty and self.mostrar_barra and self.completadas < self.total:
+            print()
+
+        if self.ruta_estado:
+            estado = self.estado()
+            estado['finalizado'] = True
+            self.guardar_estado(estado)
@@ -0,0 +1,75 @@
+import base64
+import json
+import re
+import time
+
+
+def contenido_elemento(html, element_id):
+    """innerHTML de un elemento dentro del HTML de una respuesta (None si no está)"""
+    apertura = re.search(r'<(\w+)\b[^>]*\bid=["\']%s["\'][^>]*>' % re.escape(element_id), html)
+    if not apertura:
+        return None
+
+    # Se cuentan las etiquetas del mismo tipo anidadas hasta encontrar el cierre
+    etiqueta = apertura.group(1)
+    profundidad = 1
+    for marca in re.finditer(r'<(/?)%s\b[^>]*>' % etiqueta, html[apertura.end():], re.IGNORECASE):
+        profundidad += -1 if marca.group(1) else 1
+        if profundidad == 0:
+            return html[apertura.end():apertura.end() + marca.start()]
+    return None
+
+
+class CapturaRed:
+    """Respuestas de los postbacks leídas de los eventos de red de Chrome (DevTools Protocol)"""
+
+    def __init__(self, driver):
+        # El driver debe crearse con goog:loggingPrefs = {'performance': 'ALL'}
+        self.driver = driver
+        self.peticion = None
+        self.respuesta = None
+        self.driver.execute_cdp_cmd('Network.enable', {})
+
+    def eventos(self):
+        """Eventos de red acumulados desde la última lectura (leerlos los descarta)"""
+        for entrada in self.driver.get_log('performance'):
+            mensaje = json.loads(entrada['message'])['message']
+            if mensaje['method'].startswith('Network.'):
+                yield mensaje['method'], mensaje.get('params', {})
+
+    def vaciar(self):
+        """Descarta los eventos anteriores: la siguiente petición POST será la del postback"""
+        for _ in self.eventos():
+            pass
+        self.peticion = None
+        self.respuesta = None
+
+    def cuerpo(self, id_peticion):
+        respuesta = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': id_peticion})
+        if respuesta.get('base64Encoded'):
+            return base64.b64decode(respuesta['body']).decode('utf-8', errors='replace')
+        return respuesta['body']
+
+    def esperar_respuesta(self, timeout, intervalo=0.05):
+        """Cuerpo de la respuesta del postback (None si falla o no termina a tiempo)"""
+        limite = time.monotonic() + timeout
+
+        while self.respuesta is None:
+            for metodo, parametros in self.eventos():
+                if metodo == 'Network.requestWillBeSent' and self.peticion is None:
+                    if parametros['request']['method'] == 'POST':
+                        self.peticion = parametros['requestId']
+                elif parametros.get('requestId') == self.peticion:
+                    if metodo == 'Network.loadingFinished':
+                        self.respuesta = self.cuerpo(self.peticion)
+                        break
+                    if metodo == 'Network.loadingFailed':
+                        self.respuesta = ''    # no se vuelve a esperar a esta petición
+                        break
+
+            if self.respuesta is None:
+                if time.monotonic() >= limite:
+                    return None
+                time.sleep(intervalo)
+
+        return self.respuesta or None
@@ -1,15 +1,36 @@
 import time
-import pandas as pd
 from datetime import datetime
 import os
 import re
+import json
+import random
 import logging
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import Select
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import socket
+import argparse
+import tempfile
+from collections import deque
+from contextlib import nullcontext
+
+from LEQ_Diferido import ObjetoDiferido
+
+# pandas y Selenium se importan al usarse por primera vez (arranque rápido)
+pd = ObjetoDiferido('pandas')
+webdriver = ObjetoDiferido('selenium.webdriver')
+By = ObjetoDiferido('selenium.webdriver.common.by', 'By')
+Select = ObjetoDiferido('selenium.webdriver.support.ui', 'Select')
+WebDriverWait = ObjetoDiferido('selenium.webdriver.support.ui', 'WebDriverWait')
+EC = ObjetoDiferido('selenium.webdriver.support.expected_conditions')
+
+from LEQ_Cambios import RegistroCambios, escribir_feed_cambios
+from LEQ_Cola import ColaTrabajo, LatidoLease
+from LEQ_Logging import configurar_logging_asincrono
+from LEQ_Manifiesto import VERSION_MANIFIESTO, comparar_ejecuciones, guardar_manifiesto, tamano_ruta
+from LEQ_Memoria import MedidorMemoria
+from LEQ_Metricas import MetricasEjecucion
+from LEQ_Plan import leer_pesos, ordenar_consultas, planificar_consultas, repartir_consultas
+from LEQ_Plazo import Plazo, leer_duracion
+from LEQ_Progreso import ReporteProgreso
+from LEQ_Tuberia import Tuberia
 
 class LEQScraper:
     def __init__(self):
@@ -18,12 +39,96 @@ class LEQScraper:
         self.especialidades_seleccionadas_global = []
         self.modo_verbose = True 
         self.logger = None
+        self.logging_asincrono = False  # True: QueueHandler + listener en segundo plano
+        self.listener_logging = None
+        self.progreso = None
+        self.interrumpido = False
+        
+        # Latencia y resultado de cada consulta y reintentos (se reinicia en cada ejecución)
+        self.metricas = MetricasEjecucion()
+        self.medidor_memoria = None
+        self.resultados_exportacion = {}
+        self.dataset_escrito = None  # particiones publicadas en esta ejecución (resumen de escribir_dataset)
+        
+        # Presupuesto de tiempo (None = sin límite); lo que no da tiempo a consultar queda pendiente
+        self.segundos_plazo = None
+        self.plazo = None
+        self.plazo_agotado = False
+        self.pendientes = []
+        
+        # Modo de prueba: se planifica todo, se mide una muestra de consultas y no se extrae nada más
+        self.solo_estimar = False
+        self.muestra_estimacion = 5
+        self.max_trabajadores_estimacion = 8
+        
+        # Respuestas de Buscar leídas de los eventos de red de Chrome en lugar del DOM
+        self.captura_red = False
+        self.captura = None
+        self.pagina_enviada = None  # nodo de la página en la que se pulsó Buscar (queda obsoleto al recargar)
+        
+        # Pestañas de una misma sesión de Chrome que se alternan en las consultas (1 = sin pestañas)
+        self.pestanas = 1
+        self.pestanas_abiertas = []
+        
+        # Perfil de la ejecución (CPU, reloj por hilo, asignaciones y RSS) en la carpeta de resultados
+        self.perfilar = False
+        self.perfil = None
+        
+        # Orden de ejecución de las consultas: hospital, recientes, rotacion o pesos
+        self.politica_orden = 'hospital'
+        self.pesos_orden = {}
+        
+        # Navegador arrancado en segundo plano durante los menús (None = arranque en el paso 3)
+        self.precalentar = True
+        self.navegador_precalentado = None
+        
+        # Modo demonio: el navegador se conserva entre ejecuciones y cada ejecución deja su resultado
+        self.conservar_navegador = False
+        self.nombre_logger = 'LEQ'
+        self.ultima_ejecucion = None
+        self.bloqueo_salidas = None  # compartido entre sesiones: feed de cambios y cubo de uno en uno
+        
+        # Selección no interactiva (CLI / archivo de configuración); None = menús interactivos
+        self.parametros_cli = None
+        self.ruta_catalogos = None  # caché de catálogos (None = desactivada)
+        
+        # Convertir números y meses a tipos numéricos/fecha antes de exportar
+        self.normalizar_datos = True
+        
+        # Cubo agregado hospital × especialidad × mes (None = desactivado; requiere normalizar)
+        self.directorio_cubo = None
+        
+        # Dataset parquet particionado report=<n>/year=<yyyy>/month=<mm> (None = desactivado)
+        self.directorio_dataset = None
+        
+        # Servicio de consulta a avisar cuando termina una ejecución (ej: http://127.0.0.1:8765)
+        self.url_servicio = None
+        
+        # Archivo comprimido y direccionado por contenido del HTML de indicadores (None = Texto_Completo)
+        self.directorio_archivo_html = None
+        self.archivo_html = None
+        
+        # Mapa de combinaciones vacías aprendido entre ejecuciones (None = desactivado)
+        self.mapa_dispersion = None
+        
+        # Tubería de consultas: hilos de parseo y tamaño de las colas entre etapas
+        self.hilos_parseo = 2
+        self.capacidad_colas = 16
+        
+        # Exportación: formatos escritos en paralelo y libros por hospital
+        self.formatos_exportacion = ['xlsx', 'csv']
+        self.libros_por_hospital = False
+        self.procesos_exportacion = None
         
         # Configurar tiempos de espera (limitados al máximo actualmente)
         self.TIEMPO_ESPERA_CORTO = 0   # 1 segundos
         self.TIEMPO_ESPERA_NORMAL = 0  # 2 segundos
         self.TIEMPO_ESPERA_LARGO = 3   # 3 segundos
         self.TIEMPO_TIMEOUT = 10       # segundos para WebDriverWait
+        self.ESPERA_REINTENTO = 0.2    # segundos entre reintentos de selección y clic (postback en curso)
+        
+        # Últimos valores conocidos para el feed de cambios (None = desactivado)
+        self.ruta_estado_cambios = None
         
         self.urls_disponibles = {
             1: {
@@ -48,42 +153,49 @@ class LEQScraper:
             }
         }
     
-    def log_info(self, mensaje):
+    def log_info(self, mensaje, **campos):
         """Log info si está en modo verbose"""
-        if self.modo_verbose:
+        if self.modo_verbose and not self.listener_logging:
             print(mensaje)
         
         if self.logger:
-            self.logger.info(mensaje)
+            self.logger.info(mensaje, extra={'campos': campos})
     
-    def log_error(self, mensaje):
+    def log_error(self, mensaje, **campos):
         """Log de errores"""
-        if self.modo_verbose:
+        if self.modo_verbose and not self.listener_logging:
             print(f" {mensaje}")
         
         if self.logger:
-            self.logger.error(mensaje)
+            self.logger.error(mensaje, extra={'campos': campos})
     
-    def log_warning(self, mensaje):
+    def log_warning(self, mensaje, **campos):
         """Log de advertencias"""
-        if self.modo_verbose:
+        if self.modo_verbose and not self.listener_logging:
             print(f" {mensaje}")
         
         if self.logger:
-            self.logger.warning(mensaje)
+            self.logger.warning(mensaje, extra={'campos': campos})
     
-    def log_success(self, mensaje):
+    def log_success(self, mensaje, **campos):
         """Log de éxitos"""
-        if self.modo_verbose:
+        if self.modo_verbose and not self.listener_logging:
             print(f" {mensaje}")
         
         if self.logger:
-            self.logger.info(f" {mensaje}")
+            self.logger.info(f" {mensaje}", extra={'campos': campos})
     
     def configurar_logging(self, carpeta_principal):
         """Configura logging profesional"""
         log_file = os.path.join(carpeta_principal, 'ejecucion.log')
         
+        if self.logging_asincrono:
+            # Consola y disco fuera del camino crítico; registros estructurados en JSON Lines
+            self.logger, self.listener_logging = configurar_logging_asincrono(
+                log_file, os.path.join(carpeta_principal, 'ejecucion.jsonl'), nombre=self.nombre_logger
+            )
+            return
+        
         logging.basicConfig(
             level=logging.INFO,
             format='%(asctime)s - %(levelname)s - %(message)s',
@@ -96,6 +208,15 @@ class LEQScraper:
         self.logger = logging.getLogger(__name__)
 #        self.log_success(f"Log guardado en: {os.path.basename(log_file)}")
     
+    def detener_logging(self):
+        """Vacía la cola de logging asíncrono y detiene el listener"""
+        if self.listener_logging:
+            self.listener_logging.stop()
+            for handler in self.listener_logging.handlers:
+                handler.close()
+            self.listener_logging = None
+            self.logger = None
+    
     def mostrar_menu_urls(self):
         """Muestra menú para elegir URL"""
         
@@ -258,6 +379,20 @@ class LEQScraper:
         
         return None
     
+    def buscar_por_nombre(self, seleccion, elementos):
+        """Selecciona elementos por nombre (términos separados por ';', sin distinguir mayúsculas)"""
+        seleccionados = []
+        
+        for termino in seleccion.split(';'):
+            termino = termino.strip().lower()
+            if not termino:
+                continue
+            for elemento in elementos:
+                if termino in elemento['nombre'].lower() and elemento not in seleccionados:
+                    seleccionados.append(elemento)
+        
+        return seleccionados
+    
     def procesar_seleccion_especialidades(self, seleccion, especialidades):
         """Procesa la selección del usuario para especialidades"""
         seleccionadas = []
@@ -277,6 +412,8 @@ class LEQScraper:
             for num in numeros:
                 if 1 <= num <= len(especialidades):
                     seleccionadas.append(especialidades[num-1])
+        else:
+            seleccionadas = self.buscar_por_nombre(seleccion, especialidades)
         
         return seleccionadas
     
@@ -361,18 +498,23 @@ class LEQScraper:
             for num in numeros:
                 if 1 <= num <= len(hospitales):
                     seleccionados.append(hospitales[num-1])
+        else:
+            seleccionados = self.buscar_por_nombre(seleccion, hospitales)
         
         return seleccionados
     
     def seleccionar_elemento_dropdown(self, element_id, valor, usar_index=True):
         """Función genérica para seleccionar elementos dropdown"""
-        try:
-            elemento = self.driver.find_element(By.ID, element_id)
-            select = Select(elemento)
+        def seleccionar():
+            # Se busca en cada intento: tras un postback el elemento anterior queda obsoleto
+            select = Select(self.driver.find_element(By.ID, element_id))
             if usar_index:
                 select.select_by_index(valor)
             else:
                 select.select_by_value(valor)
+        
+        try:
+            self.ejecutar_accion_con_reintentos(seleccionar, tiempo_espera=self.ESPERA_REINTENTO)
             return True
         except Exception as e:
             self.log_error(f"Error seleccionando {element_id}: {e}")
@@ -381,7 +523,7 @@ class LEQScraper:
     def hacer_clic_elemento(self, element_id, usar_javascript=True):
         """Función genérica para hacer clic en elementos"""
         try:
-            elemento = self.driver.find_element(By.ID, element_id)
+            elemento = self.obtener_elemento_con_reintentos(By.ID, element_id, tiempo_espera=self.ESPERA_REINTENTO)
             if usar_javascript:
                 self.driver.execute_script("arguments[0].click();", elemento)
             else:
@@ -399,20 +541,22 @@ class LEQScraper:
                 return elemento
             except Exception as e:
                 if intento < reintentos - 1:
+                    self.metricas.reintento('elemento')
                     time.sleep(tiempo_espera)
                     continue
                 else:
                     raise e
     
-    def ejecutar_accion_con_reintentos(self, funcion, *args, reintentos=3, **kwargs):
+    def ejecutar_accion_con_reintentos(self, funcion, *args, reintentos=3, tiempo_espera=None, **kwargs):
         """Ejecuta una acción con reintentos en caso de fallo"""
         for intento in range(reintentos):
             try:
                 return funcion(*args, **kwargs)
             except Exception as e:
                 if intento < reintentos - 1:
+                    self.metricas.reintento('accion')
                     self.log_info(f"\tReintento {intento + 1}/{reintentos}...")
-                    time.sleep(self.TIEMPO_ESPERA_CORTO)
+                    time.sleep(self.TIEMPO_ESPERA_CORTO if tiempo_espera is None else tiempo_espera)
                     continue
                 else:
                     raise e
@@ -424,7 +568,17 @@ class LEQScraper:
         # Carpeta principal
         url_nombre = url_info['nombre_file'].replace(' ', '_').replace('.', '')
         carpeta_principal = f"LEQ_{url_nombre}_{timestamp}"
-        os.makedirs(carpeta_principal, exist_ok=True)
+        
+        # Varias ejecuciones pueden empezar en el mismo segundo (modo demonio): crear la carpeta
+        # es la comprobación, así dos sesiones nunca comparten carpeta
+        sufijo = 1
+        while True:
+            try:
+                os.makedirs(carpeta_principal)
+                break
+            except FileExistsError:
+                sufijo += 1
+                carpeta_principal = f"LEQ_{url_nombre}_{timestamp}_{sufijo}"
         
         self.log_success(f"Carpeta principal: {carpeta_principal}")
         
@@ -448,80 +602,199 @@ class LEQScraper:
         except:
             return None, None
     
+    def parsear_indicadores(self, span_text):
+        """Obtiene pacientes y demora del HTML de indicadores (None si no hay datos)"""
+        # Patrones mejorados para extracción
+        patrones_pacientes = [
+            r'Nº total de pacientes.*?: *([\d.,]+)',
+            r'Total pacientes.*?: *([\d.,]+)',
+            r'Pacientes.*?: *([\d.,]+)'
+        ]
+        
+        patrones_demora = [
+            r'Demora media.*?: *([\d.,]+)\s*días',
+            r'Demora.*?: *([\d.,]+)\s*días',
+            r'Media.*?: *([\d.,]+)\s*días'
+        ]
+        
+        pacientes = None
+        demora = None
+        
+        for patron in patrones_pacientes:
+            match = re.search(patron, span_text, re.IGNORECASE)
+            if match:
+                pacientes = match.group(1).replace(',', '.')
+                break
+        
+        for patron in patrones_demora:
+            match = re.search(patron, span_text, re.IGNORECASE)
+            if match:
+                demora = match.group(1).replace(',', '.')
+                break
+        
+        # Validar que tenemos datos útiles
+        if pacientes is None and demora is None:
+            return None
+        
+        return {
+            'Pacientes_en_Lista': pacientes.replace('.', '') if pacientes else '0',
+            'Demora_Media': demora if demora else '0'
+        }
+    
+    def archivar_html(self, span_text):
+        """Guarda el HTML completo en el archivo y devuelve la referencia para el registro"""
+        if not self.directorio_archivo_html:
+            return {'Texto_Completo': span_text[:500]}  # Limitar longitud
+        
+        if self.archivo_html is None:
+            from LEQ_Archivo import ArchivoHTML
+            self.archivo_html = ArchivoHTML(self.directorio_archivo_html)
+        
+        return {'Hash_HTML': self.archivo_html.guardar(span_text)}
+    
+    def construir_registro(self, span_text, url, nombre_hospital, texto_mes, nombre_especialidad=None):
+        """Construye el registro de una consulta a partir del HTML de indicadores"""
+        valores = self.parsear_indicadores(span_text)
+        if valores is None:
+            return None
+        
+        # Extraer año y mes con más robustez
+        ano, mes = self.extraer_ano_y_mes_del_texto(texto_mes)
+        
+        registro = {
+            'Fecha_Extraccion': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'URL': url,
+            'Filtro_Mes': texto_mes,
+            'Filtro_Hospital': nombre_hospital,
+            'Filtro_Especialidad': nombre_especialidad if nombre_especialidad else 'Todas',
+            'Año': ano,
+            'Mes': mes,
+            **valores
+        }
+        registro.update(self.archivar_html(span_text))
+        
+        return registro
+    
+    def timeout_consulta(self):
+        """Timeout de las esperas de una consulta (recortado si se acaba el plazo)"""
+        if self.plazo:
+            return self.plazo.timeout(self.TIEMPO_TIMEOUT)
+        return self.TIEMPO_TIMEOUT
+    
+    def captura_activa(self):
+        """Captura de red del navegador actual (None si está desactivada)"""
+        if not self.captura_red or self.driver is None:
+            return None
+        
+        if self.captura is None or self.captura.driver is not self.driver:
+            from LEQ_Red import CapturaRed
+            self.captura = CapturaRed(self.driver)
+        return self.captura
+    
+    def pulsar_buscar(self):
+        """Pulsa Buscar (con captura de red, tras descartar los eventos anteriores)"""
+        captura = self.captura_activa()
+        if captura:
+            captura.vaciar()
+            try:
+                self.pagina_enviada = self.driver.find_element(By.ID, "ContenedorContenidoSeccion_ddlHospital")
+            except Exception:
+                self.pagina_enviada = None
+        return self.hacer_clic_elemento("ContenedorContenidoSeccion_btnEnviar")
+    
+    def esperar_fin_postback(self, driver, timeout):
+        """Espera a que el navegador sustituya la página en la que se pulsó Buscar y termine de cargar la nueva"""
+        anterior, self.pagina_enviada = self.pagina_enviada, None
+        if anterior is None:
+            return
+        try:
+            WebDriverWait(driver, timeout).until(EC.staleness_of(anterior))
+            WebDriverWait(driver, timeout).until(
+                lambda d: d.execute_script("return document.readyState") == 'complete'
+            )
+        except Exception:
+            pass  # postback parcial que no sustituye la página
+    
+    def limite_consulta(self):
+        """Instante (time.monotonic) en que vence la espera de una consulta, reintentos incluidos"""
+        return time.monotonic() + self.timeout_consulta()
+    
+    def leer_html_indicadores(self, driver, limite=None):
+        """Espera al span de indicadores con texto y devuelve su HTML"""
+        # Todas las esperas comparten el límite de la consulta: ninguna se pasa del plazo
+        if limite is None:
+            limite = self.limite_consulta()
+        
+        def restante():
+            return max(0, limite - time.monotonic())
+        
+        # Con captura de red el span sale de la respuesta del postback, sin consultar el DOM
+        captura = self.captura_activa()
+        if captura:
+            from LEQ_Red import contenido_elemento
+            
+            respuesta = captura.esperar_respuesta(restante())
+            span_html = contenido_elemento(respuesta, "ContenedorContenidoSeccion_lblIndicadores") if respuesta else None
+            
+            # La respuesta llega antes de que el navegador cargue la página: la siguiente selección
+            # (o la lectura del DOM si la respuesta no sirve) no debe ir a la página anterior
+            self.esperar_fin_postback(driver, restante())
+            if span_html and span_html.strip():
+                return span_html
+        
+        # Esperar con condiciones más específicas
+        span_element = WebDriverWait(driver, restante()).until(
+            EC.presence_of_element_located((By.ID, "ContenedorContenidoSeccion_lblIndicadores"))
+        )
+        
+        # Esperar a que el texto esté disponible
+        WebDriverWait(driver, restante()).until(
+            lambda d: span_element.text.strip() != ""
+        )
+        
+        return span_element.get_attribute('innerHTML')
+    
+    def obtener_html_indicadores(self, driver):
+        """Lee el HTML de indicadores sin parsearlo (None si no aparece tras 2 intentos)"""
+        limite = self.limite_consulta()
+        for intento in range(2):
+            try:
+                return self.leer_html_indicadores(driver, limite)
+            except Exception as e:
+                # Sin reintento si ya no queda tiempo
+                if intento == 0 and time.monotonic() < limite:
+                    self.metricas.reintento('indicadores')
+                    time.sleep(self.TIEMPO_ESPERA_CORTO)
+                else:
+                    self.log_error(f"Error extrayendo datos: {str(e)[:100]}")
+        return None
+    
     def extraer_datos_span(self, driver, nombre_hospital, texto_mes, nombre_especialidad=None):
         """Extrae datos del span con los indicadores - Versión mejorada"""
         datos = []
+        limite = self.limite_consulta()
         
         for intento in range(2):  # 2 intentos
             try:
-                # Esperar con condiciones más específicas
-                span_element = WebDriverWait(driver, self.TIEMPO_TIMEOUT).until(
-                    EC.presence_of_element_located((By.ID, "ContenedorContenidoSeccion_lblIndicadores"))
-                )
+                span_text = self.leer_html_indicadores(driver, limite)
                 
-                # Esperar a que el texto esté disponible
-                WebDriverWait(driver, self.TIEMPO_TIMEOUT).until(
-                    lambda d: span_element.text.strip() != ""
+                registro = self.construir_registro(
+                    span_text, driver.current_url, nombre_hospital, texto_mes, nombre_especialidad
                 )
                 
-                span_text = span_element.get_attribute('innerHTML')
-                
-                # Patrones mejorados para extracción
-                patrones_pacientes = [
-                    r'Nº total de pacientes.*?: *([\d.,]+)',
-                    r'Total pacientes.*?: *([\d.,]+)',
-                    r'Pacientes.*?: *([\d.,]+)'
-                ]
-                
-                patrones_demora = [
-                    r'Demora media.*?: *([\d.,]+)\s*días',
-                    r'Demora.*?: *([\d.,]+)\s*días',
-                    r'Media.*?: *([\d.,]+)\s*días'
-                ]
-                
-                pacientes = None
-                demora = None
-                
-                for patron in patrones_pacientes:
-                    match = re.search(patron, span_text, re.IGNORECASE)
-                    if match:
-                        pacientes = match.group(1).replace(',', '.')
-                        break
-                
-                for patron in patrones_demora:
-                    match = re.search(patron, span_text, re.IGNORECASE)
-                    if match:
-                        demora = match.group(1).replace(',', '.')
-                        break
-                
-                # Extraer año y mes con más robustez
-                ano, mes = self.extraer_ano_y_mes_del_texto(texto_mes)
-                
-                # Validar que tenemos datos útiles
-                if pacientes is not None or demora is not None:
-                    registro = {
-                        'Fecha_Extraccion': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                        'URL': driver.current_url,
-                        'Filtro_Mes': texto_mes,
-                        'Filtro_Hospital': nombre_hospital,
-                        'Filtro_Especialidad': nombre_especialidad if nombre_especialidad else 'Todas',
-                        'Año': ano,
-                        'Mes': mes,
-                        'Pacientes_en_Lista': pacientes.replace('.', '') if pacientes else '0',
-                        'Demora_Media': demora if demora else '0',
-                        'Texto_Completo': span_text[:500]  # Limitar longitud
-                    }
-                    
+                if registro:
                     datos.append(registro)
                     return datos, True
                 else:
                     # Si no encuentra datos, esperar y reintentar
                     if intento == 0:
+                        self.metricas.reintento('indicadores')
                         time.sleep(self.TIEMPO_ESPERA_CORTO)
                         continue
                     
             except Exception as e:
                 if intento == 0:
+                    self.metricas.reintento('indicadores')
                     time.sleep(self.TIEMPO_ESPERA_CORTO)
                     continue
                 else:
@@ -536,199 +809,454 @@ class LEQScraper:
         
         return datos_span
     
-    def mostrar_barra_progreso(self, iteracion, total, longitud=50):
+    def mostrar_barra_progreso(self, iteracion, total, longitud=50, sufijo=''):
         """Muestra una barra de progreso en consola"""
         porcentaje = (iteracion + 1) / total
         completado = int(longitud * porcentaje)
         restante = longitud - completado
         
-        barra = f"[{'#' * completado}{'-' * restante}] {porcentaje*100:6.2f}%"
-        print(f"\r{barra}", end='', flush=True)
+        barra = f"[{'#' * completado}{'-' * restante}] {porcentaje*100:6.2f}%{sufijo}"
+        print(f"\r{barra}\033[K", end='', flush=True)
         
         if iteracion + 1 == total:
             print()  # Nueva línea al completar
     
-    def mostrar_progreso_consulta(self, consulta_num, total_consultas, mes, datos, especialidad=None):
+    def mostrar_progreso_consulta(self, consulta_num, total_consultas, mes, datos, especialidad=None, hospital=None, duracion=None):
         """Muestra el progreso de forma más informativa"""
+        campos = {
+            'hospital': hospital['nombre'] if hospital else None,
+            'mes': mes['texto'],
+            'especialidad': especialidad['nombre'] if especialidad else None,
+            'consulta': consulta_num,
+            'total_consultas': total_consultas,
+            'duracion': round(duracion, 3) if duracion is not None else None
+        }
+        
         if datos and datos[0].get('Pacientes_en_Lista') and datos[0].get('Demora_Media'):
             pacientes = datos[0]['Pacientes_en_Lista']
             demora = datos[0]['Demora_Media']
+            campos.update({'pacientes': pacientes, 'demora': demora})
             
             if especialidad:
-                self.log_info(f"\t[{consulta_num:3}/{total_consultas}] ✓ {mes['texto'][:15]:15} | {especialidad['nombre'][:20]:20} | Pac: {pacientes:>6} | Días: {demora:>6}")
+                self.log_info(f"\t[{consulta_num:3}/{total_consultas}] ✓ {mes['texto'][:15]:15} | {especialidad['nombre'][:20]:20} | Pac: {pacientes:>6} | Días: {demora:>6}", **campos)
             else:
-                self.log_info(f"\t[{consulta_num:3}/{total_consultas}] ✓ {mes['texto'][:15]:15} | {'Sin especialidad':20} | Pac: {pacientes:>6} | Días: {demora:>6}")
+                self.log_info(f"\t[{consulta_num:3}/{total_consultas}] ✓ {mes['texto'][:15]:15} | {'Sin especialidad':20} | Pac: {pacientes:>6} | Días: {demora:>6}", **campos)
         else:
-            self.log_warning(f"\t[{consulta_num:3}/{total_consultas}] ✗ Sin datos")
+            self.log_warning(f"\t[{consulta_num:3}/{total_consultas}] ✗ Sin datos", **campos)
+    
+    def formulario_perdido(self):
+        """Indica si la página ya no tiene el formulario (error del servidor, ViewState caducado, corte)"""
+        try:
+            return not self.driver.find_elements(By.ID, "ContenedorContenidoSeccion_ddlHospital")
+        except Exception:
+            return False  # sin navegador no hay nada que recargar
+    
+    def recargar_formulario(self, url=None):
+        """Vuelve a cargar el formulario (ViewState nuevo); True si vuelve a estar disponible"""
+        self.log_warning("\tPágina de error en lugar del formulario: recargando")
+        self.metricas.reintento('recarga')
+        try:
+            self.driver.get(url or self.url_actual)
+            WebDriverWait(self.driver, self.TIEMPO_TIMEOUT).until(
+                EC.presence_of_element_located((By.ID, "ContenedorContenidoSeccion_ddlHospital"))
+            )
+            return True
+        except Exception as e:
+            self.log_error(f"No se pudo recargar el formulario: {str(e)[:80]}")
+            return False
     
     def manejar_error_consulta(self, error):
         """Maneja errores en las consultas"""
         self.log_error(f"Error en consulta: {str(error)[:80]}")
     
-    def procesar_hospital_optimizado(self, hospital, meses_a_procesar, especialidades_a_procesar, total_consultas):
-        """Procesa un hospital de forma optimizada"""
-        datos_hospital = []
-        consultas_exitosas = 0
+    def enviar_consulta(self, mes, especialidad=None, sin_esperar=False):
+        """Selecciona especialidad y mes y pulsa Buscar (False si falla alguna selección)"""
+        # Seleccionar especialidad
+        if especialidad and not self.seleccionar_elemento_dropdown(
+            "ContenedorContenidoSeccion_ddlEspecialidad",
+            especialidad['valor'],
+            usar_index=False
+        ):
+            return False
         
-        # Procesar sin filtro de especialidad
-        if not especialidades_a_procesar:
-            for mes_idx, mes in enumerate(meses_a_procesar):
-                consulta_num = mes_idx + 1
-                
-                # Límite para pruebas (descomentar si es necesario)
-                # if consulta_num > 15: break
+        # Seleccionar mes
+        if not self.seleccionar_elemento_dropdown(
+            "ContenedorContenidoSeccion_ddlFecha",
+            mes['valor'],
+            usar_index=False
+        ):
+            return False
+        
+        if sin_esperar:
+            # Modo pestañas: la respuesta se recoge después, mientras tanto se atienden otras pestañas
+            from LEQ_Formulario import SCRIPT_ENVIAR_SIN_ESPERA
+            self.driver.execute_script(SCRIPT_ENVIAR_SIN_ESPERA)
+            return True
+        
+        # Hacer clic en Buscar
+        if not self.pulsar_buscar():
+            return False
+        
+        time.sleep(self.TIEMPO_ESPERA_NORMAL)
+        return True
+    
+    def consultar(self, nombre_hospital, mes, especialidad=None):
+        """Ejecuta una consulta (especialidad + mes) sobre el hospital ya seleccionado"""
+        if not self.enviar_consulta(mes, especialidad):
+            return None
+        
+        # Extraer datos
+        return self.extraer_datos(
+            self.driver,
+            nombre_hospital,
+            mes['texto'],
+            especialidad['nombre'] if especialidad else None
+        )
+    
+    def abrir_pestanas(self, numero):
+        """Pestañas de la sesión con el formulario del informe cargado (se reutilizan entre llamadas)"""
+        vivas = set(self.driver.window_handles)
+        self.pestanas_abiertas = [p for p in self.pestanas_abiertas if p['handle'] in vivas]
+        
+        if not self.pestanas_abiertas:
+            self.pestanas_abiertas.append({'handle': self.driver.current_window_handle, 'hospital': None})
+        
+        while len(self.pestanas_abiertas) < numero:
+            self.driver.switch_to.new_window('tab')
+            self.driver.get(self.url_actual)
+            self.pestanas_abiertas.append({'handle': self.driver.current_window_handle, 'hospital': None})
+        
+        # La pestaña principal puede haber cambiado de hospital fuera de este modo
+        self.pestanas_abiertas[0]['hospital'] = None
+        return self.pestanas_abiertas[:numero]
+    
+    def despachar_en_pestana(self, pestana, elemento):
+        """Prepara el formulario de la pestaña y pulsa Buscar sin esperar (False si falla)"""
+        consulta = elemento['consulta']
+        elemento['inicio'] = time.perf_counter()
+        
+        try:
+            if pestana.get('recargar'):
+                pestana['recargar'] = False
+                pestana['hospital'] = None
+                if not self.recargar_formulario():
+                    elemento['fallida'] = True
+                    return False
+            
+            hospital = consulta['hospital']
+            if pestana['hospital'] != hospital['nombre']:
+                if not self.seleccionar_elemento_dropdown(
+                    "ContenedorContenidoSeccion_ddlHospital", hospital['indice'], usar_index=True
+                ):
+                    elemento['fallida'] = True
+                    return False
+                pestana['hospital'] = hospital['nombre']
+            
+            if not self.enviar_consulta(consulta['mes'], consulta['especialidad'], sin_esperar=True):
+                elemento['fallida'] = True
+                return False
+        except Exception as e:
+            elemento['error'] = e
+            return False
+        
+        return True
+    
+    def descargar_en_pestanas(self, consultas, tuberia):
+        """Alterna las consultas entre pestañas: mientras una espera al servidor se prepara otra"""
+        from LEQ_Formulario import SCRIPT_RESPUESTA
+        
+        pestanas = self.abrir_pestanas(self.pestanas)
+        elementos = [{'consulta': consulta, 'numero': idx + 1} for idx, consulta in enumerate(consultas)]
+        colas = repartir_consultas(elementos, len(pestanas), clave=lambda e: e['consulta']['hospital']['nombre'])
+        activas = [
+            {'pestana': pestana, 'cola': deque(cola), 'elemento': None}
+            for pestana, cola in zip(pestanas, colas) if cola
+        ]
+        self.log_info(f"\t{len(consultas)} consultas repartidas en {len(activas)} pestañas")
+        
+        try:
+            while activas:
+                atendidas = 0
                 
-                try:
-                    # Seleccionar mes
-                    if not self.seleccionar_elemento_dropdown(
-                        "ContenedorContenidoSeccion_ddlFecha", 
-                        mes['valor'], 
-                        usar_index=False
-                    ):
-                        continue
-                    
-                    # Hacer clic en Buscar
-                    if not self.hacer_clic_elemento("ContenedorContenidoSeccion_btnEnviar"):
-                        continue
-                    
-                    time.sleep(self.TIEMPO_ESPERA_NORMAL)
-                    
-                    # Extraer datos
-                    datos = self.extraer_datos(
-                        self.driver, 
-                        hospital['nombre'], 
-                        mes['texto'],
-                        None
-                    )
-                    
-                    self.mostrar_progreso_consulta(consulta_num, total_consultas, mes, datos)
-                    
-                    if datos:
-                        datos_hospital.extend(datos)
-                        consultas_exitosas += 1
-                        
-                except Exception as e:
-                    self.manejar_error_consulta(e)
-                    continue
-        else:
-            # Procesar con especialidades
-            for mes_idx, mes in enumerate(meses_a_procesar):
-                for esp_idx, especialidad in enumerate(especialidades_a_procesar):
-                    consulta_num = mes_idx * len(especialidades_a_procesar) + esp_idx + 1
-                    
-                    # Límite para pruebas
-                    # if consulta_num > 15: break
+                for activa in list(activas):
+                    self.driver.switch_to.window(activa['pestana']['handle'])
+                    elemento = activa['elemento']
                     
-                    try:
-                        # Seleccionar especialidad
-                        if not self.seleccionar_elemento_dropdown(
-                            "ContenedorContenidoSeccion_ddlEspecialidad",
-                            especialidad['valor'],
-                            usar_index=False
-                        ):
-                            continue
-                        
-                        # Seleccionar mes
-                        if not self.seleccionar_elemento_dropdown(
-                            "ContenedorContenidoSeccion_ddlFecha",
-                            mes['valor'],
-                            usar_index=False
-                        ):
-                            continue
-                        
-                        # Hacer clic en Buscar
-                        if not self.hacer_clic_elemento("ContenedorContenidoSeccion_btnEnviar"):
+                    # Recoger la respuesta pendiente de la pestaña
+                    if elemento is not None:
+                        html = self.driver.execute_script(SCRIPT_RESPUESTA)
+                        duracion = time.perf_counter() - elemento['inicio']
+                        if html is None and duracion < self.timeout_consulta():
                             continue
                         
-                        time.sleep(self.TIEMPO_ESPERA_NORMAL)
-                        
-                        # Extraer datos
-                        datos = self.extraer_datos(
-                            self.driver,
-                            hospital['nombre'],
-                            mes['texto'],
-                            especialidad['nombre']
-                        )
+                        # Página de error: la pestaña se recarga y la consulta se repite una vez
+                        if html is False:
+                            activa['pestana']['recargar'] = True
+                            activa['elemento'] = None
+                            if not elemento.get('repetida'):
+                                elemento['repetida'] = True
+                                activa['cola'].appendleft(elemento)
+                                atendidas += 1
+                                continue
+                            html = None
                         
-                        self.mostrar_progreso_consulta(consulta_num, total_consultas, mes, datos, especialidad)
-                        
-                        if datos:
-                            datos_hospital.extend(datos)
-                            consultas_exitosas += 1
-                            
-                    except Exception as e:
-                        self.manejar_error_consulta(e)
-                        continue
+                        elemento['html'] = html
+                        elemento['url'] = self.driver.current_url
+                        elemento['duracion'] = duracion
+                        if self.plazo:
+                            self.plazo.registrar(duracion)
+                        tuberia.enviar(elemento)
+                        activa['elemento'] = None
+                        atendidas += 1
+                    
+                    if self.plazo and activa['cola'] and not self.plazo.puede_despachar():
+                        self.plazo_agotado = True
+                        self.pendientes.extend(e['consulta'] for e in activa['cola'])
+                        activa['cola'].clear()
+                    
+                    # Enviar la siguiente consulta de la pestaña
+                    while activa['cola'] and activa['elemento'] is None:
+                        # Sale de la cola una vez despachada: si se interrumpe antes, sigue pendiente
+                        elemento = activa['cola'][0]
+                        despachada = self.despachar_en_pestana(activa['pestana'], elemento)
+                        activa['cola'].popleft()
+                        if despachada:
+                            activa['elemento'] = elemento
+                        else:
+                            elemento['duracion'] = time.perf_counter() - elemento['inicio']
+                            tuberia.enviar(elemento)
+                        atendidas += 1
+                    
+                    if activa['elemento'] is None:
+                        activas.remove(activa)
+                
+                # Ninguna pestaña tenía respuesta: esperar un poco antes de volver a mirar
+                if not atendidas:
+                    time.sleep(0.05)
+        
+        except KeyboardInterrupt:
+            self.interrumpido = True
+            for activa in activas:
+                if activa['elemento'] is not None:
+                    self.pendientes.append(activa['elemento']['consulta'])
+                self.pendientes.extend(e['consulta'] for e in activa['cola'])
+            self.log_warning("\tEjecución interrumpida: se guardará lo extraído hasta ahora")
+        
+        finally:
+            self.driver.switch_to.window(pestanas[0]['handle'])
+        
+        if self.plazo_agotado:
+            self.log_warning("\tSin tiempo para el resto de consultas: quedan pendientes")
+    
+    def aplicar_mapa_dispersion(self, consultas):
+        """Omite (o pospone) las combinaciones que estuvieron vacías en ejecuciones anteriores"""
+        if not self.mapa_dispersion:
+            return consultas
+        
+        consultas_filtradas, omitidas = self.mapa_dispersion.filtrar(consultas)
+        
+        if omitidas:
+            self.log_info(f"\t{omitidas} consultas omitidas (vacías en ejecuciones anteriores)")
+            if self.progreso:
+                self.progreso.descontar(omitidas)
+        
+        return consultas_filtradas
+    
+    def parsear_consulta(self, elemento):
+        """Etapa de parseo: construye el registro a partir del HTML descargado"""
+        consulta = elemento['consulta']
+        elemento['registro'] = None
+        
+        if elemento.get('html'):
+            elemento['registro'] = self.construir_registro(
+                elemento['html'],
+                elemento['url'],
+                consulta['hospital']['nombre'],
+                consulta['mes']['texto'],
+                consulta['especialidad']['nombre'] if consulta['especialidad'] else None
+            )
         
-        return datos_hospital, consultas_exitosas
+        # Respuesta íntegra del servidor (captura de red) junto al HTML de indicadores
+        if elemento['registro'] and elemento.get('respuesta') and self.archivo_html:
+            elemento['registro']['Hash_Respuesta'] = self.archivo_html.guardar(elemento['respuesta'])
     
-    def limpiar_nombre_hoja(self, nombre):
-        """Limpia el nombre para usarlo como hoja de Excel"""
-        caracteres_invalidos = ['<', '>', ':', '"', '/', '\\', '|', '?', '*', '[', ']']
-        nombre_limpio = nombre
+    def validar_consulta(self, elemento):
+        """Etapa de validación: avisa de valores no numéricos (la normalización los marcará)"""
+        registro = elemento['registro']
+        elemento['datos'] = [registro] if registro else []
         
-        for char in caracteres_invalidos:
-            nombre_limpio = nombre_limpio.replace(char, '_')
+        if registro is None:
+            return
         
-        # Limitar longitud para Excel (31 caracteres máximo)
-        if len(nombre_limpio) > 31:
-            nombre_limpio = nombre_limpio[:31]
+        valores = [registro.get('Pacientes_en_Lista'), registro.get('Demora_Media')]
+        if not all(valor and re.fullmatch(r'\d+(\.\d+)?', valor) for valor in valores):
+            self.log_warning(f"\tValores no numéricos en {registro['Filtro_Mes']}: {valores}")
+    
+    def procesar_hospital_optimizado(self, hospital, meses_a_procesar, especialidades_a_procesar, total_consultas):
+        """Procesa un hospital de forma optimizada"""
+        consultas = planificar_consultas(
+            self.url_actual, hospital, meses_a_procesar, especialidades_a_procesar
+        )
+        consultas = self.aplicar_mapa_dispersion(consultas)
         
-        return nombre_limpio
+        return self.procesar_consultas(consultas, total_consultas, hospital_actual=hospital)
     
-    def crear_hoja_resumen(self, writer, df_completo, estadisticas):
-        """Crea una hoja de resumen en el Excel"""
+    def descargar_consulta(self, elemento, hospital_actual):
+        """Selecciona hospital, especialidad y mes, pulsa Buscar y guarda el HTML en el elemento; devuelve el hospital cargado"""
+        consulta = elemento['consulta']
+        inicio = time.perf_counter()
         try:
-            # Resumen general
-            resumen_data = {
-                'Total Hospitales Procesados': [len(df_completo['Filtro_Hospital'].unique()) if 'Filtro_Hospital' in df_completo.columns else 0],
-                'Total Registros': [len(df_completo)],
-                'Fecha Inicio': [self.inicio_proceso.strftime('%Y-%m-%d %H:%M:%S')],
-                'Fecha Fin': [datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
-                'Tiempo Total (segundos)': [(datetime.now() - self.inicio_proceso).total_seconds()],
-                'Especialidades Seleccionadas': [len(self.especialidades_seleccionadas_global) if self.especialidades_seleccionadas_global else 0]
-            }
-            
-            df_resumen = pd.DataFrame(resumen_data)
-            df_resumen.to_excel(writer, sheet_name='Resumen', index=False)
+            hospital = consulta['hospital']
+            if hospital_actual is None or hospital_actual['nombre'] != hospital['nombre']:
+                if self.seleccionar_elemento_dropdown(
+                    "ContenedorContenidoSeccion_ddlHospital", hospital['indice'], usar_index=True
+                ):
+                    hospital_actual = hospital
+                    if self.progreso:
+                        self.progreso.iniciar_hospital(hospital['nombre'])
+                else:
+                    elemento['fallida'] = True
+                    return hospital_actual
             
+            if self.enviar_consulta(consulta['mes'], consulta['especialidad']):
+                elemento['html'] = self.obtener_html_indicadores(self.driver)
+                elemento['url'] = self.driver.current_url
+                if self.captura:
+                    elemento['respuesta'] = self.captura.respuesta
+                
+                if self.plazo:
+                    self.plazo.registrar(time.perf_counter() - inicio)
+            else:
+                elemento['fallida'] = True
+        
         except Exception as e:
-            self.log_error(f"Error creando hoja de resumen: {e}")
+            elemento['error'] = e
+        
+        return hospital_actual
     
-    def guardar_excel_completo(self, df_completo, estadisticas, excel_path):
-        """Guarda Excel con múltiples hojas organizadas"""
-        with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-            # Hoja principal
-            df_completo.to_excel(writer, sheet_name='Datos_Completos', index=False)
+    def procesar_consultas(self, consultas, total_consultas, hospital_actual=None):
+        """Ejecuta consultas de uno o varios hospitales (cambia de hospital solo cuando hace falta)"""
+        resultados = []
+        
+        def volcar(elemento):
+            # Etapa final (un solo hilo): progreso, mapa de vacíos, consola y acumulación
+            if elemento.get('fallida'):
+                # Selección fallida: cuenta en el progreso pero no como vacía
+                self.metricas.registrar_consulta('fallida', elemento.get('duracion'))
+                if self.progreso:
+                    self.progreso.registrar(False)
+                return
             
-            # Hoja por hospital
-            if 'Filtro_Hospital' in df_completo.columns:
-                hospitales_unicos = df_completo['Filtro_Hospital'].unique()
-                for hospital in hospitales_unicos:
-                    df_hospital = df_completo[df_completo['Filtro_Hospital'] == hospital]
-                    nombre_hoja = self.limpiar_nombre_hoja(hospital)
-                    df_hospital.to_excel(writer, sheet_name=nombre_hoja, index=False)
-            
-            # Hoja por especialidad (si existe)
-            if 'Filtro_Especialidad' in df_completo.columns:
-                especialidades_unicas = df_completo['Filtro_Especialidad'].unique()
-                for especialidad in especialidades_unicas:
-                    df_especialidad = df_completo[df_completo['Filtro_Especialidad'] == especialidad]
-                    if len(df_especialidad) > 0:
-                        nombre_hoja = f"Esp_{self.limpiar_nombre_hoja(especialidad)}"
-                        df_especialidad.to_excel(writer, sheet_name=nombre_hoja, index=False)
-            
-            # Hoja de estadísticas
-            if estadisticas:
-                df_estadisticas = pd.DataFrame(estadisticas)
-                df_estadisticas.to_excel(writer, sheet_name='Estadisticas', index=False)
+            if 'error' in elemento:
+                self.metricas.registrar_consulta('error', elemento.get('duracion'))
+                if self.progreso:
+                    self.progreso.registrar(False)
+                self.manejar_error_consulta(elemento['error'])
+                return
+            
+            datos = elemento['datos']
+            if datos:
+                resultado = 'datos'
+            else:
+                resultado = 'sin_datos' if elemento.get('html') else 'sin_respuesta'
+            self.metricas.registrar_consulta(resultado, elemento.get('duracion'))
+            if self.progreso:
+                self.progreso.registrar(bool(datos))
+            
+            # Solo cuenta como vacía si llegó el indicador; sin respuesta (timeout, error) no se sabe
+            if self.mapa_dispersion and elemento.get('html'):
+                self.mapa_dispersion.registrar(elemento['consulta']['clave'], bool(datos))
+            
+            self.mostrar_progreso_consulta(
+                elemento['numero'], total_consultas, elemento['consulta']['mes'], datos,
+                elemento['consulta']['especialidad'], hospital=elemento['consulta']['hospital'],
+                duracion=elemento['duracion']
+            )
+            
+            if datos:
+                resultados.append((elemento['numero'], datos))
+        
+        # El navegador solo descarga; parseo, validación y volcado van en otros hilos
+        tuberia = Tuberia([
+            ('parseo', self.parsear_consulta, self.hilos_parseo),
+            ('validacion', self.validar_consulta, 1),
+            ('volcado', volcar, 1)
+        ], capacidad=self.capacidad_colas)
+        
+        if self.progreso:
+            self.progreso.colas = tuberia.profundidades
+        
+        # Consultas ya entregadas a la tubería: las que sigan no lo están y quedan pendientes
+        enviadas = 0
+        try:
+            if self.pestanas > 1:
+                self.descargar_en_pestanas(consultas, tuberia)
+            else:
+                for consulta_idx, consulta in enumerate(consultas):
+                    consulta_num = consulta_idx + 1
+                    elemento = {'consulta': consulta, 'numero': consulta_num}
+                    
+                    # No se despachan consultas que no pueden terminar dentro del plazo
+                    if self.plazo and not self.plazo.puede_despachar():
+                        self.plazo_agotado = True
+                        self.pendientes.extend(consultas[enviadas:])
+                        self.log_warning(f"\tSin tiempo para {len(consultas) - enviadas} consultas: quedan pendientes")
+                        break
+                    
+                    # Límite para pruebas (descomentar si es necesario)
+                    # if consulta_num > 15: break
+                    
+                    inicio_consulta = time.perf_counter()
+                    hospital_actual = self.descargar_consulta(elemento, hospital_actual)
+                    
+                    # Sin formulario (ViewState caducado, error 500, corte) fallarían también las siguientes:
+                    # se recarga la página y se repite la consulta una vez
+                    if not elemento.get('html') and self.formulario_perdido() and self.recargar_formulario():
+                        hospital_actual = None
+                        for campo in ('fallida', 'error', 'html'):
+                            elemento.pop(campo, None)
+                        hospital_actual = self.descargar_consulta(elemento, hospital_actual)
+                    
+                    # También las fallidas: su tiempo cuenta en la latencia de cola
+                    elemento['duracion'] = time.perf_counter() - inicio_consulta
+                    tuberia.enviar(elemento)
+                    enviadas = consulta_idx + 1
+        except KeyboardInterrupt:
+            # Se conserva lo ya extraído: las etapas terminan con lo que esté en las colas
+            self.interrumpido = True
+            # Con pestañas las pendientes ya las apunta descargar_en_pestanas
+            if self.pestanas <= 1:
+                self.pendientes.extend(consultas[enviadas:])
+            self.log_warning("\tEjecución interrumpida: se guardará lo extraído hasta ahora")
+        finally:
+            for etapa, error in tuberia.cerrar():
+                self.log_error(f"Error en la etapa de {etapa}: {str(error)[:80]}")
             
-            # Hoja de resumen
-            self.crear_hoja_resumen(writer, df_completo, estadisticas)
+            if self.progreso:
+                self.progreso.colas = None
+        
+        self.log_info(f"\tProfundidad máxima de colas: {tuberia.profundidades()}",
+                      colas=tuberia.profundidades())
         
-#        self.log_success(f"Excel: {os.path.basename(excel_path)}")
-#        self.log_info(f"  - Hojas creadas: {len(writer.sheets)}")
-#        self.log_info(f"  - Registros totales: {len(df_completo):,}")
+        if self.mapa_dispersion:
+            self.mapa_dispersion.guardar()
+        
+        # Los hilos de parseo pueden terminar en otro orden: se restaura el de ejecución
+        resultados.sort(key=lambda resultado: resultado[0])
+        datos = [registro for _, datos_consulta in resultados for registro in datos_consulta]
+        
+        return datos, len(resultados)
+    
+    def datos_resumen(self, df_completo):
+        """Datos de la hoja de resumen del Excel"""
+        return {
+            'Total Hospitales Procesados': len(df_completo['Filtro_Hospital'].unique()) if 'Filtro_Hospital' in df_completo.columns else 0,
+            'Total Registros': len(df_completo),
+            'Fecha Inicio': self.inicio_proceso.strftime('%Y-%m-%d %H:%M:%S'),
+            'Fecha Fin': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'Tiempo Total (segundos)': (datetime.now() - self.inicio_proceso).total_seconds(),
+            'Especialidades Seleccionadas': len(self.especialidades_seleccionadas_global) if self.especialidades_seleccionadas_global else 0
+        }
     
     def guardar_resumen_ejecucion(self, carpeta_principal, df_completo, estadisticas):
         """Guarda un archivo de resumen de la ejecución"""
@@ -762,7 +1290,65 @@ class LEQScraper:
                     f.write(f"  - Registros: {estad.get('Registros', 0)}\n")
                     f.write(f"  - Estado: {estad.get('Estado', 'N/A')}\n\n")
         
-        self.log_success(f"Resumen guardado en: {os.path.basename(resumen_path)}")
+        return resumen_path
+    
+    def generar_feed_cambios(self, todos_datos, carpeta_principal, nombre_base):
+        """Genera el feed de cambios (JSON Lines) respecto a los últimos valores guardados"""
+        if not self.ruta_estado_cambios:
+            return
+        
+        try:
+            registro_cambios = RegistroCambios(self.ruta_estado_cambios)
+            cambios, resumen = registro_cambios.comparar(todos_datos)
+            
+            feed_path = os.path.join(carpeta_principal, f"Cambios_{nombre_base}.jsonl")
+            escribir_feed_cambios(feed_path, cambios, resumen)
+            
+            # Solo se actualizan los últimos valores cuando el feed está escrito
+            registro_cambios.actualizar(todos_datos)
+            
+            self.log_success(
+                f"Cambios: {resumen['insertados']} nuevos, {resumen['actualizados']} actualizados, "
+                f"{resumen['sin_cambios']} sin cambios"
+            )
+        except Exception as e:
+            self.log_error(f"Error generando feed de cambios: {e}")
+    
+    def actualizar_cubo(self, df_completo):
+        """Actualiza el cubo agregado con los meses extraídos en esta ejecución"""
+        if not self.directorio_cubo or not self.normalizar_datos:
+            return
+        
+        try:
+            from LEQ_Cubo import actualizar_cubo
+            
+            _, resumen = actualizar_cubo(self.directorio_cubo, df_completo)
+            self.log_success(
+                f"Cubo: {resumen['filas_cubo']:,} filas ({resumen['grupos_recalculados']} grupos recalculados) "
+                f"en {resumen['ruta']}"
+            )
+            
+            if self.url_servicio:
+                from LEQ_Servicio import notificar_nueva_ejecucion
+                if not notificar_nueva_ejecucion(self.url_servicio):
+                    self.log_warning(f"No se pudo avisar al servicio de consulta en {self.url_servicio}")
+        except Exception as e:
+            self.log_error(f"Error actualizando el cubo agregado: {e}")
+    
+    def guardar_dataset(self, df_completo):
+        """Publica los meses extraídos en el dataset particionado (sustituye solo esas particiones)"""
+        from LEQ_Dataset import escribir_dataset
+        
+        informes = {url_info['url']: numero for numero, url_info in self.urls_disponibles.items()}
+        resumen = escribir_dataset(df_completo, self.directorio_dataset, informes)
+        self.dataset_escrito = resumen
+        
+        if resumen['descartadas']:
+            self.log_warning(f"{resumen['descartadas']} registros sin informe o mes reconocible fuera del dataset")
+        self.log_success(
+            f"Dataset: {resumen['filas']:,} filas en {resumen['particiones']} particiones de {self.directorio_dataset}"
+        )
+        return self.directorio_dataset
     
     def guardar_archivos_consolidados(self, todos_datos, estadisticas, carpeta_principal, anos_seleccionados, filtrar):
         """Guarda archivos en múltiples formatos"""
@@ -778,161 +1364,795 @@ class LEQScraper:
         
         df_completo = pd.DataFrame(todos_datos)
         
+        if self.normalizar_datos:
+            from LEQ_Normalizacion import normalizar_dataset
+            df_completo = normalizar_dataset(df_completo)
+        
         # Nombre base según configuración
         if filtrar and anos_seleccionados:
             nombre_base = f"Datos_Filtrados_{'_'.join(map(str, anos_seleccionados))}"
         else:
             nombre_base = "Datos_Completos"
         
+        # El mismo DataFrame (que ya no se modifica) alimenta todos los formatos a la vez
+        from LEQ_Exportacion import (escribir_csv, escribir_json, escribir_libro, escribir_libro_hospital,
+                                     escribir_parquet, exportar_en_paralelo, limpiar_nombre_hoja)
+        from LEQ_Cubo import hay_parquet
+        
+        ruta_base = os.path.join(carpeta_principal, nombre_base)
+        tareas = {}
+        
         # 1. EXCEL con múltiples hojas
-        excel_path = os.path.join(carpeta_principal, f"{nombre_base}.xlsx")
-        self.guardar_excel_completo(df_completo, estadisticas, excel_path)
+        if 'xlsx' in self.formatos_exportacion:
+            tareas['xlsx'] = (
+                escribir_libro,
+                (df_completo, f"{ruta_base}.xlsx", estadisticas, self.datos_resumen(df_completo)),
+                True
+            )
         
         # 2. CSV principal
-        csv_path = os.path.join(carpeta_principal, f"{nombre_base}.csv")
-        df_completo.to_csv(csv_path, index=False, encoding='utf-8-sig', sep=';')
-#        self.log_success(f"CSV: {os.path.basename(csv_path)} (separador: ;)")
+        if 'csv' in self.formatos_exportacion:
+            tareas['csv'] = (escribir_csv, (df_completo, f"{ruta_base}.csv"), False)
         
-        # 3. JSON para fácil consumo
-#        json_path = os.path.join(carpeta_principal, f"{nombre_base}.json")
-#        df_completo.to_json(json_path, orient='records', force_ascii=False, indent=2)
-#        self.log_success(f"JSON: {os.path.basename(json_path)}")
+        # 3. Parquet
+        if 'parquet' in self.formatos_exportacion:
+            if hay_parquet():
+                tareas['parquet'] = (escribir_parquet, (df_completo, f"{ruta_base}.parquet"), False)
+            else:
+                self.log_warning("Parquet omitido: instala 'pyarrow' para exportar en este formato")
         
-        # 4. Archivo de resumen
-#        self.guardar_resumen_ejecucion(carpeta_principal, df_completo, estadisticas)
-    
-    def ejecutar(self):
-        """Función principal que ejecuta todo el proceso"""
+        # 4. JSON para fácil consumo
+        if 'json' in self.formatos_exportacion:
+            tareas['json'] = (escribir_json, (df_completo, f"{ruta_base}.json"), False)
         
-        self.inicio_proceso = datetime.now()
+        # 5. Archivo de resumen
+        if 'resumen' in self.formatos_exportacion:
+            tareas['resumen'] = (self.guardar_resumen_ejecucion, (carpeta_principal, df_completo, estadisticas), False)
         
-        try:
-            # 1. SELECCIÓN DE URL
-            print("\n\n\n")
-            self.log_info(f"{'='*60}")
-            self.log_info("PASO 1: SELECCIÓN DE URL")
-            self.log_info(f"{'='*60}")
-            url_info = self.mostrar_menu_urls()
-            self.url_actual = url_info['url']
-            
-            # 2. SELECCIÓN DE AÑO
-            print("\n\n\n")
-            self.log_info(f"{'='*60}")
-            self.log_info("PASO 2: SELECCIÓN DE AÑO")
-            self.log_info(f"{'='*60}")
-            anos_seleccionados, filtrar = self.seleccionar_ano()
+        # 6. Dataset particionado por informe, año y mes
+        if self.directorio_dataset:
+            if hay_parquet():
+                tareas['dataset'] = (self.guardar_dataset, (df_completo,), False)
+            else:
+                self.log_warning("Dataset particionado omitido: instala 'pyarrow'")
+        
+        # 7. Un libro por hospital
+        if self.libros_por_hospital and 'Filtro_Hospital' in df_completo.columns:
+            carpeta_hospitales = os.path.join(carpeta_principal, 'Hospitales')
+            os.makedirs(carpeta_hospitales, exist_ok=True)
+            for hospital, df_hospital in df_completo.groupby('Filtro_Hospital', sort=False):
+                ruta_hospital = os.path.join(carpeta_hospitales, f"{limpiar_nombre_hoja(hospital, longitud=None)}.xlsx")
+                tareas[f"hospital: {hospital}"] = (escribir_libro_hospital, (df_hospital, ruta_hospital), True)
+        
+        def mientras_se_exporta():
+            # 8. Feed de cambios respecto a la ejecución anterior
+            self.generar_feed_cambios(todos_datos, carpeta_principal, nombre_base)
             
-            # 3. INICIAR NAVEGADOR
-            print("\n\n\n")
-            self.log_info(f"{'='*60}")
-            self.log_info("PASO 3: INICIANDO NAVEGADOR")
-            self.log_info(f"{'='*60}")
+            # 9. Cubo agregado para informes
+            self.actualizar_cubo(df_completo)
+        
+        inicio = time.perf_counter()
+        resultados = exportar_en_paralelo(tareas, procesos=self.procesos_exportacion, mientras=mientras_se_exporta)
+        self.resultados_exportacion = resultados
+        
+        for nombre, resultado in resultados.items():
+            if resultado['error']:
+                self.log_error(f"Error exportando {nombre}: {resultado['error']}")
+            else:
+                self.log_info(
+                    f"\t{nombre}: {os.path.basename(resultado['ruta'])} ({resultado['segundos']:.1f} s)",
+                    formato=nombre, segundos=round(resultado['segundos'], 3)
+                )
+        
+        self.log_success(f"Exportación completada en {time.perf_counter() - inicio:.1f} s ({len(tareas)} archivos)")
+    
+    def crear_driver(self):
+        """Crea una instancia de Chrome"""
+        opciones = webdriver.ChromeOptions()
+        if self.captura_red:
+            # Eventos de red (DevTools) accesibles con driver.get_log('performance')
+            opciones.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        if self.pestanas > 1:
+            # Las pestañas en segundo plano no deben ralentizar sus temporizadores ni su renderizado
+            opciones.add_argument('--disable-background-timer-throttling')
+            opciones.add_argument('--disable-renderer-backgrounding')
+            opciones.add_argument('--disable-backgrounding-occluded-windows')
+        driver = webdriver.Chrome(options=opciones)
+        driver.set_window_size(1400, 1000)
+        return driver
+    
+    def iniciar_navegador(self, url):
+        """Inicia Chrome y carga la URL indicada"""
+        if self.navegador_precalentado:
+            try:
+                self.driver = self.navegador_precalentado.obtener_driver()
+                self.log_info("\n\tNavegador precalentado listo")
+                self.log_info(f"\tTítulo página: {self.driver.title}")
+                return
+            except Exception as e:
+                self.log_warning(f"El navegador precalentado no está disponible: {str(e)[:80]}")
+                self.navegador_precalentado = None
+        
+        # Navegador conservado de una ejecución anterior
+        if self.driver and self.conservar_navegador:
+            self.log_info(f"\n\tReutilizando navegador. Cargando URL: {url}")
+            self.driver.get(url)
+            return
+        
+        self.log_info("\n\tIniciando Chrome...")
+        self.driver = self.crear_driver()
+        self.log_info(f"\tCargando URL: {url}")
+        self.driver.get(url)
+        time.sleep(self.TIEMPO_ESPERA_NORMAL)
+        
+        self.log_info(f"\tTítulo página: {self.driver.title}")
+    
+    def cerrar_navegador(self):
+        """Cierra el navegador (y el precalentado, si lo hay)"""
+        if self.navegador_precalentado:
+            self.navegador_precalentado.cerrar()
+            self.navegador_precalentado = None
+        elif self.driver:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+    
+    def precalentar_navegador(self, urls):
+        """Arranca Chrome y lee los catálogos de los informes en segundo plano"""
+        from LEQ_Precalentado import NavegadorPrecalentado
+        
+        self.navegador_precalentado = NavegadorPrecalentado(self.crear_driver, self.leer_catalogo_pagina, urls)
+    
+    def leer_catalogo_pagina(self, driver, url):
+        """Carga un informe y lee sus hospitales y especialidades (sin mensajes, para la precarga)"""
+        driver.get(url)
+        hospitales = self.obtener_hospitales(driver)
+        
+        especialidades = []
+        if driver.find_elements(By.ID, "ContenedorContenidoSeccion_ddlEspecialidad"):
+            Select(driver.find_element(By.ID, "ContenedorContenidoSeccion_ddlHospital")).select_by_index(1)
+            especialidades = self.obtener_especialidades(driver)
+        
+        return {'hospitales': hospitales, 'especialidades': especialidades}
+    
+    def obtener_hospitales(self, driver):
+        """Obtiene la lista de hospitales disponibles"""
+        hospital_dropdown = WebDriverWait(driver, self.TIEMPO_TIMEOUT).until(
+            EC.presence_of_element_located((By.ID, "ContenedorContenidoSeccion_ddlHospital"))
+        )
+        
+        select_hospital = Select(hospital_dropdown)
+        hospital_options = select_hospital.options
+        
+        hospitales = []
+        for i, option in enumerate(hospital_options):
+            if option.get_attribute('value') and option.text.strip():
+                hospitales.append({
+                    'indice': i,
+                    'nombre': option.text.strip(),
+                    'valor': option.get_attribute('value')
+                })
+        
+        return hospitales
+    
+    def obtener_meses(self, driver):
+        """Obtiene la lista de meses disponibles"""
+        fecha_dropdown = driver.find_element(By.ID, "ContenedorContenidoSeccion_ddlFecha")
+        select_fecha = Select(fecha_dropdown)
+        meses_options = select_fecha.options
+        
+        meses = []
+        for option in meses_options:
+            if option.get_attribute('value') and option.text.strip():
+                meses.append({
+                    'texto': option.text.strip(),
+                    'valor': option.get_attribute('value')
+                })
+        
+        return meses
+    
+    def leer_catalogos(self):
+        """Lee la caché de catálogos (hospitales y especialidades por informe)"""
+        if not self.ruta_catalogos or not os.path.exists(self.ruta_catalogos):
+            return {}
+        
+        with open(self.ruta_catalogos, encoding='utf-8') as f:
+            return json.load(f)
+    
+    def guardar_catalogo(self, url_info, hospitales=None, especialidades=None):
+        """Actualiza la caché de catálogos de un informe"""
+        if not self.ruta_catalogos:
+            return
+        
+        try:
+            # Las sesiones del demonio comparten la caché: leer y reescribir de una en una
+            with self.bloqueo_salidas or nullcontext():
+                catalogos = self.leer_catalogos()
+                catalogo = catalogos.setdefault(url_info['url'], {'nombre': url_info['nombre']})
+                if hospitales is not None:
+                    catalogo['hospitales'] = hospitales
+                if especialidades is not None:
+                    catalogo['especialidades'] = especialidades
+                catalogo['actualizado'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                
+                # Temporal único junto a la caché: otro proceso no puede pisarlo antes del os.replace
+                with tempfile.NamedTemporaryFile(
+                    'w', encoding='utf-8', dir=os.path.dirname(os.path.abspath(self.ruta_catalogos)),
+                    prefix=f"{os.path.basename(self.ruta_catalogos)}.", suffix='.tmp', delete=False
+                ) as f:
+                    json.dump(catalogos, f, ensure_ascii=False, indent=2)
+                    temporal = f.name
+                try:
+                    os.replace(temporal, self.ruta_catalogos)
+                except OSError:
+                    os.remove(temporal)
+                    raise
+        except Exception as e:
+            self.log_warning(f"No se pudo actualizar la caché de catálogos: {e}")
+    
+    def listar_catalogos(self):
+        """Muestra los informes y los catálogos guardados en caché"""
+        catalogos = self.leer_catalogos()
+        
+        for key, valor in self.urls_disponibles.items():
+            print(f"\n\t{key}. {valor['nombre']}")
+            print(f"\t   {valor['url']}")
             
-            self.log_info("\n\tIniciando Chrome...")
-            self.driver = webdriver.Chrome()
-            self.driver.set_window_size(1400, 1000)
-            self.log_info(f"\tCargando URL: {url_info['url']}")
-            self.driver.get(url_info['url'])
-            time.sleep(self.TIEMPO_ESPERA_NORMAL)
+            catalogo = catalogos.get(valor['url'])
+            if not catalogo:
+                print("\t   (sin catálogo en caché)")
+                continue
             
-            self.log_info(f"\tTítulo página: {self.driver.title}")
+            print(f"\t   Actualizado: {catalogo.get('actualizado', 'N/A')}")
+            for i, hospital in enumerate(catalogo.get('hospitales', []), 1):
+                print(f"\t     H{i:3}. {hospital['nombre']}")
+            for i, especialidad in enumerate(catalogo.get('especialidades', []), 1):
+                print(f"\t     E{i:3}. {especialidad['nombre']}")
+    
+    def seleccionar_parametros(self):
+        """Pasos 1 a 5: URL, años, navegador, hospitales y especialidades"""
+        # 1. SELECCIÓN DE URL
+        print("\n\n\n")
+        self.log_info(f"{'='*60}")
+        self.log_info("PASO 1: SELECCIÓN DE URL")
+        self.log_info(f"{'='*60}")
+        if self.parametros_cli is not None:
+            url_info = self.urls_disponibles[self.parametros_cli['informe']]
+            self.log_info(f"\tURL seleccionada: {url_info['nombre']}")
+        else:
+            url_info = self.mostrar_menu_urls()
+        self.url_actual = url_info['url']
+        
+        # El navegador precalentado carga el informe mientras se eligen los años
+        if self.navegador_precalentado:
+            self.navegador_precalentado.preparar(url_info['url'])
+        
+        # 2. SELECCIÓN DE AÑO
+        print("\n\n\n")
+        self.log_info(f"{'='*60}")
+        self.log_info("PASO 2: SELECCIÓN DE AÑO")
+        self.log_info(f"{'='*60}")
+        if self.parametros_cli is not None:
+            anos_seleccionados, filtrar = sorted(set(self.parametros_cli['anos'])), True
+            self.log_success(f"Años seleccionados: {', '.join(map(str, anos_seleccionados))}")
+        else:
+            anos_seleccionados, filtrar = self.seleccionar_ano()
+        
+        # 3. INICIAR NAVEGADOR
+        print("\n\n\n")
+        self.log_info(f"{'='*60}")
+        self.log_info("PASO 3: INICIANDO NAVEGADOR")
+        self.log_info(f"{'='*60}")
+        
+        self.iniciar_navegador(url_info['url'])
+        
+        # 4. OBTENER HOSPITALES
+        print("\n\n\n")
+        self.log_info(f"{'='*60}")
+        self.log_info("PASO 4: SELECCIÓN DE HOSPITALES")
+        self.log_info(f"{'='*60}")
+        
+        catalogo_precargado = None
+        if self.navegador_precalentado:
+            catalogo_precargado = self.navegador_precalentado.catalogo(url_info['url'])
+        
+        try:
+            if catalogo_precargado:
+                hospitales = catalogo_precargado['hospitales']
+            else:
+                hospitales = self.obtener_hospitales(self.driver)
+            self.guardar_catalogo(url_info, hospitales=hospitales)
             
-            # 4. OBTENER HOSPITALES
-            print("\n\n\n")
-            self.log_info(f"{'='*60}")
-            self.log_info("PASO 4: SELECCIÓN DE HOSPITALES")
-            self.log_info(f"{'='*60}")
+            self.log_success(f"{len(hospitales)} hospitales encontrados")
             
-            try:
-                hospital_dropdown = WebDriverWait(self.driver, self.TIEMPO_TIMEOUT).until(
-                    EC.presence_of_element_located((By.ID, "ContenedorContenidoSeccion_ddlHospital"))
-                )
-                
-                select_hospital = Select(hospital_dropdown)
-                hospital_options = select_hospital.options
-                
-                hospitales = []
-                for i, option in enumerate(hospital_options):
-                    if option.get_attribute('value') and option.text.strip():
-                        hospitales.append({
-                            'indice': i,
-                            'nombre': option.text.strip(),
-                            'valor': option.get_attribute('value')
-                        })
-                
-                self.log_success(f"{len(hospitales)} hospitales encontrados")
-                
-                # Selección interactiva de hospitales
-                while True:
+            # Selección interactiva de hospitales
+            while True:
+                if self.parametros_cli is not None:
+                    seleccion = self.parametros_cli.get('hospitales', '')
+                else:
                     seleccion = self.mostrar_menu_hospitales(hospitales)
-                    hospitales_seleccionados = self.procesar_seleccion_hospitales(seleccion, hospitales)
-                    
-                    if hospitales_seleccionados:
-                        self.log_success(f"Hospitales seleccionados: {len(hospitales_seleccionados)}")
-                        for i, hosp in enumerate(hospitales_seleccionados, 1):
-                            self.log_info(f"\t  {i:3}. {hosp['nombre']}")
-                        break
-                    else:
-                        self.log_warning("\n\tSelección no válida. Intenta de nuevo.\n")
+                hospitales_seleccionados = self.procesar_seleccion_hospitales(seleccion, hospitales)
                 
-            except Exception as e:
-                self.log_error(f"Error obteniendo hospitales: {e}")
-                return
-            
-            # 5. SELECCIÓN DE ESPECIALIDADES (PARA TODOS LOS HOSPITALES)
-            print("\n\n\n")
-            self.log_info(f"{'='*60}")
-            self.log_info("PASO 5: SELECCIÓN DE ESPECIALIDADES")
-            self.log_info(f"{'='*60}")
+                if hospitales_seleccionados:
+                    self.log_success(f"Hospitales seleccionados: {len(hospitales_seleccionados)}")
+                    for i, hosp in enumerate(hospitales_seleccionados, 1):
+                        self.log_info(f"\t  {i:3}. {hosp['nombre']}")
+                    break
+                elif self.parametros_cli is not None:
+                    self.log_error(f"Selección de hospitales no válida: {seleccion}")
+                    return None
+                else:
+                    self.log_warning("\n\tSelección no válida. Intenta de nuevo.\n")
             
-            # Obtener especialidades del primer hospital como referencia
-            try:
+        except Exception as e:
+            self.log_error(f"Error obteniendo hospitales: {e}")
+            return None
+        
+        # 5. SELECCIÓN DE ESPECIALIDADES (PARA TODOS LOS HOSPITALES)
+        print("\n\n\n")
+        self.log_info(f"{'='*60}")
+        self.log_info("PASO 5: SELECCIÓN DE ESPECIALIDADES")
+        self.log_info(f"{'='*60}")
+        
+        # Obtener especialidades del primer hospital como referencia
+        try:
+            if catalogo_precargado:
+                especialidades = catalogo_precargado['especialidades']
+            else:
                 # Seleccionar primer hospital para obtener las especialidades disponibles
                 hospital_dropdown = self.driver.find_element(By.ID, "ContenedorContenidoSeccion_ddlHospital")
                 select_hospital = Select(hospital_dropdown)
                 select_hospital.select_by_index(1)  # Primer hospital
                 
                 especialidades = self.obtener_especialidades(self.driver)
+            self.guardar_catalogo(url_info, especialidades=especialidades)
+            
+            if especialidades:
+                self.log_success(f"{len(especialidades)} especialidades encontradas")
                 
-                if especialidades:
-                    self.log_success(f"{len(especialidades)} especialidades encontradas")
-                    
-                    # Selección interactiva de especialidades
-                    while True:
+                # Selección interactiva de especialidades
+                while True:
+                    if self.parametros_cli is not None:
+                        seleccion = self.parametros_cli.get('especialidades', '')
+                    else:
                         seleccion = self.mostrar_menu_especialidades(especialidades)
-                        self.especialidades_seleccionadas_global = self.procesar_seleccion_especialidades(seleccion, especialidades)
-                        
-                        if self.especialidades_seleccionadas_global is not None:
-                            if not self.especialidades_seleccionadas_global:
-                                self.log_success("Procesando SIN filtro de especialidad para TODOS los hospitales")
-                                break
-                            else:
-                                self.log_success(f"Especialidades seleccionadas: {len(self.especialidades_seleccionadas_global)}")
-                                self.log_info(f"\tAplicadas a TODOS los hospitales seleccionados")
-                                for i, esp in enumerate(self.especialidades_seleccionadas_global[:5], 1):
-                                    self.log_info(f"\t    {i:2}. {esp['nombre'][:40]}")
-                                if len(self.especialidades_seleccionadas_global) > 5:
-                                    self.log_info(f"\t    ... y {len(self.especialidades_seleccionadas_global)-5} más")
-                                break
-                        else:
-                            self.log_warning("\n\tSelección no válida. Intenta de nuevo.\n")
-                else:
-                    self.log_warning("No se encontraron especialidades en este formulario")
-                    self.log_info("\tSe procesará SIN filtro de especialidad")
-                    self.especialidades_seleccionadas_global = []
+                    self.especialidades_seleccionadas_global = self.procesar_seleccion_especialidades(seleccion, especialidades)
                     
-            except Exception as e:
-                self.log_error(f"Error obteniendo especialidades: {e}")
+                    if not self.especialidades_seleccionadas_global and self.parametros_cli is not None:
+                        self.log_error(f"Selección de especialidades no válida: {seleccion}")
+                        return None
+                    
+                    if self.especialidades_seleccionadas_global is not None:
+                        if not self.especialidades_seleccionadas_global:
+                            self.log_success("Procesando SIN filtro de especialidad para TODOS los hospitales")
+                            break
+                        else:
+                            self.log_success(f"Especialidades seleccionadas: {len(self.especialidades_seleccionadas_global)}")
+                            self.log_info(f"\tAplicadas a TODOS los hospitales seleccionados")
+                            for i, esp in enumerate(self.especialidades_seleccionadas_global[:5], 1):
+                                self.log_info(f"\t    {i:2}. {esp['nombre'][:40]}")
+                            if len(self.especialidades_seleccionadas_global) > 5:
+                                self.log_info(f"\t    ... y {len(self.especialidades_seleccionadas_global)-5} más")
+                            break
+                    else:
+                        self.log_warning("\n\tSelección no válida. Intenta de nuevo.\n")
+            else:
+                self.log_warning("No se encontraron especialidades en este formulario")
                 self.log_info("\tSe procesará SIN filtro de especialidad")
                 self.especialidades_seleccionadas_global = []
-            
-            # Volver a cargar la página para limpiar selecciones
+                
+        except Exception as e:
+            self.log_error(f"Error obteniendo especialidades: {e}")
+            self.log_info("\tSe procesará SIN filtro de especialidad")
+            self.especialidades_seleccionadas_global = []
+        
+        # Volver a cargar la página para limpiar selecciones (con catálogo precargado no se ha tocado)
+        if not catalogo_precargado:
             self.log_info("\n\tReiniciando formulario...")
             self.driver.get(self.url_actual)
             time.sleep(self.TIEMPO_ESPERA_NORMAL)
+        
+        return {
+            'url_info': url_info,
+            'anos_seleccionados': anos_seleccionados,
+            'filtrar': filtrar,
+            'hospitales_seleccionados': hospitales_seleccionados
+        }
+    
+    def planificar_hospital(self, hospital, anos_seleccionados, filtrar):
+        """Selecciona el hospital y calcula los meses y especialidades a consultar"""
+        # Seleccionar hospital
+        try:
+            if not self.seleccionar_elemento_dropdown(
+                "ContenedorContenidoSeccion_ddlHospital",
+                hospital['indice'],
+                usar_index=True
+            ):
+                return None
+            
+        except Exception as e:
+            self.log_error(f"Error seleccionando hospital: {e}")
+            return None
+        
+        # Obtener especialidades para este hospital
+        especialidades = self.obtener_especialidades(self.driver)
+        
+        if not especialidades:
+            self.log_warning("No hay lista de especialidades para este hospital")
+            especialidades_a_procesar = []
+        elif not self.especialidades_seleccionadas_global:
+            self.log_success("Procesando SIN filtro de especialidad (selección global)")
+            especialidades_a_procesar = []
+        else:
+            # Usar las especialidades seleccionadas globalmente
+            especialidades_a_procesar = []
+            
+            # Filtrar solo las especialidades seleccionadas que existan en este hospital
+            for esp_sel in self.especialidades_seleccionadas_global:
+                for esp_hosp in especialidades:
+                    if esp_sel['valor'] == esp_hosp['valor']:
+                        especialidades_a_procesar.append(esp_hosp)
+                        break
+            
+            if len(especialidades_a_procesar) < len(self.especialidades_seleccionadas_global):
+                self.log_warning(f"Nota: {len(self.especialidades_seleccionadas_global) - len(especialidades_a_procesar)} especialidades no disponibles en este hospital")
+        
+        # Obtener meses disponibles
+        try:
+            todas_meses = self.obtener_meses(self.driver)
+            
+            # Filtrar meses según selección
+            meses_a_procesar = self.filtrar_meses(todas_meses, anos_seleccionados, filtrar)
+            
+        except Exception as e:
+            self.log_error(f"Error obteniendo meses: {e}")
+            return None
+        
+        if not especialidades_a_procesar:
+            total_consultas = len(meses_a_procesar)
+        else:
+            total_consultas = len(meses_a_procesar) * len(especialidades_a_procesar)
+        
+        return {
+            'hospital': hospital,
+            'especialidades': especialidades,
+            'especialidades_a_procesar': especialidades_a_procesar,
+            'todas_meses': todas_meses,
+            'meses_a_procesar': meses_a_procesar,
+            'total_consultas': total_consultas
+        }
+    
+    def procesar_planes_ordenados(self, planes, estadisticas):
+        """Ejecuta las consultas de todos los hospitales en el orden de la política elegida"""
+        consultas = []
+        for plan in planes:
+            consultas.extend(self.aplicar_mapa_dispersion(planificar_consultas(
+                self.url_actual, plan['hospital'], plan['meses_a_procesar'], plan['especialidades_a_procesar']
+            )))
+        
+        consultas = ordenar_consultas(consultas, self.politica_orden, self.pesos_orden)
+        self.log_info(f"\tOrden de ejecución: {self.politica_orden} ({len(consultas)} consultas)")
+        
+        todos_datos, _ = self.procesar_consultas(consultas, len(consultas))
+        
+        # Un registro por consulta con datos: las estadísticas salen de los registros
+        registros_por_hospital = {}
+        for registro in todos_datos:
+            registros_por_hospital[registro['Filtro_Hospital']] = registros_por_hospital.get(registro['Filtro_Hospital'], 0) + 1
+        
+        for plan in planes:
+            registros = registros_por_hospital.get(plan['hospital']['nombre'], 0)
+            if registros:
+                estado = 'Parcial' if self.interrumpido or self.plazo_agotado else 'Completado'
+            else:
+                estado = 'Sin datos extraídos'
+            estadisticas.append(self.crear_estadistica_hospital(plan, registros, registros, estado))
+        
+        return todos_datos
+    
+    def desplegables_con_postback(self):
+        """Dimensiones del formulario cuyo cambio provoca un postback (solo el hospital si no se pueden leer)"""
+        from LEQ_Formulario import Formulario
+        
+        try:
+            return tuple(
+                dimension['nombre'] for dimension in Formulario(self.driver, self.TIEMPO_TIMEOUT).describir()
+                if dimension['postback']
+            ) or ('Hospital',)
+        except Exception as e:
+            self.log_warning(f"No se pudo leer el formulario: {str(e)[:80]}")
+            return ('Hospital',)
+    
+    def estimar_carga(self, planes, carpeta_principal):
+        """Mide una muestra de consultas reales y proyecta la ejecución completa (sin extraer nada más)"""
+        from LEQ_Estimacion import estimar_ejecucion, formatear_duracion
+        
+        consultas = []
+        for plan in planes:
+            consultas.extend(planificar_consultas(
+                self.url_actual, plan['hospital'], plan['meses_a_procesar'], plan['especialidades_a_procesar']
+            ))
+        
+        omitidas = 0
+        if self.mapa_dispersion:
+            consultas, omitidas = self.mapa_dispersion.filtrar(consultas)
+        
+        con_postback = self.desplegables_con_postback()
+        
+        # Muestra aleatoria, agrupada por hospital para no cambiar de hospital más de lo necesario
+        muestra = random.sample(consultas, min(self.muestra_estimacion, len(consultas)))
+        muestra.sort(key=lambda c: c['hospital']['indice'])
+        
+        self.log_info(f"\tMidiendo {len(muestra)} consultas de muestra...")
+        latencias_consulta = []
+        latencias_hospital = []
+        registros = []
+        hospital_actual = None
+        
+        for consulta in muestra:
+            try:
+                if consulta['hospital']['nombre'] != hospital_actual:
+                    inicio = time.perf_counter()
+                    if not self.seleccionar_elemento_dropdown(
+                        "ContenedorContenidoSeccion_ddlHospital", consulta['hospital']['indice'], usar_index=True
+                    ):
+                        continue
+                    latencias_hospital.append(time.perf_counter() - inicio)
+                    hospital_actual = consulta['hospital']['nombre']
+                
+                inicio = time.perf_counter()
+                if not self.enviar_consulta(consulta['mes'], consulta['especialidad']):
+                    continue
+                html = self.obtener_html_indicadores(self.driver)
+                latencias_consulta.append(time.perf_counter() - inicio)
+                
+                registro = self.construir_registro(
+                    html, self.driver.current_url, consulta['hospital']['nombre'], consulta['mes']['texto'],
+                    consulta['especialidad']['nombre'] if consulta['especialidad'] else None
+                ) if html else None
+                if registro:
+                    registros.append(registro)
+            
+            except Exception as e:
+                self.log_warning(f"\tConsulta de muestra fallida: {str(e)[:80]}")
+        
+        estimacion = estimar_ejecucion(
+            consultas, latencias_consulta, latencias_hospital, registros, len(latencias_consulta),
+            con_postback=con_postback, trabajadores=self.max_trabajadores_estimacion
+        )
+        estimacion['omitidas_mapa_vacios'] = omitidas
+        estimacion['desplegables_con_postback'] = list(con_postback)
+        
+        ruta = os.path.join(carpeta_principal, 'estimacion.json')
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(estimacion, f, ensure_ascii=False, indent=2)
+        
+        print("\n")
+        self.log_info(f"{'='*60}")
+        self.log_info("ESTIMACIÓN DE LA EJECUCIÓN")
+        self.log_info(f"{'='*60}")
+        self.log_info(f"\tConsultas: {estimacion['consultas']} ({omitidas} omitidas por el mapa de vacíos)")
+        self.log_info(f"\tHospitales: {estimacion['hospitales']}")
+        self.log_info(f"\tPostbacks esperados: {estimacion['postbacks']}")
+        
+        if not latencias_consulta:
+            self.log_warning("Ninguna consulta de muestra se completó: no se puede proyectar el tiempo")
+        else:
+            latencia = estimacion['latencia_consulta']
+            self.log_info(f"\tLatencia por consulta ({estimacion['muestra']} medidas): "
+                          f"media {latencia['media']:.2f}s, p50 {latencia['p50']:.2f}s, p90 {latencia['p90']:.2f}s")
+            self.log_info(f"\tCambio de hospital: {estimacion['latencia_cambio_hospital']:.2f}s")
+            self.log_info(f"\tRegistros esperados: {estimacion['registros_esperados']} "
+                          f"({estimacion['tasa_con_datos']:.0%} de consultas con datos), "
+                          f"CSV ~{estimacion['bytes_csv_esperados'] / 1024:.0f} KB")
+            self.log_info("\tTiempo estimado por número de trabajadores (media / p90):")
+            for trabajadores, segundos in estimacion['segundos_por_trabajadores'].items():
+                segundos_p90 = estimacion['segundos_por_trabajadores_p90'][trabajadores]
+                self.log_info(f"\t\t{trabajadores:2d}: {formatear_duracion(segundos)} / {formatear_duracion(segundos_p90)}")
+        
+        self.log_success(f"Estimación guardada en: {ruta}")
+        return estimacion
+    
+    def guardar_pendientes(self, carpeta_principal, url_info):
+        """Guarda las consultas que quedaron sin hacer para continuarlas con --reanudar"""
+        ruta = os.path.join(carpeta_principal, 'pendientes.json')
+        
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({
+                'url_info': url_info,
+                'creado': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'consultas': self.pendientes
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(temporal, ruta)
+        
+        self.log_warning(f"{len(self.pendientes)} consultas pendientes guardadas en: {ruta}")
+        return ruta
+    
+    def reanudar(self, ruta_pendientes):
+        """Continúa las consultas pendientes de una ejecución anterior"""
+        with open(ruta_pendientes, encoding='utf-8') as f:
+            pendientes = json.load(f)
+        
+        url_info = pendientes['url_info']
+        # Agrupar por hospital para no cambiar de hospital más de lo necesario
+        consultas = sorted(pendientes['consultas'], key=lambda c: c['hospital']['indice'])
+        
+        self.inicio_proceso = datetime.now()
+        self.plazo = Plazo(self.segundos_plazo) if self.segundos_plazo else None
+        self.url_actual = url_info['url']
+        self.interrumpido = False
+        self.plazo_agotado = False
+        self.pendientes = []
+        
+        try:
+            carpeta_principal = self.crear_estructura_carpetas(url_info, [], 0)
+            self.configurar_logging(carpeta_principal)
+            self.log_info(f"\tReanudando {len(consultas)} consultas de {ruta_pendientes}")
+            
+            self.iniciar_navegador(url_info['url'])
+            
+            self.progreso = ReporteProgreso(
+                len(consultas),
+                ruta_estado=os.path.join(carpeta_principal, 'estado_progreso.json'),
+                mostrar_barra=self.mostrar_barra_progreso
+            )
+            consultas = self.aplicar_mapa_dispersion(consultas)
+            todos_datos, consultas_exitosas = self.procesar_consultas(consultas, len(consultas))
+            self.progreso.finalizar()
+            
+            self.log_success(f"{consultas_exitosas}/{len(consultas)} consultas con datos")
+            
+            if self.pendientes:
+                self.guardar_pendientes(carpeta_principal, url_info)
+            
+            if todos_datos:
+                self.guardar_archivos_consolidados(todos_datos, [], carpeta_principal, [], False)
+        
+        except Exception as e:
+            self.log_error(f"Error reanudando las consultas pendientes: {e}")
+            import traceback
+            traceback.print_exc()
+        
+        finally:
+            self.cerrar_navegador()
+            self.detener_logging()
+    
+    def marcar_perfil(self, hito):
+        """Instantánea de memoria del perfil (solo con --perfil)"""
+        if self.perfil:
+            self.perfil.marcar(hito)
+    
+    def fin_etapa(self, etapa):
+        """Cierra una etapa de la ejecución (tiempos del manifiesto e hito del perfil)"""
+        self.metricas.fin_etapa(etapa)
+        self.marcar_perfil(etapa)
+    
+    def guardar_manifiesto_ejecucion(self, carpeta_principal, parametros, planes, registros):
+        """Manifiesto JSON de la ejecución: selecciones, plan, tiempos, rendimiento, memoria y salidas"""
+        metricas = self.metricas.resumen()
+        consultas = metricas['consultas']
+        segundos_consultas = metricas['etapas'].get('consultas')
+        con_respuesta = metricas['resultados'].get('datos', 0) + metricas['resultados'].get('sin_datos', 0)
+        
+        rss_pico = None
+        if self.medidor_memoria:
+            rss_pico = self.medidor_memoria.detener()
+            self.medidor_memoria = None
+        
+        salidas = {}
+        for nombre, resultado in self.resultados_exportacion.items():
+            salidas[nombre] = {
+                'ruta': resultado['ruta'],
+                'segundos': round(resultado['segundos'], 3) if resultado['segundos'] is not None else None,
+                'bytes': tamano_ruta(resultado['ruta']),
+                'error': resultado['error']
+            }
+            # El dataset es compartido entre ejecuciones: solo cuentan las particiones escritas en esta
+            if nombre == 'dataset':
+                escrito = self.dataset_escrito or {}
+                salidas[nombre]['bytes'] = escrito.get('bytes')
+                salidas[nombre]['archivos'] = escrito.get('archivos', [])
+        
+        if self.interrumpido:
+            estado = 'interrumpida'
+        elif self.plazo_agotado:
+            estado = 'plazo agotado'
+        else:
+            estado = 'completada'
+        
+        manifiesto = {
+            'version': VERSION_MANIFIESTO,
+            'carpeta': carpeta_principal,
+            'inicio': self.inicio_proceso.strftime('%Y-%m-%d %H:%M:%S'),
+            'fin': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'duracion': round((datetime.now() - self.inicio_proceso).total_seconds(), 3),
+            'estado': estado,
+            'selecciones': {
+                'informe': parametros['url_info']['nombre'],
+                'url': parametros['url_info']['url'],
+                'anos': parametros['anos_seleccionados'],
+                'filtrar': parametros['filtrar'],
+                'hospitales': [hospital['nombre'] for hospital in parametros['hospitales_seleccionados']],
+                'especialidades': [esp['nombre'] for esp in self.especialidades_seleccionadas_global or []],
+                'orden': self.politica_orden,
+                'pestanas': self.pestanas,
+                'hilos_parseo': self.hilos_parseo,
+                'captura_red': self.captura_red,
+                'timeout': self.TIEMPO_TIMEOUT,
+                'formatos': self.formatos_exportacion
+            },
+            'plan': {
+                'hospitales': len(planes),
+                'consultas': sum(plan['total_consultas'] for plan in planes),
+                'pendientes': len(self.pendientes)
+            },
+            'etapas': metricas['etapas'],
+            'rendimiento': {
+                'consultas': consultas,
+                'registros': registros,
+                'consultas_por_segundo': consultas / segundos_consultas if segundos_consultas else None,
+                'reintentos_por_consulta': sum(metricas['reintentos'].values()) / consultas if consultas else None,
+                'exito': con_respuesta / consultas if consultas else None
+            },
+            'resultados': metricas['resultados'],
+            'reintentos': metricas['reintentos'],
+            'latencia': metricas['latencia'],
+            'memoria': {'rss_pico': rss_pico},
+            'salidas': {
+                'archivos': salidas,
+                'total_bytes': sum(salida['bytes'] or 0 for salida in salidas.values())
+            }
+        }
+        return guardar_manifiesto(carpeta_principal, manifiesto)
+    
+    def crear_estadistica_hospital(self, plan, consultas_exitosas, registros, estado):
+        """Crea la fila de estadísticas de un hospital"""
+        return {
+            'Hospital': plan['hospital']['nombre'],
+            'Meses_Disponibles': len(plan['todas_meses']),
+            'Especialidades_Seleccionadas': len(self.especialidades_seleccionadas_global) if self.especialidades_seleccionadas_global else 0,
+            'Especialidades_Disponibles': len(plan['especialidades']) if plan['especialidades'] else 0,
+            'Consultas_Planificadas': plan['total_consultas'],
+            'Consultas_Exitosas': consultas_exitosas,
+            'Registros': registros,
+            'Estado': estado
+        }
+    
+    def ejecutar(self):
+        """Función principal que ejecuta todo el proceso"""
+        
+        self.inicio_proceso = datetime.now()
+        self.ultima_ejecucion = {'estado': 'cancelada'}
+        self.metricas = MetricasEjecucion()
+        self.resultados_exportacion = {}
+        self.dataset_escrito = None
+        self.plazo = Plazo(self.segundos_plazo) if self.segundos_plazo else None
+        
+        # Arrancar el navegador ya: en modo interactivo se precargan los catálogos de todos los informes
+        if self.precalentar and not self.navegador_precalentado:
+            if self.parametros_cli is not None:
+                urls = [self.urls_disponibles[self.parametros_cli['informe']]['url']]
+            else:
+                urls = [url_info['url'] for url_info in self.urls_disponibles.values()]
+            self.precalentar_navegador(urls)
+        
+        try:
+            # 1-5. URL, AÑOS, NAVEGADOR, HOSPITALES Y ESPECIALIDADES
+            parametros = self.seleccionar_parametros()
+            if not parametros:
+                return
+            self.fin_etapa('seleccion')
+            
+            url_info = parametros['url_info']
+            anos_seleccionados = parametros['anos_seleccionados']
+            filtrar = parametros['filtrar']
+            hospitales_seleccionados = parametros['hospitales_seleccionados']
             
             self.modo_verbose = self.modo_verbose_EXEC
-			
+            
             # 6. CREAR ESTRUCTURA DE CARPETAS Y CONFIGURAR LOGGING
             self.log_info(f"\n\n\n{'='*60}")
             self.log_info("PASO 6: PREPARANDO CARPETA Y LOGGING")
@@ -945,6 +2165,19 @@ class LEQScraper:
             # Configurar logging
             self.configurar_logging(carpeta_principal)
             
+            if self.perfilar:
+                # cProfile, pstats y tracemalloc solo se cargan al perfilar
+                from LEQ_Memoria import pid_navegador
+                from LEQ_Perfil import PerfilEjecucion
+                
+                self.perfil = PerfilEjecucion(carpeta_principal, obtener_pid_navegador=lambda: pid_navegador(self))
+                self.perfil.iniciar()
+            
+            # RSS máximo de Python, del navegador y de los procesos de exportación para el manifiesto
+            self.medidor_memoria = MedidorMemoria(lambda: [os.getpid()], nombre='memoria-ejecucion')
+            self.medidor_memoria.start()
+            self.fin_etapa('preparacion')
+            
             # 7. PROCESAR CADA HOSPITAL
             print("\n\n\n")
             self.log_info(f"{'='*60}")
@@ -954,134 +2187,121 @@ class LEQScraper:
             todos_datos = []
             estadisticas = []
             
+            # Planificar todos los hospitales antes de consultar para conocer el total global
+            planes = []
             for idx, hospital in enumerate(hospitales_seleccionados):
-                print("\n\n")
-                self.log_info(f"\t{'-'*60}")
-                self.log_info(f"\tHOSPITAL {idx+1}/{len(hospitales_seleccionados)}: {hospital['nombre']}")
-                self.log_info(f"\t{'-'*60}")
+                self.log_info(f"\tPlanificando {idx+1}/{len(hospitales_seleccionados)}: {hospital['nombre']}")
                 
-                # Seleccionar hospital
-                try:
+                plan = self.planificar_hospital(hospital, anos_seleccionados, filtrar)
+                if plan is None:
+                    continue
+                
+                if not plan['meses_a_procesar']:
+                    self.log_warning("No hay meses para procesar con los criterios seleccionados")
+                    estadisticas.append(self.crear_estadistica_hospital(plan, 0, 0, 'Sin meses para procesar'))
+                    continue
+                
+                planes.append(plan)
+            
+            total_global = sum(plan['total_consultas'] for plan in planes)
+            self.log_success(f"{total_global} consultas planificadas en {len(planes)} hospitales")
+            self.fin_etapa('planificacion')
+            
+            if self.solo_estimar:
+                self.estimar_carga(planes, carpeta_principal)
+                self.ultima_ejecucion = {
+                    'estado': 'estimada',
+                    'carpeta': carpeta_principal,
+                    'hospitales': len(planes),
+                    'consultas_planificadas': total_global
+                }
+                return
+            
+            self.progreso = ReporteProgreso(
+                total_global,
+                ruta_estado=os.path.join(carpeta_principal, 'estado_progreso.json'),
+                mostrar_barra=self.mostrar_barra_progreso
+            )
+            
+            self.interrumpido = False
+            self.plazo_agotado = False
+            self.pendientes = []
+            
+            # Con pestañas se reparten las consultas de todos los hospitales a la vez
+            if self.politica_orden != 'hospital' or self.pestanas > 1:
+                todos_datos = self.procesar_planes_ordenados(planes, estadisticas)
+            else:
+                for idx, plan in enumerate(planes):
+                    if self.interrumpido or self.plazo_agotado:
+                        self.pendientes.extend(planificar_consultas(
+                            self.url_actual, plan['hospital'], plan['meses_a_procesar'], plan['especialidades_a_procesar']
+                        ))
+                        estadisticas.append(self.crear_estadistica_hospital(plan, 0, 0, 'Pendiente'))
+                        continue
+                
+                    hospital = plan['hospital']
+                    self.marcar_perfil(f"inicio hospital {idx+1}/{len(planes)}: {hospital['nombre']}")
+                    print("\n\n")
+                    self.log_info(f"\t{'-'*60}")
+                    self.log_info(f"\tHOSPITAL {idx+1}/{len(planes)}: {hospital['nombre']}")
+                    self.log_info(f"\t{'-'*60}")
+                
+                    self.progreso.iniciar_hospital(hospital['nombre'])
+                
+                    # Volver a seleccionar el hospital (la planificación recorrió los demás)
                     if not self.seleccionar_elemento_dropdown(
                         "ContenedorContenidoSeccion_ddlHospital",
                         hospital['indice'],
                         usar_index=True
                     ):
+                        estadisticas.append(self.crear_estadistica_hospital(plan, 0, 0, 'Error seleccionando hospital'))
                         continue
-                    
-                except Exception as e:
-                    self.log_error(f"Error seleccionando hospital: {e}")
-                    continue
                 
-                # Obtener especialidades para este hospital
-                especialidades = self.obtener_especialidades(self.driver)
+                    # Procesar hospital con función optimizada
+                    datos_hospital, consultas_exitosas = self.procesar_hospital_optimizado(
+                        hospital, plan['meses_a_procesar'], plan['especialidades_a_procesar'], plan['total_consultas']
+                    )
                 
-                if not especialidades:
-                    self.log_warning("No hay lista de especialidades para este hospital")
-                    especialidades_a_procesar = []
-                elif not self.especialidades_seleccionadas_global:
-                    self.log_success("Procesando SIN filtro de especialidad (selección global)")
-                    especialidades_a_procesar = []
-                else:
-                    # Usar las especialidades seleccionadas globalmente
-                    especialidades_a_procesar = []
-                    
-                    # Filtrar solo las especialidades seleccionadas que existan en este hospital
-                    for esp_sel in self.especialidades_seleccionadas_global:
-                        for esp_hosp in especialidades:
-                            if esp_sel['valor'] == esp_hosp['valor']:
-                                especialidades_a_procesar.append(esp_hosp)
-                                break
-                    
-                    if len(especialidades_a_procesar) < len(self.especialidades_seleccionadas_global):
-                        self.log_warning(f"Nota: {len(self.especialidades_seleccionadas_global) - len(especialidades_a_procesar)} especialidades no disponibles en este hospital")
+                    # GUARDAR DATOS DEL HOSPITAL
+                    if datos_hospital:
+                        todos_datos.extend(datos_hospital)
                 
-                # Obtener meses disponibles
-                try:
-                    fecha_dropdown = self.driver.find_element(By.ID, "ContenedorContenidoSeccion_ddlFecha")
-                    select_fecha = Select(fecha_dropdown)
-                    meses_options = select_fecha.options
-                    
-                    # Obtener todas las meses
-                    todas_meses = []
-                    for option in meses_options:
-                        if option.get_attribute('value') and option.text.strip():
-                            todas_meses.append({
-                                'texto': option.text.strip(),
-                                'valor': option.get_attribute('value')
-                            })
-                    
-                    # Filtrar meses según selección
-                    meses_a_procesar = self.filtrar_meses(todas_meses, anos_seleccionados, filtrar)
-                    
-                    if not especialidades_a_procesar:
-                        total_consultas = len(meses_a_procesar)
-                    else:
-                        total_consultas = len(meses_a_procesar) * len(especialidades_a_procesar)
-                    
-                    if not meses_a_procesar:
-                        self.log_warning("No hay meses para procesar con los criterios seleccionados")
-                        estadisticas.append({
-                            'Hospital': hospital['nombre'],
-                            'Meses_Disponibles': len(todas_meses),
-                            'Especialidades_Seleccionadas': len(self.especialidades_seleccionadas_global) if self.especialidades_seleccionadas_global else 0,
-                            'Especialidades_Disponibles': len(especialidades) if especialidades else 0,
-                            'Consultas_Planificadas': 0,
-                            'Consultas_Exitosas': 0,
-                            'Registros': 0,
-                            'Estado': 'Sin meses para procesar'
-                        })
-                        continue
-                    
-                except Exception as e:
-                    self.log_error(f"Error obteniendo meses: {e}")
-                    continue
+                        # Estadísticas actualizadas (Ctrl+C o plazo agotado: el hospital queda a medias)
+                        estado = 'Parcial' if self.interrumpido or self.plazo_agotado else 'Completado'
+                        estadisticas.append(self.crear_estadistica_hospital(
+                            plan, consultas_exitosas, len(datos_hospital), estado
+                        ))
                 
-                # Procesar hospital con función optimizada
-                datos_hospital, consultas_exitosas = self.procesar_hospital_optimizado(
-                    hospital, meses_a_procesar, especialidades_a_procesar, total_consultas
-                )
+                        self.log_success(f"✓ {len(datos_hospital)} registros extraídos de este hospital")
                 
-                # GUARDAR DATOS DEL HOSPITAL
-                if datos_hospital:
-                    todos_datos.extend(datos_hospital)
-                    
-                    # Estadísticas actualizadas
-                    estadisticas.append({
-                        'Hospital': hospital['nombre'],
-                        'Meses_Disponibles': len(todas_meses),
-                        'Especialidades_Seleccionadas': len(self.especialidades_seleccionadas_global) if self.especialidades_seleccionadas_global else 0,
-                        'Especialidades_Disponibles': len(especialidades) if especialidades else 0,
-                        'Consultas_Planificadas': total_consultas,
-                        'Consultas_Exitosas': consultas_exitosas,
-                        'Registros': len(datos_hospital),
-                        'Estado': 'Completado'
-                    })
-                    
-                    self.log_success(f"✓ {len(datos_hospital)} registros extraídos de este hospital")
-                    
-                else:
-                    self.log_warning("No se extrajeron datos para este hospital")
-                    estadisticas.append({
-                        'Hospital': hospital['nombre'],
-                        'Meses_Disponibles': len(todas_meses),
-                        'Especialidades_Seleccionadas': len(self.especialidades_seleccionadas_global) if self.especialidades_seleccionadas_global else 0,
-                        'Especialidades_Disponibles': len(especialidades) if especialidades else 0,
-                        'Consultas_Planificadas': total_consultas,
-                        'Consultas_Exitosas': 0,
-                        'Registros': 0,
-                        'Estado': 'Sin datos extraídos'
-                    })
+                    else:
+                        self.log_warning("No se extrajeron datos para este hospital")
+                        estadisticas.append(self.crear_estadistica_hospital(plan, 0, 0, 'Sin datos extraídos'))
+            
+            self.progreso.finalizar()
+            self.fin_etapa('consultas')
+            
+            if self.pendientes:
+                self.guardar_pendientes(carpeta_principal, url_info)
+            
+            self.ultima_ejecucion = {
+                'estado': 'completada',
+                'carpeta': carpeta_principal,
+                'registros': len(todos_datos),
+                'hospitales': len(planes),
+                'consultas_planificadas': total_global
+            }
             
             # 8. GUARDAR ARCHIVOS CONSOLIDADOS
             if todos_datos:
-                self.guardar_archivos_consolidados(
-                    todos_datos, 
-                    estadisticas, 
-                    carpeta_principal, 
-                    anos_seleccionados,
-                    filtrar
-                )
+                with self.bloqueo_salidas or nullcontext():
+                    self.guardar_archivos_consolidados(
+                        todos_datos, 
+                        estadisticas, 
+                        carpeta_principal, 
+                        anos_seleccionados,
+                        filtrar
+                    )
             else:
                 self.log_info(f"\n\n\n{'='*60}")
                 self.log_info("NO SE EXTRAJERON DATOS")
@@ -1091,6 +2311,11 @@ class LEQScraper:
                 self.log_info("  2. La estructura de la página ha cambiado")
                 self.log_info("  3. Problemas de conexión o tiempo de espera")
                 self.log_info(f"\nArchivos de log guardados en: {carpeta_principal}")
+            self.fin_etapa('exportacion')
+            
+            ruta_manifiesto = self.guardar_manifiesto_ejecucion(carpeta_principal, parametros, planes, len(todos_datos))
+            self.ultima_ejecucion['manifiesto'] = ruta_manifiesto
+            self.log_info(f"\tManifiesto de la ejecución: {ruta_manifiesto}")
             
         except Exception as e:
             self.log_info(f"\n{'='*60}")
@@ -1099,27 +2324,771 @@ class LEQScraper:
             self.log_error(f"Error: {e}")
             import traceback
             traceback.print_exc()
+            self.ultima_ejecucion = {'estado': 'error', 'error': str(e)}
             
         finally:
-            if self.driver:
+            # Antes de cerrar el navegador (su RSS entra en el último hito) y de esperar a Enter
+            if self.perfil:
+                self.log_info(f"\tPerfil de la ejecución en {self.perfil.detener()}")
+                self.perfil = None
+            
+            if self.medidor_memoria:
+                self.medidor_memoria.detener()
+                self.medidor_memoria = None
+            
+            if self.conservar_navegador:
+                # El navegador queda listo para la siguiente ejecución
+                if self.navegador_precalentado:
+                    self.navegador_precalentado.renovar_catalogos()
+            elif self.driver:
                 print(f"\n\n\n{'='*60}")
                 print("FINALIZANDO EJECUCIÓN")
                 print(f"{'='*60}")
-                print("\n\tEl navegador se mantendrá abierto.")
-                print("\tPuedes cerrarlo manualmente o presionar Enter para cerrarlo automáticamente.")
                 
-                input("\n\tPresiona Enter para cerrar el navegador y terminar...")
+                # En modo no interactivo el navegador se cierra sin esperar
+                if self.parametros_cli is None:
+                    print("\n\tEl navegador se mantendrá abierto.")
+                    print("\tPuedes cerrarlo manualmente o presionar Enter para cerrarlo automáticamente.")
+                    
+                    input("\n\tPresiona Enter para cerrar el navegador y terminar...")
                 self.driver.quit()
             
+            if self.navegador_precalentado and not self.conservar_navegador:
+                self.navegador_precalentado.cerrar(cerrar_navegador=not self.driver)
+                self.navegador_precalentado = None
+            
             duracion = datetime.now() - self.inicio_proceso
             print(f"\n\tTiempo total de ejecución: {duracion.total_seconds():.1f} segundos")
             print(f"\tFecha y hora de finalización: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
             print(f"\n{'='*60}")
             print("¡PROCESO COMPLETADO!")
             print(f"{'='*60}\n")
+            
+            self.detener_logging()
+    
+    def normalizar_csv(self, ruta_csv):
+        """Normaliza un CSV ya exportado y lo guarda como <nombre>_normalizado.csv"""
+        from LEQ_Normalizacion import leer_csv_datos, normalizar_dataset
+        
+        inicio = time.perf_counter()
+        df = normalizar_dataset(leer_csv_datos(ruta_csv))
+        
+        ruta_salida = f"{os.path.splitext(ruta_csv)[0]}_normalizado.csv"
+        df.to_csv(ruta_salida, index=False, encoding='utf-8-sig', sep=';')
+        
+        no_parseables = (df['Valores_No_Parseables'] != '').sum()
+        self.log_success(f"{len(df):,} registros normalizados en {time.perf_counter() - inicio:.1f} s ({no_parseables} con valores no parseables)")
+        self.log_info(f"\tGuardado en: {ruta_salida}")
+    
+    def importar_historico(self, raiz, destino='LEQ_historico'):
+        """Importa en un único almacén los datos de todas las carpetas LEQ_* antiguas (v1 y vIA)"""
+        from LEQ_Importacion import descubrir_carpetas, importar_carpetas, nombre_carpeta_informe
+        from LEQ_Cubo import guardar_tabla, hay_parquet
+        
+        inicio = time.perf_counter()
+        informes = {'urls': {}, 'carpetas': {}}
+        for numero, url_info in self.urls_disponibles.items():
+            informes['urls'][url_info['url']] = numero
+            informes['carpetas'][nombre_carpeta_informe(url_info['nombre'])] = numero
+            informes['carpetas'][nombre_carpeta_informe(url_info['nombre_file'])] = numero
+        
+        carpetas = descubrir_carpetas(raiz)
+        if not carpetas:
+            self.log_warning(f"No hay carpetas LEQ_<informe>_<fecha> en {raiz}")
+            return
+        self.log_info(f"\tImportando {len(carpetas)} carpetas de {raiz}...")
+        
+        leidas = []
+        
+        def al_leer(carpeta, origen, registros):
+            leidas.append(carpeta)
+            if origen:
+                self.log_info(f"\t[{len(leidas):4}/{len(carpetas)}] {os.path.basename(carpeta)}: {registros:,} registros ({origen})")
+            else:
+                self.log_warning(f"\t[{len(leidas):4}/{len(carpetas)}] {os.path.basename(carpeta)}: sin datos legibles")
+        
+        historico, errores = importar_carpetas(carpetas, informes, procesos=self.procesos_exportacion, al_leer=al_leer)
+        for carpeta, error in errores.items():
+            self.log_error(f"Error leyendo {carpeta}: {error[:100]}")
+        
+        if historico.empty:
+            self.log_warning("No se importó ningún registro")
+            return
+        
+        sin_informe = historico['Informe'].isna().sum()
+        if sin_informe:
+            self.log_warning(f"{sin_informe} registros sin informe reconocible (ni por URL ni por carpeta)")
+        
+        ruta = guardar_tabla(historico, destino)
+        self.log_success(f"{len(historico):,} registros únicos en {ruta} ({time.perf_counter() - inicio:.1f} s)")
+        
+        if self.directorio_dataset and hay_parquet():
+            from LEQ_Dataset import escribir_dataset
+            resumen = escribir_dataset(historico, self.directorio_dataset, informes['urls'])
+            self.log_success(f"Dataset: {resumen['filas']:,} filas en {resumen['particiones']} particiones de {self.directorio_dataset}")
+    
+    def reparsear_desde_archivo(self, ruta_csv):
+        """Reconstruye el dataset de un CSV volviendo a parsear el HTML archivado"""
+        from LEQ_Archivo import ArchivoHTML
+        from LEQ_Normalizacion import leer_csv_datos
+        
+        df = leer_csv_datos(ruta_csv)
+        if 'Hash_HTML' not in df.columns:
+            self.log_error("El CSV no tiene columna Hash_HTML (ejecución sin archivo de HTML)")
+            return
+        
+        archivo = ArchivoHTML(self.directorio_archivo_html)
+        
+        # Cada HTML distinto se parsea una sola vez
+        valores_por_hash = {}
+        no_encontrados = 0
+        for hash_html in df['Hash_HTML'].dropna().unique():
+            span_text = archivo.leer(hash_html)
+            if span_text is None:
+                no_encontrados += 1
+                continue
+            valores_por_hash[hash_html] = self.parsear_indicadores(span_text) or {}
+        
+        for columna in ('Pacientes_en_Lista', 'Demora_Media'):
+            nuevos = df['Hash_HTML'].map(lambda h: valores_por_hash.get(h, {}).get(columna))
+            df[columna] = nuevos.fillna(df[columna]) if columna in df.columns else nuevos
+        
+        ruta_salida = f"{os.path.splitext(ruta_csv)[0]}_reparseado.csv"
+        df.to_csv(ruta_salida, index=False, encoding='utf-8-sig', sep=';')
+        
+        self.log_success(f"{len(df):,} registros reconstruidos desde {len(valores_por_hash):,} HTML archivados")
+        if no_encontrados:
+            self.log_warning(f"{no_encontrados} HTML no encontrados en {self.directorio_archivo_html}")
+        self.log_info(f"\tGuardado en: {ruta_salida}")
+    
+    def servir_datos(self, host='127.0.0.1', puerto=8765):
+        """Servicio HTTP local de consulta sobre los datos consolidados del cubo"""
+        from LEQ_Servicio import crear_servidor
+        
+        servidor = crear_servidor(self.directorio_cubo, host, puerto, informes=self.urls_disponibles)
+        self.log_success(f"Servicio de consulta en http://{host}:{puerto}")
+        self.log_info("\t  GET  /datos?informe=3&hospital=...&especialidad=...&desde=2024-01&hasta=2025-06&formato=json|csv")
+        self.log_info("\t  GET  /estado")
+        self.log_info("\t  POST /invalidar")
+        
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
+    
+    def servir_demonio(self, crear_scraper, host='127.0.0.1', puerto=8766, sesiones=1):
+        """Servicio de larga duración: recibe trabajos por HTTP y los ejecuta con navegadores calientes"""
+        from LEQ_Demonio import DemonioScraper, crear_servidor_demonio
+        
+        demonio = DemonioScraper(
+            crear_scraper, sesiones=sesiones,
+            urls_precarga=[url_info['url'] for url_info in self.urls_disponibles.values()]
+        )
+        demonio.iniciar()
+        
+        servidor = crear_servidor_demonio(demonio, host, puerto)
+        self.log_success(f"Demonio de scraping en http://{host}:{puerto} ({sesiones} sesiones)")
+        self.log_info('\t  POST /trabajos  {"informe": 3, "anos": [2025], "hospitales": "", "especialidades": ""}')
+        self.log_info("\t  GET  /trabajos  /trabajos/<id>  /estado")
+        
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
+            self.log_info("\tDeteniendo sesiones...")
+            demonio.detener()
+    
+    def servir_simulador(self, host='127.0.0.1', puerto=8767, retardo=0.3):
+        """Sirve la réplica local de los formularios LEQ (para pruebas y mediciones)"""
+        from LEQ_Simulador import SimuladorLEQ, crear_servidor_simulador, url_simulador
+        
+        servidor = crear_servidor_simulador(SimuladorLEQ(retardo=retardo), host, puerto)
+        self.log_success(f"Simulador LEQ en {url_simulador(servidor)} ({retardo}s por consulta)")
+        
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
+    
+    def filtrar_opciones_dimension(self, dimension, opciones, selecciones, anos_seleccionados):
+        """Opciones elegidas de una dimensión del formulario (números, nombres o todas)"""
+        if dimension['nombre'] == 'Fecha' and anos_seleccionados:
+            opciones = [o for o in opciones if self.es_mes_del_ano(o['nombre'], anos_seleccionados)]
+        
+        seleccion = selecciones.get(dimension['nombre'].lower(), '').strip()
+        if not seleccion:
+            return opciones
+        
+        numeros = self.validar_y_parsear_entrada(seleccion)
+        if numeros:
+            return [opciones[n - 1] for n in numeros if 0 < n <= len(opciones)]
+        return self.buscar_por_nombre(seleccion, opciones)
+    
+    def introspeccionar_formulario(self, url_info):
+        """Abre el informe y descubre sus dimensiones y dependencias"""
+        from LEQ_Formulario import Formulario
+        
+        self.url_actual = url_info['url']
+        self.iniciar_navegador(url_info['url'])
+        
+        formulario = Formulario(self.driver, self.TIEMPO_TIMEOUT)
+        dimensiones = formulario.descubrir_dependencias(formulario.describir())
+        
+        nombres = {d['id']: d['nombre'] for d in dimensiones}
+        for posicion, dimension in enumerate(dimensiones, 1):
+            dependencias = ', '.join(nombres.get(padre, padre) for padre in dimension['depende_de'])
+            self.log_info(
+                f"\t{posicion}. {dimension['nombre']:20} {len(dimension['opciones']):5} opciones"
+                f"{' | postback' if dimension['postback'] else ''}"
+                f"{f' | depende de: {dependencias}' if dependencias else ''}"
+            )
+        
+        return formulario, dimensiones
+    
+    def explorar_formulario(self, url_info):
+        """Muestra las dimensiones del formulario de un informe y termina"""
+        try:
+            _, dimensiones = self.introspeccionar_formulario(url_info)
+            for dimension in dimensiones:
+                print(f"\n\t{dimension['nombre']} ({dimension['id']})")
+                for i, opcion in enumerate(dimension['opciones'][:10], 1):
+                    print(f"\t  {i:3}. {opcion['nombre']}")
+                if len(dimension['opciones']) > 10:
+                    print(f"\t  ... y {len(dimension['opciones']) - 10} más")
+        finally:
+            if self.driver:
+                self.driver.quit()
+    
+    def rastrear_formulario(self, url_info, selecciones, anos_seleccionados):
+        """Recorre el plan cartesiano de todas las dimensiones del formulario de un informe"""
+        from LEQ_Formulario import estimar_consultas
+        
+        self.inicio_proceso = datetime.now()
+        
+        try:
+            carpeta_principal = self.crear_estructura_carpetas(url_info, anos_seleccionados, 0)
+            self.configurar_logging(carpeta_principal)
+            
+            formulario, dimensiones = self.introspeccionar_formulario(url_info)
+            
+            def elegidas(dimension, opciones):
+                return self.filtrar_opciones_dimension(dimension, opciones, selecciones, anos_seleccionados)
+            
+            total = estimar_consultas(dimensiones, elegidas)
+            self.log_success(f"{total} consultas planificadas (estimación) sobre {len(dimensiones)} dimensiones")
+            self.progreso = ReporteProgreso(
+                total,
+                ruta_estado=os.path.join(carpeta_principal, 'estado_progreso.json'),
+                mostrar_barra=self.mostrar_barra_progreso
+            )
+            
+            registros = []
+            
+            def recorrer(nivel, valores):
+                if nivel == len(dimensiones):
+                    registros.extend(self.consultar_combinacion(valores))
+                    return
+                
+                dimension = dimensiones[nivel]
+                # Las dimensiones dependientes se leen de nuevo: sus opciones dependen de los padres
+                opciones = formulario.opciones(dimension) if dimension['depende_de'] else dimension['opciones']
+                
+                for opcion in elegidas(dimension, opciones):
+                    # Solo se cambia lo que difiere de la selección actual del formulario
+                    formulario.seleccionar(dimension, opcion['valor'])
+                    recorrer(nivel + 1, {**valores, dimension['nombre']: (dimension, opcion)})
+            
+            recorrer(0, {})
+            self.progreso.finalizar()
+            
+            self.log_success(
+                f"{len(registros)} registros en {self.progreso.completadas} consultas "
+                f"({formulario.selecciones} selecciones enviadas)"
+            )
+            
+            if registros:
+                self.guardar_archivos_consolidados(registros, [], carpeta_principal, anos_seleccionados, True)
+        
+        except Exception as e:
+            self.log_error(f"Error recorriendo el formulario: {e}")
+            import traceback
+            traceback.print_exc()
+        
+        finally:
+            if self.driver:
+                self.driver.quit()
+            self.detener_logging()
+    
+    def consultar_combinacion(self, valores):
+        """Pulsa Buscar con las dimensiones ya seleccionadas y construye el registro"""
+        def nombre(dimension):
+            return valores[dimension][1]['nombre'] if dimension in valores else None
+        
+        datos = []
+        if self.pulsar_buscar():
+            time.sleep(self.TIEMPO_ESPERA_NORMAL)
+            html = self.obtener_html_indicadores(self.driver)
+            registro = self.construir_registro(
+                html, self.driver.current_url, nombre('Hospital'), nombre('Fecha'), nombre('Especialidad')
+            ) if html else None
+            
+            if registro:
+                # Dimensiones propias del informe (procesos, pruebas...) en su propia columna
+                for dimension, opcion in valores.values():
+                    registro[dimension['columna']] = opcion['nombre']
+                datos.append(registro)
+        
+        self.progreso.registrar(bool(datos))
+        descripcion = ' | '.join(opcion['nombre'][:20] for _, opcion in valores.values())
+        if datos:
+            self.log_info(f"\t✓ {descripcion} | Pac: {datos[0]['Pacientes_en_Lista']:>6} | Días: {datos[0]['Demora_Media']:>6}")
+        else:
+            self.log_warning(f"\t✗ {descripcion} | Sin datos")
+        
+        return datos
+    
+    def ejecutar_coordinador(self, ruta_cola):
+        """Modo coordinador: planifica todas las consultas y las publica en la cola compartida"""
+        
+        self.inicio_proceso = datetime.now()
+        
+        try:
+            parametros = self.seleccionar_parametros()
+            if not parametros:
+                return
+            
+            print("\n\n\n")
+            self.log_info(f"{'='*60}")
+            self.log_info("PLANIFICANDO CONSULTAS EN LA COLA")
+            self.log_info(f"{'='*60}")
+            
+            cola = ColaTrabajo(ruta_cola)
+            cola.guardar_parametros({
+                'url_info': parametros['url_info'],
+                'anos_seleccionados': parametros['anos_seleccionados'],
+                'filtrar': parametros['filtrar'],
+                'especialidades_seleccionadas': self.especialidades_seleccionadas_global
+            })
+            
+            hospitales_seleccionados = parametros['hospitales_seleccionados']
+            total_encoladas = 0
+            
+            for idx, hospital in enumerate(hospitales_seleccionados):
+                self.log_info(f"\n\tHOSPITAL {idx+1}/{len(hospitales_seleccionados)}: {hospital['nombre']}")
+                
+                plan = self.planificar_hospital(
+                    hospital, parametros['anos_seleccionados'], parametros['filtrar']
+                )
+                if plan is None or not plan['meses_a_procesar']:
+                    self.log_warning("No hay meses para procesar con los criterios seleccionados")
+                    continue
+                
+                encoladas = cola.encolar(self.aplicar_mapa_dispersion(planificar_consultas(
+                    self.url_actual, hospital, plan['meses_a_procesar'], plan['especialidades_a_procesar']
+                )))
+                total_encoladas += encoladas
+                self.log_success(f"{encoladas} consultas encoladas")
+            
+            self.log_success(f"Total: {total_encoladas} consultas nuevas en {ruta_cola}")
+            self.log_info(f"\tEstado de la cola: {cola.resumen()}")
+            
+        finally:
+            if self.driver:
+                self.driver.quit()
+                self.driver = None
+    
+    def ejecutar_trabajador(self, ruta_cola, trabajador=None, lote=5, duracion_lease=120):
+        """Modo trabajador: reclama consultas de la cola, las ejecuta y publica los resultados"""
+        
+        self.inicio_proceso = datetime.now()
+        trabajador = trabajador or f"{socket.gethostname()}-{os.getpid()}"
+        cola = ColaTrabajo(ruta_cola)
+        url_cargada = None
+        hospital_cargado = None
+        consultas_realizadas = 0
+        consultas_duplicadas = 0
+        
+        self.log_info(f"\tTrabajador {trabajador} conectado a {ruta_cola}")
+        
+        try:
+            while True:
+                reemitidos = cola.reemitir_expirados()
+                if reemitidos:
+                    self.log_warning(f"{reemitidos} consultas con lease expirado vuelven a la cola")
+                
+                trabajos = cola.reclamar(trabajador, lote, duracion_lease)
+                
+                if not trabajos:
+                    if not cola.quedan_trabajos():
+                        break
+                    # Otros trabajadores tienen consultas asignadas: esperar por si expiran
+                    time.sleep(min(duracion_lease / 4, 30))
+                    continue
+                
+                latido = LatidoLease(cola, trabajador, [t['id'] for t in trabajos], duracion_lease)
+                latido.start()
+                
+                try:
+                    for trabajo in trabajos:
+                        try:
+                            if self.driver is None:
+                                self.iniciar_navegador(trabajo['url'])
+                                url_cargada = trabajo['url']
+                            elif trabajo['url'] != url_cargada:
+                                self.driver.get(trabajo['url'])
+                                time.sleep(self.TIEMPO_ESPERA_NORMAL)
+                                url_cargada = trabajo['url']
+                                hospital_cargado = None
+                            
+                            if hospital_cargado != trabajo['hospital']['valor']:
+                                if not self.seleccionar_elemento_dropdown(
+                                    "ContenedorContenidoSeccion_ddlHospital",
+                                    trabajo['hospital']['indice'],
+                                    usar_index=True
+                                ):
+                                    raise RuntimeError(f"No se pudo seleccionar {trabajo['hospital']['nombre']}")
+                                hospital_cargado = trabajo['hospital']['valor']
+                            
+                            datos = self.consultar(
+                                trabajo['hospital']['nombre'], trabajo['mes'], trabajo['especialidad']
+                            )
+                            if datos is None:
+                                raise RuntimeError("No se pudo lanzar la consulta")
+                            
+                            # Lease perdido: otro trabajador la ha reclamado y su resultado es el que vale
+                            if not cola.completar(trabajo['id'], trabajador, datos):
+                                consultas_duplicadas += 1
+                                self.log_warning(f"\tLease perdido, resultado descartado: {trabajo['hospital']['nombre'][:30]} | {trabajo['mes']['texto']}")
+                                continue
+                            consultas_realizadas += 1
+                            
+                            estado = "✓" if datos else "✗ Sin datos"
+                            self.log_info(f"\t{estado} {trabajo['hospital']['nombre'][:30]} | {trabajo['mes']['texto']}")
+                            
+                        except Exception as e:
+                            # Forzar nueva selección de hospital tras un error
+                            hospital_cargado = None
+                            self.manejar_error_consulta(e)
+                            cola.fallar(trabajo['id'], trabajador, e)
+                            # Página de error en lugar del formulario: recargarla antes del siguiente trabajo
+                            if self.driver is not None and self.formulario_perdido():
+                                self.recargar_formulario(url_cargada)
+                finally:
+                    latido.detener()
+            
+        finally:
+            if self.driver:
+                self.driver.quit()
+                self.driver = None
+            
+            duracion = datetime.now() - self.inicio_proceso
+            self.log_success(f"Trabajador {trabajador}: {consultas_realizadas} consultas en {duracion.total_seconds():.1f} segundos")
+            if consultas_duplicadas:
+                self.log_warning(f"Trabajador {trabajador}: {consultas_duplicadas} consultas duplicadas por lease perdido")
+    
+    def consolidar_cola(self, ruta_cola):
+        """Genera los archivos consolidados con los resultados publicados en la cola"""
+        
+        self.inicio_proceso = datetime.now()
+        cola = ColaTrabajo(ruta_cola)
+        parametros = cola.leer_parametros()
+        
+        if not parametros:
+            self.log_error(f"La cola {ruta_cola} no tiene parámetros de ejecución")
+            return
+        
+        resumen = cola.resumen()
+        if cola.quedan_trabajos():
+            self.log_warning(f"Quedan consultas sin terminar: {resumen}")
+        
+        self.especialidades_seleccionadas_global = parametros.get('especialidades_seleccionadas', [])
+        
+        carpeta_principal = self.crear_estructura_carpetas(
+            parametros['url_info'], parametros['anos_seleccionados'], 0
+        )
+        self.configurar_logging(carpeta_principal)
+        
+        try:
+            self.guardar_archivos_consolidados(
+                cola.resultados(),
+                cola.estadisticas_por_hospital(),
+                carpeta_principal,
+                parametros['anos_seleccionados'],
+                parametros['filtrar']
+            )
+        finally:
+            self.detener_logging()
+
+def crear_mapa_vacios(args):
+    """Mapa de combinaciones vacías (None si no se ha pedido con --mapa-vacios)"""
+    if not args.mapa_vacios:
+        return None
+    from LEQ_Dispersion import MapaDispersion
+    return MapaDispersion(args.mapa_vacios, dias_reprueba=args.dias_reprueba, modo=args.vacios)
+
+
+def crear_scraper(args, mapa_vacios=False):
+    """Crea un scraper configurado según los argumentos de la línea de comandos"""
+    scraper = LEQScraper()
+    scraper.ruta_estado_cambios = args.estado_cambios or None
+    scraper.logging_asincrono = args.log_asincrono
+    scraper.ruta_catalogos = args.catalogos or None
+    scraper.directorio_cubo = args.cubo or None
+    scraper.directorio_dataset = args.dataset or None
+    scraper.url_servicio = args.servicio
+    scraper.directorio_archivo_html = args.archivo_html or None
+    scraper.hilos_parseo = max(args.hilos_parseo, 1)
+    scraper.capacidad_colas = max(args.capacidad_colas, 1)
+    scraper.formatos_exportacion = [formato.strip().lower() for formato in args.formatos.split(',') if formato.strip()]
+    scraper.libros_por_hospital = args.libros_hospital
+    scraper.precalentar = not args.sin_precalentar
+    scraper.politica_orden = args.orden
+    scraper.segundos_plazo = leer_duracion(args.tiempo_maximo) if args.tiempo_maximo else None
+    scraper.pesos_orden = leer_pesos(args.pesos)
+    scraper.procesos_exportacion = args.procesos
+    scraper.solo_estimar = args.estimar
+    scraper.pestanas = max(args.pestanas, 1)
+    scraper.captura_red = args.captura_red
+    scraper.TIEMPO_TIMEOUT = args.timeout
+    scraper.perfilar = args.perfil
+    scraper.muestra_estimacion = max(args.muestra, 1)
+    scraper.max_trabajadores_estimacion = max(args.max_trabajadores, 1)
+    
+    # Solo las órdenes que consultan abren (y crean) la base de datos del mapa
+    if mapa_vacios:
+        scraper.mapa_dispersion = crear_mapa_vacios(args)
+    
+    return scraper
+
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description="Scraper de listas de espera de sanidadmadrid.org")
+    parser.add_argument('--config', metavar='JSON',
+                        help="Archivo JSON con los argumentos (informe, anos, hospitales, especialidades...)")
+    
+    # Ejecución no interactiva
+    parser.add_argument('--informe', type=int, choices=[1, 2, 3, 4],
+                        help="Informe a procesar (ver --listar-informes); activa el modo no interactivo")
+    parser.add_argument('--anos', metavar='AÑOS',
+                        help="Años a filtrar: 2025  2024,2025  o  2015-2025")
+    parser.add_argument('--hospitales', default='',
+                        help="Números (1,3,5 / 1-5) o nombres separados por ';' (vacío = todos)")
+    parser.add_argument('--especialidades', default='',
+                        help="Números (1,3,5 / 1-5) o nombres separados por ';' (vacío = todas)")
+    
+    modo = parser.add_mutually_exclusive_group()
+    modo.add_argument('--listar-informes', action='store_true',
+                      help="Muestra los informes y los catálogos en caché y termina")
+    modo.add_argument('--normalizar', metavar='CSV',
+                      help="Normaliza números y meses de un CSV ya exportado y termina")
+    modo.add_argument('--reparsear', metavar='CSV',
+                      help="Reconstruye un CSV volviendo a parsear el HTML archivado y termina")
+    modo.add_argument('--importar', metavar='DIR',
+                      help="Importa las carpetas LEQ_* antiguas de DIR (v1 y vIA) en un único almacén sin duplicados")
+    modo.add_argument('--servir', action='store_true',
+                      help="Arranca el servicio HTTP local de consulta sobre los datos del cubo")
+    modo.add_argument('--demonio', action='store_true',
+                      help="Servicio de larga duración que recibe trabajos por HTTP y mantiene navegadores calientes")
+    modo.add_argument('--explorar', action='store_true',
+                      help="Muestra las dimensiones (desplegables) del formulario de --informe y sus dependencias")
+    modo.add_argument('--rastrear', action='store_true',
+                      help="Recorre todas las dimensiones del formulario de --informe (ver --dimension)")
+    modo.add_argument('--simulador', action='store_true',
+                      help="Sirve una réplica local de los formularios LEQ (ver --retardo-simulador)")
+    modo.add_argument('--comparar-pestanas', action='store_true',
+                      help="Mide contra el simulador local 1 sesión, 1 sesión con --pestanas pestañas y --pestanas sesiones")
+    modo.add_argument('--comparar', nargs=2, metavar=('BASE', 'ACTUAL'),
+                      help="Compara los manifiestos de dos ejecuciones (carpeta o manifiesto_ejecucion.json) y "
+                           "termina con código 1 si el rendimiento o la latencia empeoran más que --umbral")
+    modo.add_argument('--probar-fallos', action='store_true',
+                      help="Prueba de carga contra el simulador local con fallos inyectados (lentas, vacías, 500, cortes, "
+                           "ViewState caducado, DOM obsoleto): consultas/s, éxito y latencia de cola por perfil")
+    modo.add_argument('--reanudar', metavar='PENDIENTES',
+                      help="Continúa las consultas pendientes (pendientes.json) de una ejecución anterior")
+    modo.add_argument('--coordinador', metavar='COLA',
+                      help="Planifica las consultas en una cola compartida (SQLite) para varios trabajadores")
+    modo.add_argument('--trabajador', metavar='COLA',
+                      help="Reclama y ejecuta consultas de la cola compartida")
+    modo.add_argument('--consolidar', metavar='COLA',
+                      help="Genera los archivos consolidados con los resultados de la cola")
+    parser.add_argument('--sesiones', type=int, default=1,
+                        help="Navegadores del demonio que atienden trabajos en paralelo (por defecto 1)")
+    parser.add_argument('--puerto-demonio', type=int, default=8766,
+                        help="Puerto del demonio de scraping (por defecto 8766)")
+    parser.add_argument('--dimension', action='append', default=[], metavar='NOMBRE=SELECCION',
+                        help="Selección de una dimensión para --rastrear (ej: Proceso=1-5, Hospital=Gregorio); repetible")
+    parser.add_argument('--captura-red', action='store_true',
+                        help="Lee la respuesta de cada Buscar de los eventos de red de Chrome (DevTools) "
+                             "en lugar de esperar al DOM; con --archivo-html guarda también la respuesta íntegra")
+    parser.add_argument('--perfil', '--profile', dest='perfil', action='store_true',
+                        help="Perfila la ejecución en su carpeta: perfil_cpu.prof (cProfile), perfil_reloj.folded "
+                             "(muestreo de todos los hilos), instantáneas de tracemalloc por hospital, RSS de Python "
+                             "y del navegador y un resumen en perfil_resumen.txt")
+    parser.add_argument('--pestanas', type=int, default=1,
+                        help="Pestañas de la sesión de Chrome que se alternan las consultas (por defecto 1)")
+    parser.add_argument('--retardo-simulador', type=float, default=0.3,
+                        help="Segundos que tarda el simulador en responder a cada consulta (por defecto 0.3)")
+    parser.add_argument('--perfiles-fallos', default='',
+                        help="Perfiles de --probar-fallos separados por comas (por defecto todos: sin_fallos, lentas, "
+                             "vacias, error500, cortes, viewstate, dom_obsoleto, mixto)")
+    parser.add_argument('--umbral', type=float, default=10,
+                        help="Porcentaje de empeoramiento que --comparar marca como regresión (por defecto 10)")
+    parser.add_argument('--timeout', type=float, default=10,
+                        help="Segundos de espera máxima de cada respuesta del formulario (por defecto 10)")
+    parser.add_argument('--puerto-simulador', type=int, default=8767,
+                        help="Puerto del simulador local (por defecto 8767)")
+    parser.add_argument('--lote', type=int, default=5,
+                        help="Consultas reclamadas por cada trabajador de una vez (por defecto 5)")
+    parser.add_argument('--lease', type=int, default=120,
+                        help="Duración del lease en segundos antes de reasignar una consulta (por defecto 120)")
+    parser.add_argument('--log-asincrono', action='store_true',
+                        help="Logging no bloqueante en segundo plano (JSON Lines + consola limitada)")
+    parser.add_argument('--estado-cambios', metavar='RUTA', default='',
+                        help="Base de datos con los últimos valores para el feed de cambios (ej: LEQ_ultimos_valores.db; "
+                             "desactivado por defecto)")
+    parser.add_argument('--historico', metavar='RUTA', default='LEQ_historico',
+                        help="Almacén de --importar, sin extensión (parquet, o CSV sin pyarrow)")
+    parser.add_argument('--dataset', metavar='DIR', default='',
+                        help="Dataset parquet particionado report=<n>/year=<yyyy>/month=<mm> (ej: LEQ_dataset; "
+                             "desactivado por defecto)")
+    parser.add_argument('--cubo', metavar='DIR', default='',
+                        help="Directorio del cubo agregado hospital × especialidad × mes (ej: LEQ_cubo; "
+                             "desactivado por defecto; lo necesitan --servir y --servicio)")
+    parser.add_argument('--puerto', type=int, default=8765,
+                        help="Puerto del servicio de consulta (por defecto 8765)")
+    parser.add_argument('--servicio', metavar='URL',
+                        help="Servicio de consulta a avisar al terminar (ej: http://127.0.0.1:8765)")
+    parser.add_argument('--archivo-html', metavar='DIR', default='',
+                        help="Archivo comprimido del HTML de indicadores (ej: LEQ_archivo_html): los datos llevan "
+                             "Hash_HTML en lugar de Texto_Completo; desactivado por defecto")
+    parser.add_argument('--mapa-vacios', metavar='RUTA', default='',
+                        help="Mapa de combinaciones vacías entre ejecuciones (ej: LEQ_mapa_vacios.db; "
+                             "desactivado por defecto)")
+    parser.add_argument('--vacios', choices=['omitir', 'posponer'], default='omitir',
+                        help="Qué hacer con las combinaciones vacías conocidas (por defecto omitir)")
+    parser.add_argument('--dias-reprueba', type=int, default=30,
+                        help="Días hasta volver a probar una combinación vacía (se duplica en cada vacío)")
+    parser.add_argument('--hilos-parseo', type=int, default=2,
+                        help="Hilos de la etapa de parseo de la tubería (por defecto 2)")
+    parser.add_argument('--capacidad-colas', type=int, default=16,
+                        help="Tamaño máximo de cada cola entre etapas (por defecto 16)")
+    parser.add_argument('--formatos', default='xlsx,csv',
+                        help="Formatos de exportación: xlsx,csv,parquet,json,resumen (por defecto xlsx,csv; "
+                             "parquet requiere pyarrow)")
+    parser.add_argument('--libros-hospital', action='store_true',
+                        help="Genera además un libro Excel por hospital (en paralelo, en la carpeta Hospitales)")
+    parser.add_argument('--procesos', type=int,
+                        help="Procesos para escribir los libros Excel (por defecto, uno por CPU)")
+    parser.add_argument('--sin-precalentar', action='store_true',
+                        help="No arrancar el navegador en segundo plano durante los menús")
+    parser.add_argument('--orden', choices=['hospital', 'recientes', 'rotacion', 'pesos'], default='hospital',
+                        help="Orden de las consultas: hospital a hospital (por defecto), meses más recientes primero, "
+                             "rotación entre hospitales o reparto según --pesos")
+    parser.add_argument('--pesos', default='',
+                        help="Pesos por hospital o especialidad para --orden pesos (ej: 'Gregorio=3;Cardiología=2')")
+    parser.add_argument('--tiempo-maximo', '--time-budget', dest='tiempo_maximo', metavar='DURACION',
+                        help="Presupuesto de tiempo con unidad: 90m, 2h, 1h30m, 45s o una hora límite 06:30. "
+                             "Lo que no da tiempo a consultar se guarda en pendientes.json")
+    parser.add_argument('--estimar', '--dry-run', dest='estimar', action='store_true',
+                        help="Planifica la ejecución, mide una muestra de consultas y estima consultas, "
+                             "postbacks, tiempo por número de trabajadores y tamaño de salida (no extrae datos)")
+    parser.add_argument('--muestra', type=int, default=5,
+                        help="Consultas reales que se miden con --estimar (por defecto 5)")
+    parser.add_argument('--max-trabajadores', type=int, default=8,
+                        help="Trabajadores hasta los que se proyecta el tiempo con --estimar (por defecto 8)")
+    parser.add_argument('--catalogos', metavar='RUTA', default='',
+                        help="Caché de catálogos de hospitales y especialidades (ej: LEQ_catalogos.json; "
+                             "desactivada por defecto)")
+    
+    args = parser.parse_args()
+    
+    # Los valores del archivo de configuración actúan como valores por defecto de la línea de comandos
+    if args.config:
+        with open(args.config, encoding='utf-8') as f:
+            config = json.load(f)
+        parser.set_defaults(**{clave.replace('-', '_'): valor for clave, valor in config.items()})
+        args = parser.parse_args()
+    
+    if args.tiempo_maximo:
+        try:
+            leer_duracion(args.tiempo_maximo)
+        except ValueError as e:
+            parser.error(str(e))
+    
+    scraper = crear_scraper(args)
+    
+    if args.listar_informes:
+        scraper.listar_catalogos()
+        return
+    
+    if args.normalizar:
+        scraper.normalizar_csv(args.normalizar)
+        return
+    
+    if args.importar:
+        scraper.importar_historico(args.importar, args.historico)
+        return
+    
+    if args.reparsear:
+        if not args.archivo_html:
+            parser.error("--reparsear requiere --archivo-html con el archivo de la ejecución")
+        scraper.reparsear_desde_archivo(args.reparsear)
+        return
+    
+    if args.servir:
+        if not args.cubo:
+            parser.error("--servir requiere --cubo con el directorio del cubo")
+        scraper.servir_datos(puerto=args.puerto)
+        return
+    
+    if args.simulador:
+        scraper.servir_simulador(puerto=args.puerto_simulador, retardo=args.retardo_simulador)
+        return
+    
+    if args.comparar_pestanas:
+        from LEQ_Carga import comparar_pestanas
+        comparar_pestanas(lambda: crear_scraper(args), pestanas=max(args.pestanas, 2), retardo=args.retardo_simulador)
+        return
+    
+    if args.comparar:
+        if comparar_ejecuciones(*args.comparar, umbral=args.umbral / 100):
+            parser.exit(1)
+        return
+    
+    if args.probar_fallos:
+        from LEQ_Carga import PERFILES_FALLOS, probar_fallos
+        perfiles = [perfil.strip() for perfil in args.perfiles_fallos.split(',') if perfil.strip()]
+        desconocidos = [perfil for perfil in perfiles if perfil not in PERFILES_FALLOS]
+        if desconocidos:
+            parser.error(f"Perfiles de fallos desconocidos: {', '.join(desconocidos)} (disponibles: {', '.join(PERFILES_FALLOS)})")
+        resultado = probar_fallos(
+            lambda: crear_scraper(args), perfiles, pestanas=max(args.pestanas, 1), retardo=args.retardo_simulador,
+            timeout=args.timeout, ruta_resultados=f"LEQ_prueba_fallos_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        recuperacion = resultado['recuperacion_viewstate']
+        if recuperacion and not recuperacion['recuperada']:
+            parser.exit(1)
+        return
+    
+    if args.informe:
+        anos = args.anos if isinstance(args.anos, list) else scraper.validar_y_parsear_entrada(str(args.anos or ''))
+        if not anos and not args.explorar:
+            parser.error("--informe requiere --anos (ej: 2024,2025 o 2015-2025)")
+        
+        scraper.parametros_cli = {
+            'informe': args.informe,
+            'anos': anos,
+            'hospitales': args.hospitales,
+            'especialidades': args.especialidades
+        }
+    
     print("\n\n\n" + "="*60)
     print("\t  SANIDADMADRID.ORG  LEQ  SCRAPER ")
     print("="*60)
@@ -1132,8 +3101,38 @@ def main():
     print("\t  2. Tener chromedriver en el PATH")
     print("\t  3. Conexión a internet estable")
     
-    scraper = LEQScraper()
-    scraper.ejecutar()
+    if args.explorar or args.rastrear:
+        if not args.informe:
+            parser.error("--explorar y --rastrear requieren --informe")
+        url_info = scraper.urls_disponibles[args.informe]
+        
+        if args.explorar:
+            scraper.explorar_formulario(url_info)
+            return
+        
+        selecciones = {}
+        for dimension in args.dimension:
+            nombre, _, seleccion = dimension.partition('=')
+            selecciones[nombre.strip().lower()] = seleccion
+        scraper.rastrear_formulario(url_info, selecciones, scraper.parametros_cli['anos'])
+        return
+    
+    scraper.mapa_dispersion = crear_mapa_vacios(args)
+    
+    if args.reanudar:
+        scraper.reanudar(args.reanudar)
+        return
+    
+    if args.demonio:
+        scraper.servir_demonio(lambda: crear_scraper(args, mapa_vacios=True), puerto=args.puerto_demonio, sesiones=max(args.sesiones, 1))
+    elif args.coordinador:
+        scraper.ejecutar_coordinador(args.coordinador)
+    elif args.trabajador:
+        scraper.ejecutar_trabajador(args.trabajador, lote=args.lote, duracion_lease=args.lease)
+    elif args.consolidar:
+        scraper.consolidar_cola(args.consolidar)
+    else:
+        scraper.ejecutar()
 
 if __name__ == "__main__":
     main()
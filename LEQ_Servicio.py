@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from LEQ_Cubo import leer_tabla
+
+
+class CacheLRU:
+    """Caché LRU en memoria, segura entre hilos"""
+
+    def __init__(self, capacidad=256):
+        self.capacidad = capacidad
+        self.datos = OrderedDict()
+        self.bloqueo = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave):
+        with self.bloqueo:
+            if clave in self.datos:
+                self.datos.move_to_end(clave)
+                self.aciertos += 1
+                return self.datos[clave]
+            self.fallos += 1
+            return None
+
+    def guardar(self, clave, valor):
+        with self.bloqueo:
+            self.datos[clave] = valor
+            self.datos.move_to_end(clave)
+            while len(self.datos) > self.capacidad:
+                self.datos.popitem(last=False)
+
+    def vaciar(self):
+        with self.bloqueo:
+            self.datos.clear()
+
+    def estadisticas(self):
+        with self.bloqueo:
+            return {
+                'entradas': len(self.datos),
+                'capacidad': self.capacidad,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos
+            }
+
+
+class ConjuntoDatos:
+    """Datos consolidados (hechos del cubo) recargados cuando termina una nueva ejecución"""
+
+    def __init__(self, directorio_cubo, informes=None, capacidad_cache=256):
+        self.ruta_hechos = os.path.join(directorio_cubo, 'hechos')
+        self.informes = informes or {}
+        self.cache = CacheLRU(capacidad_cache)
+        self.bloqueo = threading.Lock()
+        self.df = None
+        self.version = None
+
+    def version_en_disco(self):
+        """Fecha de modificación del archivo de hechos (None si no existe)"""
+        for extension in ('.parquet', '.csv'):
+            ruta = f"{self.ruta_hechos}{extension}"
+            if os.path.exists(ruta):
+                return ruta, os.path.getmtime(ruta)
+        return None
+
+    def cargar(self, forzar=False):
+        """Recarga los datos (e invalida la caché) si el archivo ha cambiado"""
+        version = self.version_en_disco()
+        with self.bloqueo:
+            if not forzar and version == self.version and self.df is not None:
+                return self.df
+
+            df = leer_tabla(self.ruta_hechos)
+            if df is None:
+                df = pd.DataFrame(columns=['Informe', 'Hospital', 'Especialidad', 'Fecha_Mes',
+                                           'Pacientes_en_Lista', 'Demora_Media', 'Fecha_Extraccion'])
+            df['Fecha_Mes'] = pd.to_datetime(df['Fecha_Mes'])
+            self.df = df.sort_values(['Informe', 'Hospital', 'Especialidad', 'Fecha_Mes']).reset_index(drop=True)
+            self.version = version
+            self.cache.vaciar()
+            return self.df
+
+    def consultar(self, filtros, formato='json'):
+        """Devuelve (contenido, tipo) de la consulta, usando la caché si es posible"""
+        df = self.cargar()
+
+        clave = (formato, tuple(sorted(filtros.items())))
+        cacheado = self.cache.obtener(clave)
+        if cacheado is not None:
+            return cacheado
+
+        mascara = pd.Series(True, index=df.index)
+
+        informe = filtros.get('informe')
+        if informe:
+            # Número de informe (1-4) o parte de la URL
+            if informe.isdigit() and int(informe) in self.informes:
+                mascara &= df['Informe'] == self.informes[int(informe)]['url']
+            else:
+                mascara &= df['Informe'].str.contains(informe, case=False, regex=False, na=False)
+
+        for filtro, columna in (('hospital', 'Hospital'), ('especialidad', 'Especialidad')):
+            if filtros.get(filtro):
+                mascara &= df[columna].str.contains(filtros[filtro], case=False, regex=False, na=False)
+
+        if filtros.get('desde'):
+            mascara &= df['Fecha_Mes'] >= pd.Timestamp(filtros['desde'])
+        if filtros.get('hasta'):
+            mascara &= df['Fecha_Mes'] <= pd.Timestamp(filtros['hasta'])
+
+        resultado = df[mascara]
+
+        if formato == 'csv':
+            contenido = resultado.to_csv(index=False, sep=';', date_format='%Y-%m-%d').encode('utf-8')
+            respuesta = (contenido, 'text/csv; charset=utf-8')
+        else:
+            contenido = resultado.to_json(orient='records', date_format='iso', force_ascii=False).encode('utf-8')
+            respuesta = (contenido, 'application/json; charset=utf-8')
+
+        self.cache.guardar(clave, respuesta)
+        return respuesta
+
+
+class ManejadorConsultas(BaseHTTPRequestHandler):
+    """GET /datos, GET /estado, POST /invalidar"""
+
+    conjunto = None
+    filtros_validos = ('informe', 'hospital', 'especialidad', 'desde', 'hasta')
+
+    def responder(self, codigo, contenido, tipo='application/json; charset=utf-8'):
+        if isinstance(contenido, (dict, list)):
+            contenido = json.dumps(contenido, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parametros = {clave: valores[-1] for clave, valores in parse_qs(url.query).items()}
+
+        try:
+            if url.path == '/datos':
+                formato = parametros.pop('formato', 'json')
+                filtros = {clave: valor for clave, valor in parametros.items() if clave in self.filtros_validos}
+                contenido, tipo = self.conjunto.consultar(filtros, formato)
+                self.responder(200, contenido, tipo)
+            elif url.path == '/estado':
+                df = self.conjunto.cargar()
+                self.responder(200, {
+                    'registros': len(df),
+                    'version': self.conjunto.version,
+                    'cache': self.conjunto.cache.estadisticas()
+                })
+            else:
+                self.responder(404, {'error': f"Ruta no encontrada: {url.path}"})
+        except ValueError as e:
+            self.responder(400, {'error': str(e)})
+
+    def do_POST(self):
+        if urlparse(self.path).path == '/invalidar':
+            df = self.conjunto.cargar(forzar=True)
+            self.responder(200, {'registros': len(df), 'cache': 'vaciada'})
+        else:
+            self.responder(404, {'error': f"Ruta no encontrada: {self.path}"})
+
+    def log_message(self, formato, *args):
+        # Sin log por petición en la consola
+        pass
+
+
+def crear_servidor(directorio_cubo, host='127.0.0.1', puerto=8765, informes=None, capacidad_cache=256):
+    """Crea el servidor HTTP de consulta sobre los datos consolidados"""
+    conjunto = ConjuntoDatos(directorio_cubo, informes, capacidad_cache)
+    conjunto.cargar()
+
+    manejador = type('ManejadorLEQ', (ManejadorConsultas,), {'conjunto': conjunto})
+    return ThreadingHTTPServer((host, puerto), manejador)
+
+
+def notificar_nueva_ejecucion(url_servicio, timeout=2):
+    """Avisa a un servicio en marcha para que recargue los datos (ignora si no responde)"""
+    from urllib.request import Request, urlopen
+
+    try:
+        with urlopen(Request(f"{url_servicio.rstrip('/')}/invalidar", method='POST'), timeout=timeout):
+            return True
+    except OSError:
+        return False
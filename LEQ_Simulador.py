@@ -0,0 +1,286 @@
+import hashlib
+import html
+import json
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+PREFIJO_ID = 'ContenedorContenidoSeccion_'
+
+# Fallos que se pueden inyectar en las respuestas a Buscar (probabilidad por consulta)
+FALLOS = {
+    'lenta': "respuesta que tarda retardo_lento segundos",
+    'vacia': "lblIndicadores sin texto",
+    'error500': "error 500 de la aplicación",
+    'corte': "conexión cerrada sin respuesta",
+    'viewstate': "ViewState caducado: los postbacks fallan hasta recargar la página",
+    'dom_obsoleto': "lblIndicadores sustituido por un nodo nuevo tras la carga (elemento obsoleto)"
+}
+
+NOMBRES_MESES = [
+    'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
+    'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre'
+]
+
+PAGINA = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>LEQ simulado</title>
+<script>
+function __doPostBack(destino, argumento) {{
+    var formulario = document.forms[0];
+    formulario.__EVENTTARGET.value = destino;
+    formulario.__EVENTARGUMENT.value = argumento;
+    formulario.submit();
+}}
+</script>
+</head>
+<body>
+<form method="post" action="{accion}" id="form1">
+<input type="hidden" name="__EVENTTARGET" value="">
+<input type="hidden" name="__EVENTARGUMENT" value="">
+<input type="hidden" name="__VIEWSTATE" value="{viewstate}">
+<select name="{prefijo}ddlHospital" id="{prefijo}ddlHospital"
+        onchange="javascript:setTimeout('__doPostBack(\\'{prefijo}ddlHospital\\',\\'\\')', 0)">
+{hospitales}
+</select>
+<select name="{prefijo}ddlEspecialidad" id="{prefijo}ddlEspecialidad">
+{especialidades}
+</select>
+<select name="{prefijo}ddlFecha" id="{prefijo}ddlFecha">
+{meses}
+</select>
+<input type="submit" name="{prefijo}btnEnviar" value="Buscar" id="{prefijo}btnEnviar">
+<span id="{prefijo}lblIndicadores">{indicadores}</span>
+{script}
+</form>
+</body>
+</html>
+"""
+
+
+# Los indicadores llegan vacíos y un script sustituye el span: quien guardó el nodo viejo lo pierde
+SCRIPT_DOM_OBSOLETO = """<script>
+setTimeout(function () {{
+    var viejo = document.getElementById('{prefijo}lblIndicadores');
+    var nuevo = viejo.cloneNode(false);
+    nuevo.innerHTML = {contenido};
+    viejo.parentNode.replaceChild(nuevo, viejo);
+}}, {milisegundos});
+</script>"""
+
+PAGINA_ERROR = """<!DOCTYPE html>
+<html>
+<head><title>{titulo}</title></head>
+<body>
+<h1>Server Error in '/LEQ' Application.</h1>
+<h2><i>{titulo}</i></h2>
+</body>
+</html>
+"""
+
+
+def opciones_html(opciones, seleccionada, vacia='Seleccione...'):
+    filas = [f'<option value="">{vacia}</option>']
+    for valor, texto in opciones:
+        marcada = ' selected="selected"' if valor == seleccionada else ''
+        filas.append(f'<option value="{html.escape(valor)}"{marcada}>{html.escape(texto)}</option>')
+    return '\n'.join(filas)
+
+
+def numero_estable(*partes):
+    """Entero reproducible a partir de los textos (mismos datos en cada arranque)"""
+    return int(hashlib.sha1('|'.join(partes).encode('utf-8')).hexdigest()[:8], 16)
+
+
+class SimuladorLEQ:
+    """Réplica local de los formularios LEQ (hospital con postback, especialidad, mes y Buscar)"""
+
+    def __init__(self, hospitales=6, especialidades=8, meses=12, retardo=0.3, ano_final=2025, vacias=0.15,
+                 fallos=None, retardo_lento=15.0, semilla=0, caducar_en=()):
+        self.retardo = retardo      # segundos que tarda el servidor en responder a Buscar
+        self.vacias = vacias        # fracción de combinaciones sin datos
+        self.fallos = dict(fallos or {})     # {fallo: probabilidad por consulta}, ver FALLOS
+        self.retardo_lento = retardo_lento
+        self.azar = random.Random(semilla)  # mismos fallos en las mismas consultas en cada prueba
+        self.generacion = 0         # cambia al caducar el ViewState
+        self.caducar_en = set(caducar_en)   # números de Buscar (1, 2...) en los que caduca el ViewState
+        self.buscar = 0
+        self.inyectados = Counter()
+        self.hospitales = [(str(100 + i), f"Hospital Simulado {i + 1}") for i in range(hospitales)]
+        self.especialidades = [(f"E{i + 1:02d}", f"Especialidad {i + 1}") for i in range(especialidades)]
+        self.meses = []
+        for i in range(meses):
+            ano, mes = ano_final - i // 12, 12 - i % 12
+            self.meses.append((f"{ano}{mes:02d}", f"{NOMBRES_MESES[mes - 1]} {ano}"))
+        self.bloqueo = threading.Lock()
+        self.peticiones = {'GET': 0, 'POST': 0, 'consultas': 0}
+
+    def especialidades_hospital(self, hospital):
+        """Cada hospital tiene un subconjunto estable de especialidades"""
+        if not hospital:
+            return []
+        return [
+            (valor, texto) for valor, texto in self.especialidades
+            if numero_estable(hospital, valor) % 4 != 0
+        ] or self.especialidades[:1]
+
+    def pacientes(self, hospital, especialidad, mes):
+        """Valor correcto de una consulta (None si no tiene datos)"""
+        semilla = numero_estable(hospital, especialidad or '', mes)
+        if semilla % 1000 < self.vacias * 1000:
+            return None
+        return 50 + semilla % 5000
+
+    def indicadores(self, hospital, especialidad, mes):
+        pacientes = self.pacientes(hospital, especialidad, mes)
+        if pacientes is None:
+            return "No existen datos para los criterios seleccionados"
+        demora = 5 + (numero_estable(hospital, especialidad or '', mes) // 7) % 2000 / 10
+        return (
+            f"Nº total de pacientes en lista de espera: {pacientes:,}".replace(',', '.')
+            + f"<br>Demora media: {demora:.1f} días".replace('.', ',')
+        )
+
+    def contar(self, tipo):
+        with self.bloqueo:
+            self.peticiones[tipo] += 1
+
+    def elegir_fallo(self, campos):
+        """Fallo de esta petición POST (None = respuesta normal)"""
+        with self.bloqueo:
+            # Con el ViewState caducado falla cualquier postback hasta volver a cargar la página
+            if not campos.get('__VIEWSTATE', '').startswith(f"{self.generacion}-"):
+                self.inyectados['viewstate_caducado'] += 1
+                return 'viewstate'
+            if f"{PREFIJO_ID}btnEnviar" not in campos:
+                return None
+            self.buscar += 1
+            if self.buscar in self.caducar_en:
+                self.inyectados['viewstate'] += 1
+                self.generacion += 1
+                return 'viewstate'
+            if not self.fallos:
+                return None
+
+            azar = self.azar.random()
+            for fallo, probabilidad in self.fallos.items():
+                if azar < probabilidad:
+                    self.inyectados[fallo] += 1
+                    if fallo == 'viewstate':
+                        self.generacion += 1
+                    return fallo
+                azar -= probabilidad
+            return None
+
+    def pagina_error(self, fallo):
+        if fallo == 'viewstate':
+            titulo = "The state information is invalid for this page and might be corrupted."
+        else:
+            titulo = "Object reference not set to an instance of an object."
+        return PAGINA_ERROR.format(titulo=titulo)
+
+    def pagina(self, ruta, campos, fallo=None):
+        """HTML de la página tras aplicar el envío del formulario (campos vacíos = primera carga)"""
+        hospital = campos.get(f"{PREFIJO_ID}ddlHospital", '')
+        especialidad = campos.get(f"{PREFIJO_ID}ddlEspecialidad", '')
+        mes = campos.get(f"{PREFIJO_ID}ddlFecha", '')
+        especialidades = self.especialidades_hospital(hospital)
+
+        indicadores = ''
+        script = ''
+        if campos.get('__EVENTTARGET') == f"{PREFIJO_ID}ddlHospital":
+            especialidad = ''   # el postback del hospital repuebla las especialidades
+        elif f"{PREFIJO_ID}btnEnviar" in campos and hospital and mes:
+            self.contar('consultas')
+            retardo = self.retardo_lento if fallo == 'lenta' else self.retardo
+            if retardo:
+                time.sleep(retardo)
+
+            if fallo == 'dom_obsoleto':
+                script = SCRIPT_DOM_OBSOLETO.format(
+                    prefijo=PREFIJO_ID,
+                    contenido=json.dumps(self.indicadores(hospital, especialidad, mes)),
+                    milisegundos=300
+                )
+            elif fallo != 'vacia':
+                indicadores = self.indicadores(hospital, especialidad, mes)
+
+        return PAGINA.format(
+            accion=html.escape(ruta.rsplit('/', 1)[-1]),
+            viewstate=f"{self.generacion}-{numero_estable(hospital, especialidad, mes)}",
+            prefijo=PREFIJO_ID,
+            hospitales=opciones_html(self.hospitales, hospital),
+            especialidades=opciones_html(especialidades, especialidad, vacia='Todas'),
+            meses=opciones_html(self.meses, mes),
+            indicadores=indicadores,
+            script=script
+        )
+
+
+class ManejadorSimulador(BaseHTTPRequestHandler):
+    """GET y POST de cualquier /LEQ/<informe>.aspx"""
+
+    simulador = None
+
+    def responder(self, codigo, contenido):
+        contenido = contenido.encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def ruta_valida(self):
+        ruta = urlparse(self.path).path
+        if ruta.startswith('/LEQ/') and ruta.endswith('.aspx'):
+            return ruta
+        self.responder(404, f"No encontrado: {html.escape(ruta)}")
+        return None
+
+    def do_GET(self):
+        ruta = self.ruta_valida()
+        if ruta:
+            self.simulador.contar('GET')
+            self.responder(200, self.simulador.pagina(ruta, {}))
+
+    def do_POST(self):
+        ruta = self.ruta_valida()
+        if ruta:
+            self.simulador.contar('POST')
+            longitud = int(self.headers.get('Content-Length', 0))
+            campos = {
+                clave: valores[0]
+                for clave, valores in parse_qs(self.rfile.read(longitud).decode('utf-8'), keep_blank_values=True).items()
+            }
+
+            fallo = self.simulador.elegir_fallo(campos)
+            if fallo == 'corte':
+                # Sin respuesta: el navegador ve la conexión cerrada
+                self.close_connection = True
+                self.connection.shutdown(socket.SHUT_RDWR)
+            elif fallo in ('error500', 'viewstate'):
+                self.responder(500, self.simulador.pagina_error(fallo))
+            else:
+                self.responder(200, self.simulador.pagina(ruta, campos, fallo))
+
+    def log_message(self, formato, *args):
+        # Sin log por petición en la consola
+        pass
+
+
+def crear_servidor_simulador(simulador, host='127.0.0.1', puerto=8767):
+    """Crea el servidor HTTP del simulador (puerto 0 = uno libre)"""
+    manejador = type('ManejadorLEQSimulador', (ManejadorSimulador,), {'simulador': simulador})
+    return ThreadingHTTPServer((host, puerto), manejador)
+
+
+def url_simulador(servidor, informe='Consulta'):
+    host, puerto = servidor.server_address[:2]
+    return f"http://{host}:{puerto}/LEQ/{informe}.aspx"
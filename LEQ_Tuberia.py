@@ -0,0 +1,76 @@
+import queue
+import threading
+
+
+FIN = object()  # marca de fin de la tubería
+
+
+class Tuberia:
+    """Etapas encadenadas por colas acotadas: enviar() se bloquea si las etapas van por detrás"""
+
+    def __init__(self, etapas, capacidad=16):
+        # etapas: lista de (nombre, funcion, hilos); cada función completa el elemento (dict) en sitio
+        self.etapas = etapas
+        self.colas = [queue.Queue(maxsize=capacidad) for _ in etapas]
+        self.maximos = [0] * len(etapas)
+        self.errores = []
+        self.hilos = []
+
+        for posicion, (nombre, funcion, hilos) in enumerate(etapas):
+            grupo = [
+                threading.Thread(target=self.trabajar, args=(posicion,), name=f"{nombre}-{n}", daemon=True)
+                for n in range(hilos)
+            ]
+            self.hilos.append(grupo)
+            for hilo in grupo:
+                hilo.start()
+
+    def enviar(self, elemento):
+        """Entrega un elemento a la primera etapa (espera si su cola está llena)"""
+        self.poner(0, elemento)
+
+    def poner(self, posicion, elemento):
+        cola = self.colas[posicion]
+        cola.put(elemento)
+        profundidad = cola.qsize()
+        if profundidad > self.maximos[posicion]:
+            self.maximos[posicion] = profundidad
+
+    def trabajar(self, posicion):
+        nombre, funcion, _ = self.etapas[posicion]
+        ultima = posicion == len(self.etapas) - 1
+        cola = self.colas[posicion]
+
+        while True:
+            elemento = cola.get()
+            if elemento is FIN:
+                break
+
+            # Un elemento con error salta el resto de etapas hasta la última
+            if 'error' not in elemento or ultima:
+                try:
+                    funcion(elemento)
+                except Exception as e:
+                    if ultima:
+                        self.errores.append((nombre, e))
+                    else:
+                        elemento['error'] = e
+
+            if not ultima:
+                self.poner(posicion + 1, elemento)
+
+    def profundidades(self):
+        """Elementos en espera y máximo observado de cada etapa"""
+        return {
+            nombre: {'en_cola': cola.qsize(), 'maximo': maximo}
+            for (nombre, _, _), cola, maximo in zip(self.etapas, self.colas, self.maximos)
+        }
+
+    def cerrar(self):
+        """Espera a que se vacíen todas las etapas y detiene los hilos"""
+        for posicion, grupo in enumerate(self.hilos):
+            for _ in grupo:
+                self.colas[posicion].put(FIN)
+            for hilo in grupo:
+                hilo.join()
+        return self.errores
@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+import unittest
+
+from LEQ_Cambios import RegistroCambios, escribir_feed_cambios
+
+
+def registro(hospital, mes, pacientes, demora, fecha='2025-01-01 10:00:00'):
+    return {
+        'URL': 'informe', 'Filtro_Hospital': hospital, 'Filtro_Especialidad': 'Cardiología', 'Filtro_Mes': mes,
+        'Pacientes_en_Lista': pacientes, 'Demora_Media': demora, 'Fecha_Extraccion': fecha
+    }
+
+
+class TestRegistroCambios(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.carpeta.name, 'estado.db')
+
+    def tearDown(self):
+        self.carpeta.cleanup()
+
+    def test_primera_ejecucion_todo_insertado(self):
+        cambios, resumen = RegistroCambios(self.ruta).comparar([registro('A', 'Enero', 10, 5), registro('B', 'Enero', 20, 6)])
+        self.assertEqual(resumen, {'insertados': 2, 'actualizados': 0, 'sin_cambios': 0})
+        self.assertEqual({cambio['tipo'] for cambio in cambios}, {'insertado'})
+        self.assertIsNone(cambios[0]['anterior'])
+
+    def test_detecta_actualizados_y_sin_cambios(self):
+        registro_cambios = RegistroCambios(self.ruta)
+        registro_cambios.actualizar([registro('A', 'Enero', 10, 5), registro('B', 'Enero', 20, 6)])
+
+        # Una instancia nueva lee el estado guardado en disco
+        cambios, resumen = RegistroCambios(self.ruta).comparar([
+            registro('A', 'Enero', 10, 5, '2025-02-01 10:00:00'),
+            registro('B', 'Enero', 25, 6, '2025-02-01 10:00:00'),
+            registro('C', 'Enero', 1, 1, '2025-02-01 10:00:00')
+        ])
+
+        self.assertEqual(resumen, {'insertados': 1, 'actualizados': 1, 'sin_cambios': 1})
+        actualizado = next(cambio for cambio in cambios if cambio['tipo'] == 'actualizado')
+        self.assertEqual(actualizado['hospital'], 'B')
+        self.assertEqual(actualizado['anterior'], {'Pacientes_en_Lista': 20, 'Demora_Media': 6})
+        self.assertEqual(actualizado['nuevo'], {'Pacientes_en_Lista': 25, 'Demora_Media': 6})
+        self.assertEqual(actualizado['fecha_anterior'], '2025-01-01 10:00:00')
+
+    def test_muchas_claves_por_bloques(self):
+        registros = [registro(f'H{n}', 'Enero', n, 1) for n in range(1200)]
+        registro_cambios = RegistroCambios(self.ruta)
+        registro_cambios.actualizar(registros)
+        _, resumen = registro_cambios.comparar(registros)
+        self.assertEqual(resumen['sin_cambios'], 1200)
+
+
+class TestFeedCambios(unittest.TestCase):
+
+    def test_primera_linea_es_el_resumen(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = os.path.join(carpeta, 'cambios.jsonl')
+            cambios = [{'tipo': 'insertado', 'clave': 'x', 'hospital': 'Hospital Niño Jesús'}]
+            escribir_feed_cambios(ruta, cambios, {'insertados': 1, 'actualizados': 0, 'sin_cambios': 3})
+
+            with open(ruta, encoding='utf-8') as f:
+                lineas = [json.loads(linea) for linea in f]
+
+        self.assertEqual(lineas[0], {'tipo': 'resumen', 'insertados': 1, 'actualizados': 0, 'sin_cambios': 3})
+        self.assertEqual(lineas[1:], cambios)
+
+
+if __name__ == '__main__':
+    unittest.main()
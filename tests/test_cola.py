@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+from LEQ_Cola import ColaTrabajo
+
+
+def consulta(clave):
+    return {
+        'clave': clave,
+        'url': 'https://ejemplo/leq',
+        'hospital': {'nombre': 'Hospital A', 'valor': '1', 'indice': 1},
+        'mes': {'texto': 'Enero 2024', 'valor': '202401'},
+        'especialidad': None
+    }
+
+
+class TestColaTrabajo(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.TemporaryDirectory()
+        self.cola = ColaTrabajo(os.path.join(self.carpeta.name, 'cola.db'), max_intentos=2)
+
+    def tearDown(self):
+        self.carpeta.cleanup()
+
+    def test_encolar_ignora_claves_repetidas(self):
+        self.assertEqual(self.cola.encolar([consulta('a'), consulta('b')]), 2)
+        self.assertEqual(self.cola.encolar([consulta('b'), consulta('c')]), 1)
+        self.assertEqual(self.cola.resumen(), {'pendiente': 3})
+
+    def test_lease_expirado_vuelve_a_pendiente(self):
+        self.cola.encolar([consulta('a')])
+        self.assertEqual(len(self.cola.reclamar('t1', duracion_lease=-1)), 1)
+        self.assertEqual(self.cola.reclamar('t2'), [])
+
+        self.assertEqual(self.cola.reemitir_expirados(), 1)
+        self.assertEqual(self.cola.resumen(), {'pendiente': 1})
+        self.assertEqual(len(self.cola.reclamar('t2')), 1)
+
+    def test_lease_expirado_sin_intentos_falla(self):
+        self.cola.encolar([consulta('a')])
+        for trabajador in ['t1', 't2']:
+            self.cola.reclamar(trabajador, duracion_lease=-1)
+            self.cola.reemitir_expirados()
+        self.assertEqual(self.cola.resumen(), {'fallido': 1})
+
+    def test_lease_vigente_no_se_reemite(self):
+        self.cola.encolar([consulta('a')])
+        self.cola.reclamar('t1', duracion_lease=60)
+        self.assertEqual(self.cola.reemitir_expirados(), 0)
+        self.assertEqual(self.cola.resumen(), {'asignado': 1})
+
+    def test_completar_de_trabajador_sin_lease_devuelve_false(self):
+        self.cola.encolar([consulta('a')])
+        trabajo = self.cola.reclamar('t1', duracion_lease=-1)[0]
+        self.cola.reemitir_expirados()
+        self.cola.reclamar('t2')
+
+        self.assertFalse(self.cola.completar(trabajo['id'], 't1', [{'registro': 'viejo'}]))
+        self.assertTrue(self.cola.completar(trabajo['id'], 't2', [{'registro': 'nuevo'}]))
+        self.assertFalse(self.cola.completar(trabajo['id'], 't2', [{'registro': 'repetido'}]))
+        self.assertEqual(self.cola.resultados(), [{'registro': 'nuevo'}])
+
+    def test_latido_solo_del_trabajador_con_lease(self):
+        self.cola.encolar([consulta('a')])
+        trabajo = self.cola.reclamar('t1')[0]
+        self.assertEqual(self.cola.latido('t2', [trabajo['id']]), 0)
+        self.assertEqual(self.cola.latido('t1', [trabajo['id']]), 1)
+
+    def test_fallar_devuelve_a_la_cola_hasta_agotar_intentos(self):
+        self.cola.encolar([consulta('a')])
+        trabajo = self.cola.reclamar('t1')[0]
+        self.assertTrue(self.cola.fallar(trabajo['id'], 't1', 'timeout'))
+        self.assertEqual(self.cola.resumen(), {'pendiente': 1})
+
+        trabajo = self.cola.reclamar('t1')[0]
+        self.cola.fallar(trabajo['id'], 't1', 'timeout')
+        self.assertEqual(self.cola.resumen(), {'fallido': 1})
+        self.assertFalse(self.cola.quedan_trabajos())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import tempfile
+import unittest
+
+import pandas as pd
+
+from LEQ_Cubo import actualizar_cubo, agregar_nivel, preparar_hechos
+
+
+def datos(filas, extraccion='2025-01-01 10:00:00'):
+    """filas: (hospital, especialidad, 'AAAA-MM', pacientes, demora)"""
+    return pd.DataFrame([
+        {
+            'URL': 'informe', 'Filtro_Hospital': hospital, 'Filtro_Especialidad': especialidad,
+            'Fecha_Mes': pd.Timestamp(f"{mes}-01"), 'Pacientes_en_Lista': pacientes, 'Demora_Media': demora,
+            'Fecha_Extraccion': extraccion
+        }
+        for hospital, especialidad, mes, pacientes, demora in filas
+    ])
+
+
+def serie(cubo, nivel, columna, **filtro):
+    filas = cubo[cubo['Nivel'] == nivel]
+    for campo, valor in filtro.items():
+        filas = filas[filas[campo] == valor]
+    return filas.sort_values('Fecha_Mes')[columna].tolist()
+
+
+class TestAgregacion(unittest.TestCase):
+
+    def test_delta_solo_entre_meses_consecutivos(self):
+        hechos = preparar_hechos(datos([
+            ('A', 'X', '2024-01', 100, 10), ('A', 'X', '2024-02', 130, 10), ('A', 'X', '2024-04', 90, 10)
+        ]))
+        agregado = agregar_nivel(hechos, ['Informe', 'Hospital'])
+        deltas = agregado['Pacientes_Total_Delta'].tolist()
+        self.assertTrue(pd.isna(deltas[0]))
+        self.assertEqual(deltas[1], 30)
+        self.assertTrue(pd.isna(deltas[2]))
+
+    def test_medias_moviles_por_meses_naturales(self):
+        meses = [f"2024-{mes:02d}" for mes in range(1, 13)] + ['2025-01']
+        hechos = preparar_hechos(datos([('A', 'X', mes, 10 * (n + 1), 1) for n, mes in enumerate(meses)]))
+        agregado = agregar_nivel(hechos, ['Informe', 'Hospital'])
+
+        # Abril: febrero, marzo y abril
+        self.assertEqual(agregado['Pacientes_Total_MM3'].iloc[3], (20 + 30 + 40) / 3)
+        # Enero de 2025: de febrero de 2024 a enero de 2025
+        self.assertEqual(agregado['Pacientes_Total_MM12'].iloc[12], sum(range(20, 140, 10)) / 12)
+
+    def test_media_movil_con_hueco(self):
+        hechos = preparar_hechos(datos([('A', 'X', '2024-01', 10, 1), ('A', 'X', '2024-02', 20, 1), ('A', 'X', '2024-04', 60, 1)]))
+        agregado = agregar_nivel(hechos, ['Informe', 'Hospital'])
+        # Abril: solo febrero y abril caen en la ventana de tres meses
+        self.assertEqual(agregado['Pacientes_Total_MM3'].iloc[2], 40)
+
+    def test_demora_ponderada_por_pacientes(self):
+        hechos = preparar_hechos(datos([('A', 'X', '2024-01', 100, 10), ('A', 'Y', '2024-01', 300, 30)]))
+        agregado = agregar_nivel(hechos, ['Informe', 'Hospital'])
+        self.assertEqual(agregado['Demora_Ponderada'].iloc[0], 25)
+
+    def test_ultima_extraccion_prevalece(self):
+        df = pd.concat([
+            datos([('A', 'X', '2024-01', 100, 10)], '2025-01-01 10:00:00'),
+            datos([('A', 'X', '2024-01', 120, 10)], '2025-01-02 10:00:00')
+        ])
+        self.assertEqual(preparar_hechos(df)['Pacientes_en_Lista'].tolist(), [120])
+
+
+class TestActualizacionIncremental(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.carpeta.cleanup()
+
+    def test_igual_que_recalcular_todo(self):
+        primera = datos([
+            ('A', 'X', '2024-01', 100, 10), ('A', 'X', '2024-02', 110, 12),
+            ('B', 'X', '2024-01', 50, 5), ('B', 'Y', '2024-01', 70, 7)
+        ])
+        segunda = datos([('B', 'X', '2024-02', 80, 6)], '2025-02-01 10:00:00')
+
+        actualizar_cubo(self.carpeta.name, primera)
+        cubo, resumen = actualizar_cubo(self.carpeta.name, segunda)
+
+        with tempfile.TemporaryDirectory() as otra:
+            completo, _ = actualizar_cubo(otra, pd.concat([primera, segunda], ignore_index=True))
+
+        columnas = ['Nivel', 'Informe', 'Hospital', 'Especialidad', 'Fecha_Mes']
+        ordenar = lambda df: df.sort_values(columnas, na_position='first').reset_index(drop=True)[completo.columns]
+        pd.testing.assert_frame_equal(ordenar(cubo), ordenar(completo), check_dtype=False)
+
+        # Solo se recalculan los grupos de B: (B, X), B, X e informe
+        self.assertEqual(resumen['grupos_recalculados'], 4)
+        self.assertEqual(resumen['hechos'], 5)
+        self.assertEqual(serie(cubo, 'hospital', 'Pacientes_Total_Delta', Hospital='B')[1], -40)
+
+
+if __name__ == '__main__':
+    unittest.main()
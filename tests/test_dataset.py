@@ -0,0 +1,116 @@
+import glob
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from LEQ_Dataset import NOMBRE_MANIFIESTO, escribir_dataset, leer_dataset, leer_manifiesto
+
+
+INFORMES = {'url_1': 1, 'url_2': 2}
+
+
+def datos(filas, fecha='2025-01-01 10:00:00'):
+    """filas: (url, hospital, mes, pacientes)"""
+    return pd.DataFrame([
+        {
+            'URL': url, 'Filtro_Hospital': hospital, 'Filtro_Especialidad': 'Cardiología', 'Filtro_Mes': mes,
+            'Pacientes_en_Lista': pacientes, 'Fecha_Extraccion': fecha
+        }
+        for url, hospital, mes, pacientes in filas
+    ])
+
+
+class TestDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.TemporaryDirectory()
+        self.directorio = self.carpeta.name
+
+    def tearDown(self):
+        self.carpeta.cleanup()
+
+    def archivos(self, patron='**/*'):
+        return sorted(
+            os.path.relpath(ruta, self.directorio)
+            for ruta in glob.glob(os.path.join(self.directorio, patron), recursive=True)
+            if os.path.isfile(ruta)
+        )
+
+    def test_estructura_de_particiones(self):
+        resultado = escribir_dataset(datos([
+            ('url_1', 'A', 'Enero 2025', 10), ('url_1', 'B', 'Enero 2025', 20),
+            ('url_2', 'A', 'Febrero 2025', 30), ('desconocida', 'A', 'Enero 2025', 1), ('url_1', 'A', 'Total', 5)
+        ]), self.directorio, INFORMES)
+
+        self.assertEqual(resultado['particiones'], 2)
+        self.assertEqual(resultado['filas'], 3)
+        self.assertEqual(resultado['descartadas'], 2)
+
+        partes = self.archivos('**/*.parquet')
+        self.assertEqual(len(partes), 2)
+        self.assertRegex(partes[0], r'^report=1/year=2025/month=01/part-[0-9a-f]{12}\.parquet$')
+        self.assertRegex(partes[1], r'^report=2/year=2025/month=02/part-[0-9a-f]{12}\.parquet$')
+        self.assertEqual(resultado['archivos'], partes)
+        self.assertEqual(resultado['bytes'], sum(os.path.getsize(os.path.join(self.directorio, p)) for p in partes))
+
+    def test_manifiesto_atomico_sin_temporales(self):
+        escribir_dataset(datos([('url_1', 'A', 'Enero 2025', 10)]), self.directorio, INFORMES)
+        escribir_dataset(datos([('url_1', 'A', 'Enero 2025', 12)]), self.directorio, INFORMES)
+
+        self.assertEqual(self.archivos('**/*.tmp'), [])
+        self.assertEqual(self.archivos('**/_*.tmp'), [])
+        manifiesto = leer_manifiesto(self.directorio)
+        self.assertEqual(list(manifiesto['particiones']), ['report=1/year=2025/month=01'])
+        self.assertTrue(os.path.exists(os.path.join(self.directorio, NOMBRE_MANIFIESTO)))
+
+    def test_reescritura_fusiona_y_sustituye_archivo(self):
+        escribir_dataset(datos([
+            ('url_1', 'A', 'Enero 2025', 10), ('url_1', 'B', 'Enero 2025', 20)
+        ]), self.directorio, INFORMES)
+        anterior = self.archivos('**/*.parquet')
+
+        resultado = escribir_dataset(
+            datos([('url_1', 'A', 'Enero 2025', 15)], '2025-02-01 10:00:00'), self.directorio, INFORMES
+        )
+
+        # Un único archivo vigente por partición; el sustituido se borra
+        actual = self.archivos('**/*.parquet')
+        self.assertEqual(len(actual), 1)
+        self.assertNotEqual(actual, anterior)
+        self.assertEqual(resultado['archivos'], actual)
+
+        df = leer_dataset(self.directorio).sort_values('Filtro_Hospital')
+        self.assertEqual(df['Pacientes_en_Lista'].tolist(), [15, 20])
+
+    def test_bytes_solo_de_esta_ejecucion(self):
+        escribir_dataset(datos([('url_2', 'A', 'Enero 2025', 10)]), self.directorio, INFORMES)
+        resultado = escribir_dataset(datos([('url_1', 'A', 'Enero 2025', 10)]), self.directorio, INFORMES)
+
+        self.assertEqual(len(self.archivos('**/*.parquet')), 2)
+        self.assertEqual(len(resultado['archivos']), 1)
+        self.assertTrue(resultado['archivos'][0].startswith('report=1/'))
+        self.assertEqual(resultado['bytes'], os.path.getsize(os.path.join(self.directorio, resultado['archivos'][0])))
+
+    def test_leer_dataset_filtra_particiones(self):
+        escribir_dataset(datos([
+            ('url_1', 'A', 'Enero 2024', 1), ('url_1', 'A', 'Enero 2025', 2),
+            ('url_1', 'A', 'Febrero 2025', 3), ('url_2', 'A', 'Enero 2025', 4)
+        ]), self.directorio, INFORMES)
+
+        self.assertEqual(len(leer_dataset(self.directorio)), 4)
+        self.assertEqual(sorted(leer_dataset(self.directorio, informe=1)['Pacientes_en_Lista']), [1, 2, 3])
+        self.assertEqual(sorted(leer_dataset(self.directorio, informe=1, anos=[2025])['Pacientes_en_Lista']), [2, 3])
+        df = leer_dataset(self.directorio, anos=[2025], meses=[1])
+        self.assertEqual(sorted(df['report']), [1, 2])
+        self.assertTrue(leer_dataset(self.directorio, informe=3).empty)
+
+    def test_datos_importados_con_informe(self):
+        df = datos([('otra', 'A', 'Marzo 2025', 7)]).assign(Informe=2)
+        escribir_dataset(df, self.directorio, INFORMES)
+        self.assertEqual(list(leer_manifiesto(self.directorio)['particiones']), ['report=2/year=2025/month=03'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import time
+import unittest
+
+from LEQ_Dispersion import MapaDispersion
+
+
+DIA = 86400
+
+
+class TestMapaDispersion(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.carpeta.name, 'dispersion.db')
+
+    def tearDown(self):
+        self.carpeta.cleanup()
+
+    def test_min_vacios(self):
+        mapa = MapaDispersion(self.ruta, min_vacios=2)
+        mapa.registrar('k', False)
+        self.assertFalse(mapa.es_vacia('k'))
+        mapa.registrar('k', False)
+        self.assertTrue(mapa.es_vacia('k'))
+
+    def test_reprueba_con_intervalo_creciente(self):
+        mapa = MapaDispersion(self.ruta, min_vacios=2, dias_reprueba=30, dias_reprueba_max=100)
+        mapa.registrar('k', False)
+        mapa.registrar('k', False)
+        ultimo = mapa.vacios['k']['ultimo_vacio']
+        self.assertTrue(mapa.es_vacia('k', ultimo + 29 * DIA))
+        self.assertFalse(mapa.es_vacia('k', ultimo + 31 * DIA))
+
+        # Un vacío más duplica el intervalo
+        mapa.registrar('k', False)
+        ultimo = mapa.vacios['k']['ultimo_vacio']
+        self.assertTrue(mapa.es_vacia('k', ultimo + 59 * DIA))
+        self.assertFalse(mapa.es_vacia('k', ultimo + 61 * DIA))
+
+        # Y nunca supera el máximo
+        for _ in range(5):
+            mapa.registrar('k', False)
+        ultimo = mapa.vacios['k']['ultimo_vacio']
+        self.assertTrue(mapa.es_vacia('k', ultimo + 99 * DIA))
+        self.assertFalse(mapa.es_vacia('k', ultimo + 101 * DIA))
+
+    def test_datos_borran_la_entrada(self):
+        mapa = MapaDispersion(self.ruta, min_vacios=1)
+        mapa.registrar('k', False)
+        mapa.guardar()
+        mapa.registrar('k', True)
+        mapa.guardar()
+        self.assertFalse(MapaDispersion(self.ruta, min_vacios=1).es_vacia('k'))
+
+    def test_guardar_y_cargar(self):
+        mapa = MapaDispersion(self.ruta, min_vacios=2)
+        mapa.registrar('k', False)
+        mapa.registrar('k', False)
+        mapa.guardar()
+        self.assertEqual(mapa.pendientes, {})
+
+        cargado = MapaDispersion(self.ruta, min_vacios=2)
+        self.assertEqual(cargado.vacios['k']['veces'], 2)
+        self.assertTrue(cargado.es_vacia('k', time.time()))
+
+    def test_filtrar_por_modo(self):
+        consultas = [{'clave': 'vacia'}, {'clave': 'normal'}]
+
+        mapa = MapaDispersion(self.ruta, min_vacios=1)
+        mapa.registrar('vacia', False)
+        self.assertEqual(mapa.filtrar(consultas), ([{'clave': 'normal'}], 1))
+
+        mapa.modo = 'posponer'
+        self.assertEqual(mapa.filtrar(consultas), ([{'clave': 'normal'}, {'clave': 'vacia'}], 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
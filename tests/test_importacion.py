@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+from LEQ_Importacion import archivos_datos, descubrir_carpetas, leer_carpeta, nombre_carpeta_informe
+
+
+INFORMES = {'urls': {'url_1': 1}, 'carpetas': {'Informe_Dos': 2}}
+
+CSV = (
+    "Fecha_Extraccion;URL;Filtro_Mes;Filtro_Hospital;Filtro_Especialidad;Pacientes_en_Lista;Demora_Media;Texto_Completo\n"
+    "2025-01-01 10:00:00;url_1;Enero 2025;A;Cardiología;1.234;10,5;texto\n"
+    "2025-01-01 10:00:00;otra;Enero 2025;B;Cardiología;20;3,0;texto\n"
+)
+
+
+def crear(ruta, contenido=''):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write(contenido)
+
+
+class TestDescubrimiento(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.TemporaryDirectory()
+        self.raiz = self.carpeta.name
+
+    def tearDown(self):
+        self.carpeta.cleanup()
+
+    def test_carpetas_ordenadas_por_fecha(self):
+        for nombre in ['LEQ_Informe_Dos_20250301_090000', 'LEQ_Informe_1_20250101_120000_2', 'LEQ_Informe_1_20250201_080000']:
+            os.makedirs(os.path.join(self.raiz, nombre))
+        os.makedirs(os.path.join(self.raiz, 'LEQ_sin_fecha'))
+        os.makedirs(os.path.join(self.raiz, 'otra_20250101_120000'))
+        crear(os.path.join(self.raiz, 'LEQ_Informe_1_20250401_000000'))
+
+        self.assertEqual([os.path.basename(c) for c in descubrir_carpetas(self.raiz)], [
+            'LEQ_Informe_1_20250101_120000_2', 'LEQ_Informe_1_20250201_080000', 'LEQ_Informe_Dos_20250301_090000'
+        ])
+
+    def test_archivos_datos_sin_derivados(self):
+        for nombre in [
+            'Datos_Completos.csv', 'Datos_Filtrados_2024.csv', 'Datos_Filtrados_2024_2025.csv',
+            'Datos_Completos_normalizado.csv', 'Datos_Completos_reparseado.csv', 'Datos_Filtrados_2024_reparseado.csv',
+            'Datos_Completos.xlsx', 'Resumen.csv'
+        ]:
+            crear(os.path.join(self.raiz, nombre))
+
+        self.assertEqual([os.path.basename(r) for r in archivos_datos(self.raiz, '.csv')], [
+            'Datos_Completos.csv', 'Datos_Filtrados_2024.csv', 'Datos_Filtrados_2024_2025.csv'
+        ])
+        self.assertEqual([os.path.basename(r) for r in archivos_datos(self.raiz, '.xlsx')], ['Datos_Completos.xlsx'])
+
+    def test_nombre_carpeta_informe(self):
+        self.assertEqual(nombre_carpeta_informe('Informe 2. Hospitales'), 'Informe_2_Hospitales')
+
+
+class TestLeerCarpeta(unittest.TestCase):
+
+    def test_informe_por_url_o_por_carpeta(self):
+        with tempfile.TemporaryDirectory() as raiz:
+            carpeta = os.path.join(raiz, 'LEQ_Informe_Dos_20250101_120000')
+            crear(os.path.join(carpeta, 'Datos_Completos.csv'), CSV)
+            # Un derivado con los mismos datos no debe duplicarlos
+            crear(os.path.join(carpeta, 'Datos_Completos_reparseado.csv'), CSV)
+
+            df, origen = leer_carpeta(carpeta, INFORMES)
+
+        self.assertEqual(origen, 'csv')
+        self.assertEqual(len(df), 2)
+        self.assertNotIn('Texto_Completo', df.columns)
+        self.assertEqual(df['Informe'].tolist(), [1, 2])
+        self.assertEqual(set(df['Carpeta_Origen']), {'LEQ_Informe_Dos_20250101_120000'})
+
+    def test_carpeta_sin_datos(self):
+        with tempfile.TemporaryDirectory() as raiz:
+            carpeta = os.path.join(raiz, 'LEQ_Informe_Dos_20250101_120000')
+            crear(os.path.join(carpeta, 'Resumen.csv'), 'a;b\n1;2\n')
+            self.assertEqual(leer_carpeta(carpeta, INFORMES), (None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
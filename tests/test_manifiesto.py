@@ -0,0 +1,109 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from LEQ_Manifiesto import (
+    NOMBRE_MANIFIESTO, comparar_ejecuciones, comparar_manifiestos, diferencias_plan,
+    guardar_manifiesto, leer_manifiesto, tamano_ruta
+)
+
+
+def manifiesto(consultas_por_segundo=2.0, p90=1.0, rss=100 * 2**20, etapa_consultas=60.0, consultas=100, pestanas=4):
+    return {
+        'selecciones': {'informe': 1, 'pestanas': pestanas, 'orden': 'plan', 'captura_red': False, 'timeout': 10},
+        'plan': {'consultas': consultas},
+        'rendimiento': {'consultas_por_segundo': consultas_por_segundo},
+        'latencia': {'p90': p90},
+        'etapas': {'consultas': etapa_consultas},
+        'memoria': {'rss_pico': rss}
+    }
+
+
+def fila(filas, indicador):
+    return next(f for f in filas if f['indicador'] == indicador)
+
+
+class TestComparacion(unittest.TestCase):
+
+    def test_sin_cambios(self):
+        filas = comparar_manifiestos(manifiesto(), manifiesto())
+        self.assertFalse(any(f['regresion'] or f['aviso'] for f in filas))
+        self.assertEqual({f['cambio'] for f in filas}, {0})
+
+    def test_umbral_de_regresion(self):
+        # Menos consultas por segundo es peor; por debajo del umbral no cuenta
+        self.assertFalse(fila(comparar_manifiestos(manifiesto(), manifiesto(consultas_por_segundo=1.85)),
+                              'rendimiento.consultas_por_segundo')['regresion'])
+        self.assertTrue(fila(comparar_manifiestos(manifiesto(), manifiesto(consultas_por_segundo=1.7)),
+                             'rendimiento.consultas_por_segundo')['regresion'])
+
+        # Más latencia es peor; menos latencia es una mejora
+        self.assertTrue(fila(comparar_manifiestos(manifiesto(), manifiesto(p90=1.2)), 'latencia.p90')['regresion'])
+        self.assertFalse(fila(comparar_manifiestos(manifiesto(), manifiesto(p90=0.5)), 'latencia.p90')['regresion'])
+
+        # Umbral configurable
+        self.assertFalse(fila(comparar_manifiestos(manifiesto(), manifiesto(p90=1.2), umbral=0.25), 'latencia.p90')['regresion'])
+
+    def test_otros_indicadores_solo_avisan(self):
+        filas = comparar_manifiestos(manifiesto(), manifiesto(rss=200 * 2**20, etapa_consultas=90.0))
+        for indicador in ['memoria.rss_pico', 'etapas.consultas']:
+            self.assertFalse(fila(filas, indicador)['regresion'])
+            self.assertTrue(fila(filas, indicador)['aviso'])
+        # La memoria se muestra en MB
+        self.assertEqual(fila(filas, 'memoria.rss_pico')['actual'], 200)
+
+    def test_indicadores_ausentes_o_base_cero(self):
+        base = manifiesto(p90=0)
+        del base['rendimiento']
+        filas = comparar_manifiestos(base, manifiesto())
+        self.assertNotIn('rendimiento.consultas_por_segundo', [f['indicador'] for f in filas])
+        self.assertIsNone(fila(filas, 'latencia.p90')['cambio'])
+        self.assertFalse(fila(filas, 'latencia.p90')['regresion'])
+
+    def test_diferencias_plan(self):
+        self.assertEqual(diferencias_plan(manifiesto(), manifiesto(consultas=120)), [])
+        self.assertEqual(diferencias_plan(manifiesto(), manifiesto(pestanas=8, consultas=130)), [
+            'pestanas: 4 → 8', 'consultas planificadas: 100 → 130'
+        ])
+
+    def test_comparar_ejecuciones_devuelve_regresiones(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            base = os.path.join(carpeta, 'base.json')
+            guardar_manifiesto(carpeta, manifiesto())
+            os.replace(os.path.join(carpeta, NOMBRE_MANIFIESTO), base)
+            guardar_manifiesto(carpeta, manifiesto(consultas_por_segundo=1.0))
+
+            with redirect_stdout(io.StringIO()) as salida:
+                regresiones = comparar_ejecuciones(base, carpeta)
+
+        self.assertEqual([f['indicador'] for f in regresiones], ['rendimiento.consultas_por_segundo'])
+        self.assertIn('REGRESIÓN', salida.getvalue())
+
+
+class TestArchivos(unittest.TestCase):
+
+    def test_guardar_y_leer(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = guardar_manifiesto(carpeta, manifiesto())
+            self.assertEqual(ruta, os.path.join(carpeta, NOMBRE_MANIFIESTO))
+            self.assertEqual(os.listdir(carpeta), [NOMBRE_MANIFIESTO])
+            self.assertEqual(leer_manifiesto(carpeta), leer_manifiesto(ruta))
+            self.assertEqual(leer_manifiesto(carpeta)['plan'], {'consultas': 100})
+
+    def test_tamano_ruta(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            os.makedirs(os.path.join(carpeta, 'sub'))
+            for nombre, contenido in [('a.txt', 'x' * 10), (os.path.join('sub', 'b.txt'), 'y' * 5)]:
+                with open(os.path.join(carpeta, nombre), 'w') as f:
+                    f.write(contenido)
+
+            self.assertEqual(tamano_ruta(os.path.join(carpeta, 'a.txt')), 10)
+            self.assertEqual(tamano_ruta(carpeta), 15)
+            self.assertIsNone(tamano_ruta(os.path.join(carpeta, 'no_existe')))
+            self.assertIsNone(tamano_ruta(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
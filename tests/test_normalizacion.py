@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from LEQ_Normalizacion import extraer_mes_ano, leer_csv_datos, normalizar_dataset, normalizar_numeros
+
+
+class TestNumeros(unittest.TestCase):
+
+    def test_decimales_en_formato_espanol(self):
+        serie = pd.Series(['1.234,5', '12,25', '7.5', ' 3 ', None])
+        self.assertEqual(normalizar_numeros(serie).tolist()[:4], [1234.5, 12.25, 7.5, 3.0])
+        self.assertTrue(pd.isna(normalizar_numeros(serie).iloc[4]))
+
+    def test_conteos_sin_decimales(self):
+        serie = pd.Series(['1.234', '12,345', '87'])
+        self.assertEqual(normalizar_numeros(serie, decimales=False).tolist(), [1234, 12345, 87])
+
+    def test_valores_repetidos_y_no_numericos(self):
+        serie = pd.Series(['5', 'n/d', '5', 'n/d'])
+        resultado = normalizar_numeros(serie, decimales=False)
+        self.assertEqual(resultado.iloc[0], 5)
+        self.assertEqual(resultado.isna().tolist(), [False, True, False, True])
+
+
+class TestMeses(unittest.TestCase):
+
+    def test_texto_de_mes(self):
+        partes = extraer_mes_ano(pd.Series(['Enero 2025', 'sept. 2024', 'diciembre de 2023', 'otro']))
+        self.assertEqual(partes['mes'].tolist()[:3], [1, 9, 12])
+        self.assertEqual(partes['ano'].tolist()[:3], [2025, 2024, 2023])
+        self.assertTrue(pd.isna(partes['mes'].iloc[3]))
+
+
+class TestNormalizarDataset(unittest.TestCase):
+
+    def test_tipos_y_marcas_de_valores_no_parseables(self):
+        df = pd.DataFrame({
+            'Filtro_Mes': ['Enero 2025', 'Febrero 2025', 'sin mes'],
+            'Pacientes_en_Lista': ['1.234', 'error', '10'],
+            'Demora_Media': ['12,5', '3,0', 'n/d']
+        })
+        normalizado = normalizar_dataset(df)
+
+        self.assertEqual(str(normalizado['Pacientes_en_Lista'].dtype), 'Int64')
+        self.assertEqual(normalizado['Pacientes_en_Lista'].iloc[0], 1234)
+        self.assertEqual(normalizado['Demora_Media'].iloc[0], 12.5)
+        self.assertEqual(normalizado['Fecha_Mes'].iloc[1], pd.Timestamp('2025-02-01'))
+        self.assertEqual(
+            normalizado['Valores_No_Parseables'].tolist(),
+            ['', 'Pacientes_en_Lista', 'Demora_Media;Fecha_Mes']
+        )
+        # El original no se modifica
+        self.assertEqual(df['Pacientes_en_Lista'].iloc[0], '1.234')
+
+    def test_vacios_no_se_marcan(self):
+        df = pd.DataFrame({'Filtro_Mes': ['Marzo 2024'], 'Pacientes_en_Lista': [None], 'Demora_Media': [None]})
+        self.assertEqual(normalizar_dataset(df)['Valores_No_Parseables'].tolist(), [''])
+
+    def test_columnas_ano_y_mes_completan_el_filtro(self):
+        df = pd.DataFrame({'Filtro_Mes': ['?'], 'Año': ['2024'], 'Mes': ['Mayo']})
+        normalizado = normalizar_dataset(df)
+        self.assertEqual((normalizado['Año'].iloc[0], normalizado['Mes_Numero'].iloc[0]), (2024, 5))
+
+
+class TestLeerCsv(unittest.TestCase):
+
+    def test_detecta_el_separador(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            for separador in [';', ',']:
+                ruta = os.path.join(carpeta, 'datos.csv')
+                with open(ruta, 'w', encoding='utf-8-sig') as f:
+                    f.write(f"Filtro_Mes{separador}Pacientes_en_Lista{separador}Otra\nEnero 2025{separador}007{separador}x\n")
+                df = leer_csv_datos(ruta, ['Filtro_Mes', 'Pacientes_en_Lista'])
+                self.assertEqual(list(df.columns), ['Filtro_Mes', 'Pacientes_en_Lista'])
+                self.assertEqual(df['Pacientes_en_Lista'].iloc[0], '007')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+
+from LEQ_Plan import clave_consulta, clave_registro, leer_pesos, ordenar_consultas, planificar_consultas, repartir_consultas
+
+
+URL = 'https://ejemplo/leq'
+
+
+def hospital(nombre, indice=1):
+    return {'nombre': nombre, 'valor': str(indice), 'indice': indice}
+
+
+def meses(*textos):
+    return [{'texto': texto, 'valor': texto} for texto in textos]
+
+
+def especialidad(nombre):
+    return {'nombre': nombre, 'valor': nombre}
+
+
+class TestPlanificacion(unittest.TestCase):
+
+    def test_producto_mes_por_especialidad(self):
+        consultas = planificar_consultas(
+            URL, hospital('A'), meses('Enero 2024', 'Febrero 2024'),
+            [especialidad('Cardiología'), especialidad('Urología')]
+        )
+        self.assertEqual(len(consultas), 4)
+        self.assertEqual(len({c['clave'] for c in consultas}), 4)
+
+    def test_sin_especialidades_una_consulta_por_mes(self):
+        consultas = planificar_consultas(URL, hospital('A'), meses('Enero 2024', 'Febrero 2024'))
+        self.assertEqual([c['especialidad'] for c in consultas], [None, None])
+        self.assertEqual(consultas[0]['clave'], clave_consulta(URL, 'A', 'Enero 2024'))
+
+    def test_clave_registro_coincide_con_la_consulta(self):
+        consulta = planificar_consultas(URL, hospital('A'), meses('Enero 2024'), [especialidad('Urología')])[0]
+        registro = {
+            'URL': URL, 'Filtro_Hospital': 'A', 'Filtro_Mes': 'Enero 2024', 'Filtro_Especialidad': 'Urología'
+        }
+        self.assertEqual(clave_registro(registro), consulta['clave'])
+
+
+class TestOrden(unittest.TestCase):
+
+    def setUp(self):
+        self.consultas = (
+            planificar_consultas(URL, hospital('Gregorio', 1), meses('Enero 2024', 'Febrero 2024', 'Marzo 2024'))
+            + planificar_consultas(URL, hospital('Paz', 2), meses('Enero 2024', 'Febrero 2024', 'Marzo 2024'))
+        )
+
+    def hospitales(self, consultas):
+        return [c['hospital']['nombre'] for c in consultas]
+
+    def test_hospital_conserva_el_orden(self):
+        self.assertEqual(ordenar_consultas(self.consultas), self.consultas)
+
+    def test_recientes_primero_el_ultimo_mes(self):
+        ordenadas = ordenar_consultas(self.consultas, 'recientes')
+        self.assertEqual([c['mes']['texto'] for c in ordenadas[:2]], ['Marzo 2024', 'Marzo 2024'])
+
+    def test_rotacion_alterna_hospitales(self):
+        ordenadas = ordenar_consultas(self.consultas, 'rotacion')
+        self.assertEqual(self.hospitales(ordenadas), ['Gregorio', 'Paz'] * 3)
+
+    def test_pesos_adelantan_al_hospital_con_mas_peso(self):
+        ordenadas = ordenar_consultas(self.consultas, 'pesos', leer_pesos('paz=2'))
+        # Paz tiene turno cada medio pase y termina antes
+        self.assertEqual(self.hospitales(ordenadas), ['Gregorio', 'Paz', 'Paz', 'Gregorio', 'Paz', 'Gregorio'])
+        self.assertCountEqual(ordenadas, self.consultas)
+
+    def test_politica_desconocida(self):
+        with self.assertRaises(ValueError):
+            ordenar_consultas(self.consultas, 'azar')
+
+    def test_leer_pesos(self):
+        self.assertEqual(leer_pesos('Gregorio=3; Cardiología=2;vacío='), {'gregorio': 3.0, 'cardiología': 2.0})
+
+
+class TestReparto(unittest.TestCase):
+
+    def planificar(self, *nombres, numero_meses=4):
+        textos = [f"Mes {n} 2024" for n in range(numero_meses)]
+        return [
+            consulta
+            for indice, nombre in enumerate(nombres)
+            for consulta in planificar_consultas(URL, hospital(nombre, indice), meses(*textos))
+        ]
+
+    def test_no_mezcla_hospitales_si_hay_suficientes(self):
+        colas = repartir_consultas(self.planificar('A', 'B', 'C', 'D'), 2)
+        self.assertEqual([len(cola) for cola in colas], [8, 8])
+        for cola in colas:
+            nombres = [c['hospital']['nombre'] for c in cola]
+            # Cada hospital entero en una sola cola y sin intercalar
+            self.assertEqual(len(set(nombres)), 2)
+            self.assertEqual(nombres, sorted(nombres, key=nombres.index))
+
+    def test_trocea_hospitales_si_hay_mas_colas(self):
+        colas = repartir_consultas(self.planificar('A', numero_meses=6), 3)
+        self.assertEqual([len(cola) for cola in colas], [2, 2, 2])
+
+    def test_conserva_todas_las_consultas(self):
+        consultas = self.planificar('A', 'B', 'C', numero_meses=5)
+        colas = repartir_consultas(consultas, 4)
+        self.assertCountEqual([c['clave'] for cola in colas for c in cola], [c['clave'] for c in consultas])
+
+
+if __name__ == '__main__':
+    unittest.main()
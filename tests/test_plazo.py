@@ -0,0 +1,53 @@
+import unittest
+from datetime import datetime
+
+from LEQ_Plazo import Plazo, leer_duracion
+
+
+class TestLeerDuracion(unittest.TestCase):
+
+    def test_unidades(self):
+        self.assertEqual(leer_duracion('45s'), 45)
+        self.assertEqual(leer_duracion('90m'), 5400)
+        self.assertEqual(leer_duracion('2h'), 7200)
+        self.assertEqual(leer_duracion('1h30m'), 5400)
+        self.assertEqual(leer_duracion('1.5H'), 5400)
+
+    def test_sin_unidad_se_rechaza(self):
+        with self.assertRaisesRegex(ValueError, 'sin unidad'):
+            leer_duracion('90')
+
+    def test_texto_no_valido(self):
+        for texto in ['', 'hora', '2x', '1h y 30m']:
+            with self.assertRaises(ValueError):
+                leer_duracion(texto)
+
+    def test_hora_limite(self):
+        ahora = datetime(2024, 1, 10, 22, 0)
+        self.assertEqual(leer_duracion('23:30', ahora), 5400)
+        # La hora ya ha pasado hoy: es la de mañana
+        self.assertEqual(leer_duracion('06:30', ahora), 8.5 * 3600)
+
+
+class TestPlazo(unittest.TestCase):
+
+    def test_no_despacha_si_la_consulta_no_cabe(self):
+        plazo = Plazo(100, reserva=0)
+        self.assertTrue(plazo.puede_despachar())
+        plazo.registrar(150)
+        self.assertFalse(plazo.puede_despachar())
+
+    def test_coste_con_media_movil(self):
+        plazo = Plazo(100, suavizado=0.5)
+        plazo.registrar(10)
+        plazo.registrar(20)
+        self.assertEqual(plazo.coste_consulta, 15)
+
+    def test_timeout_acotado_por_lo_que_queda(self):
+        self.assertEqual(Plazo(3600, reserva=0).timeout(30), 30)
+        self.assertLessEqual(Plazo(10, reserva=0).timeout(30), 10)
+        self.assertEqual(Plazo(10, reserva=60).timeout(30), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
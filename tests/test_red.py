@@ -0,0 +1,82 @@
+import base64
+import json
+import unittest
+
+from LEQ_Red import CapturaRed, contenido_elemento
+
+
+class TestContenidoElemento(unittest.TestCase):
+
+    def test_etiquetas_anidadas_del_mismo_tipo(self):
+        html = '<div id="otro">x</div><div id="panel" class="a"><div>uno</div><div><div>dos</div></div></div><div>fuera</div>'
+        self.assertEqual(contenido_elemento(html, 'panel'), '<div>uno</div><div><div>dos</div></div>')
+
+    def test_comillas_simples_y_dobles(self):
+        self.assertEqual(contenido_elemento("<span id='total'>1.234</span>", 'total'), '1.234')
+        self.assertEqual(contenido_elemento('<span class="n" id="total">1.234</span>', 'total'), '1.234')
+
+    def test_id_ausente_o_sin_cierre(self):
+        self.assertIsNone(contenido_elemento('<div id="panel">x</div>', 'otro'))
+        self.assertIsNone(contenido_elemento('<div id="panel"><div>x</div>', 'panel'))
+
+    def test_id_con_caracteres_especiales(self):
+        html = '<td id="ctl00_Main.Total">5</td><td id="ctl00_MainxTotal">6</td>'
+        self.assertEqual(contenido_elemento(html, 'ctl00_Main.Total'), '5')
+
+    def test_no_confunde_prefijos_de_etiqueta(self):
+        html = '<table id="datos"><tr><td><table><tbody></tbody></table></td></tr></table>'
+        self.assertEqual(contenido_elemento(html, 'datos'), '<tr><td><table><tbody></tbody></table></td></tr>')
+
+
+class DriverFalso:
+    """Devuelve los eventos de red indicados y los cuerpos por id de petición"""
+
+    def __init__(self, eventos, cuerpos):
+        self.eventos = list(eventos)
+        self.cuerpos = cuerpos
+
+    def execute_cdp_cmd(self, comando, parametros):
+        if comando == 'Network.getResponseBody':
+            return self.cuerpos[parametros['requestId']]
+        return {}
+
+    def get_log(self, tipo):
+        eventos, self.eventos = self.eventos, []
+        return [{'message': json.dumps({'message': {'method': metodo, 'params': params}})} for metodo, params in eventos]
+
+
+def peticion(id_peticion, metodo):
+    return 'Network.requestWillBeSent', {'requestId': id_peticion, 'request': {'method': metodo}}
+
+
+class TestCapturaRed(unittest.TestCase):
+
+    def test_cuerpo_del_primer_post(self):
+        driver = DriverFalso([
+            peticion('1', 'GET'), ('Network.loadingFinished', {'requestId': '1'}),
+            peticion('2', 'POST'), peticion('3', 'POST'),
+            ('Network.loadingFinished', {'requestId': '3'}), ('Network.loadingFinished', {'requestId': '2'})
+        ], {
+            '2': {'body': base64.b64encode('<p>postback ñ</p>'.encode()).decode(), 'base64Encoded': True},
+            '3': {'body': 'otro'}
+        })
+        self.assertEqual(CapturaRed(driver).esperar_respuesta(1), '<p>postback ñ</p>')
+
+    def test_fallo_o_tiempo_agotado(self):
+        driver = DriverFalso([peticion('1', 'POST'), ('Network.loadingFailed', {'requestId': '1'})], {})
+        self.assertIsNone(CapturaRed(driver).esperar_respuesta(1))
+
+        captura = CapturaRed(DriverFalso([peticion('1', 'POST')], {}))
+        self.assertIsNone(captura.esperar_respuesta(0.1, intervalo=0.01))
+
+    def test_vaciar_descarta_eventos_anteriores(self):
+        driver = DriverFalso([peticion('1', 'POST'), ('Network.loadingFinished', {'requestId': '1'})], {'1': {'body': 'viejo'}})
+        captura = CapturaRed(driver)
+        captura.vaciar()
+        driver.eventos = [peticion('2', 'POST'), ('Network.loadingFinished', {'requestId': '2'})]
+        driver.cuerpos['2'] = {'body': 'nuevo'}
+        self.assertEqual(captura.esperar_respuesta(1), 'nuevo')
+
+
+if __name__ == '__main__':
+    unittest.main()
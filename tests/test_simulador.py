@@ -0,0 +1,53 @@
+import re
+import threading
+import unittest
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+from LEQ_Simulador import PREFIJO_ID, SimuladorLEQ, crear_servidor_simulador, url_simulador
+
+
+class TestCaducidadViewState(unittest.TestCase):
+
+    def setUp(self):
+        self.simulador = SimuladorLEQ(hospitales=2, meses=3, retardo=0, vacias=0, caducar_en=(2,))
+        self.servidor = crear_servidor_simulador(self.simulador, puerto=0)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.url = url_simulador(self.servidor)
+
+    def tearDown(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def cargar(self):
+        with urlopen(self.url) as respuesta:
+            return re.search(r'name="__VIEWSTATE" value="([^"]*)"', respuesta.read().decode('utf-8')).group(1)
+
+    def buscar(self, viewstate):
+        """Código HTTP de un Buscar con el primer hospital y mes"""
+        campos = {
+            '__VIEWSTATE': viewstate,
+            f"{PREFIJO_ID}ddlHospital": self.simulador.hospitales[0][0],
+            f"{PREFIJO_ID}ddlFecha": self.simulador.meses[0][0],
+            f"{PREFIJO_ID}btnEnviar": 'Buscar'
+        }
+        try:
+            with urlopen(self.url, data=urlencode(campos).encode('utf-8')) as respuesta:
+                return respuesta.status
+        except HTTPError as e:
+            return e.code
+
+    def test_caduca_en_el_buscar_indicado_y_se_recupera_al_recargar(self):
+        viewstate = self.cargar()
+        self.assertEqual(self.buscar(viewstate), 200)
+        self.assertEqual(self.buscar(viewstate), 500)
+        # Sin recargar, el ViewState anterior ya no vale
+        self.assertEqual(self.buscar(viewstate), 500)
+
+        self.assertEqual(self.buscar(self.cargar()), 200)
+        self.assertEqual(self.simulador.inyectados['viewstate'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
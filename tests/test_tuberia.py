@@ -0,0 +1,70 @@
+import threading
+import unittest
+
+from LEQ_Tuberia import Tuberia
+
+
+class TestTuberia(unittest.TestCase):
+
+    def test_cada_elemento_pasa_por_todas_las_etapas(self):
+        volcados = []
+        tuberia = Tuberia([
+            ('doble', lambda e: e.update(valor=e['valor'] * 2), 3),
+            ('suma', lambda e: e.update(valor=e['valor'] + 1), 1),
+            ('volcado', volcados.append, 1)
+        ], capacidad=2)
+        for numero in range(50):
+            tuberia.enviar({'valor': numero})
+
+        self.assertEqual(tuberia.cerrar(), [])
+        self.assertEqual(sorted(e['valor'] for e in volcados), [2 * n + 1 for n in range(50)])
+
+    def test_un_error_salta_a_la_ultima_etapa(self):
+        def parsear(elemento):
+            if elemento['valor'] == 1:
+                raise ValueError('html roto')
+
+        validados = []
+        volcados = []
+        tuberia = Tuberia([
+            ('parseo', parsear, 1),
+            ('validacion', lambda e: validados.append(e['valor']), 1),
+            ('volcado', volcados.append, 1)
+        ])
+        for numero in range(3):
+            tuberia.enviar({'valor': numero})
+        tuberia.cerrar()
+
+        self.assertEqual(validados, [0, 2])
+        self.assertEqual(len(volcados), 3)
+        self.assertIsInstance(volcados[1]['error'], ValueError)
+
+    def test_errores_de_la_ultima_etapa_se_devuelven(self):
+        def volcar(elemento):
+            raise OSError('disco lleno')
+
+        tuberia = Tuberia([('volcado', volcar, 1)])
+        tuberia.enviar({})
+        errores = tuberia.cerrar()
+        self.assertEqual([etapa for etapa, _ in errores], ['volcado'])
+
+    def test_enviar_se_bloquea_con_la_cola_llena(self):
+        liberar = threading.Event()
+        tuberia = Tuberia([('lenta', lambda e: liberar.wait(), 1)], capacidad=1)
+        tuberia.enviar({})   # la etapa lo recoge y se queda esperando
+        tuberia.enviar({})   # ocupa el único hueco de la cola
+
+        bloqueado = threading.Thread(target=tuberia.enviar, args=({},), daemon=True)
+        bloqueado.start()
+        bloqueado.join(0.2)
+        self.assertTrue(bloqueado.is_alive())
+
+        liberar.set()
+        bloqueado.join(5)
+        self.assertFalse(bloqueado.is_alive())
+        tuberia.cerrar()
+        self.assertEqual(tuberia.profundidades()['lenta']['maximo'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()